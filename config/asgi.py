@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Optional: preload the USSD channel index (PAYMENT_CHANNEL_INDEX["WARM_ON_STARTUP"])
+from paychannel.index import warm_on_startup  # noqa: E402
+
+warm_on_startup()
@@ -14,6 +14,7 @@ import os
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
 
 
 # Load .env file
@@ -186,6 +187,7 @@ AUTH_USER_MODEL = "authentications.CustomUser"
 
 
 CORS_ALLOW_ALL_ORIGINS = True  # Only for development!
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
 # For production, specify allowed origins:
 # CORS_ALLOWED_ORIGINS = [
 #     "http://localhost:3000",
@@ -240,6 +242,149 @@ PAYSWITCH_API_KEY = os.getenv("THELLER_API_KEY")
 PAYSWITCH_USERNAME = os.getenv("THELLER_USERNAME")
 
 
+# Gateway HTTP clients (pooled keep-alive sessions, see payment/sessions.py)
+# Point PAYSTACK_BASE_URL / PAYSWITCH_BASE_URL at loadtest/fake_gateway.py to benchmark offline.
+PAYMENT_GATEWAYS = {
+    "paystack": {
+        "BASE_URL": os.getenv("PAYSTACK_BASE_URL", "https://api.paystack.co"),
+        "POOL_SIZE": int(os.getenv("PAYSTACK_POOL_SIZE", 10)),
+        "CONNECT_TIMEOUT": float(os.getenv("PAYSTACK_CONNECT_TIMEOUT", 5)),
+        "READ_TIMEOUT": float(os.getenv("PAYSTACK_READ_TIMEOUT", 30)),
+        "RETRIES": int(os.getenv("PAYSTACK_RETRIES", 3)),
+        "BACKOFF_FACTOR": float(os.getenv("PAYSTACK_BACKOFF_FACTOR", 0.3)),
+    },
+    "payswitch": {
+        "BASE_URL": os.getenv("PAYSWITCH_BASE_URL", "https://prod.theteller.net/v1.1"),
+        "POOL_SIZE": int(os.getenv("PAYSWITCH_POOL_SIZE", 10)),
+        "CONNECT_TIMEOUT": float(os.getenv("PAYSWITCH_CONNECT_TIMEOUT", 5)),
+        "READ_TIMEOUT": float(os.getenv("PAYSWITCH_READ_TIMEOUT", 30)),
+        "RETRIES": int(os.getenv("PAYSWITCH_RETRIES", 3)),
+        "BACKOFF_FACTOR": float(os.getenv("PAYSWITCH_BACKOFF_FACTOR", 0.3)),
+    },
+}
+
+# Threads for post-response work: webhook processing, charge dispatch (payment/background.py)
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", 8))
+# …and a separate pool for USSD charges / OTP submits, so they never queue behind that work
+USSD_WORKERS = int(os.getenv("USSD_WORKERS", 8))
+
+# Gateway selection / circuit breakers (see payment/gateways.py)
+PAYMENT_GATEWAY_ROUTER = {
+    "ORDER": os.getenv("PAYMENT_GATEWAY_ORDER", "paystack,payswitch").split(","),
+    "WINDOW_SECONDS": 60,
+    "MIN_CALLS": 10,
+    "ERROR_RATE_THRESHOLD": 0.5,
+    "OPEN_SECONDS": 30,
+    "SLOW_P95_SECONDS": 10,
+}
+
+# Charge outbox (payment/outbox.py) — CreatePaymentAPIView returns 202 and
+# dispatcher workers (background executor / manage.py dispatch_outbox) call the gateway
+PAYMENT_CHARGE_OUTBOX = {
+    "ENABLED": os.getenv("PAYMENT_CHARGE_OUTBOX", "False") == "True",
+    "MAX_ATTEMPTS": 5,
+    "RETRY_SECONDS": 5,
+    "LEASE_SECONDS": 120,
+}
+
+# Webhook processing (payment/webhooks.py) — events failing this often are parked for review
+PAYMENT_WEBHOOKS = {
+    "MAX_ATTEMPTS": int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 5)),
+}
+
+
+# Metrics (payment/metrics.py, served at /metrics). METRICS_DIR lets every gunicorn
+# worker answer for all of them — point it at a directory emptied on deploy.
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Payment references (payment/references.py) — give each host/container its own 0-255 id;
+# processes on one node are told apart by pid
+PAYMENT_REFERENCE_NODE_ID = int(os.getenv("PAYMENT_REFERENCE_NODE_ID", 0))
+
+
+# Cache — Idempotency-Key responses and in-flight markers (payment/idempotency.py).
+# LocMem is per process; set REDIS_URL (needs the `redis` package) so every
+# worker sees the same keys.
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "kivipay",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+# USSD session state (ussd/sessions.py). Must be shared when running more than one
+# worker: "cache" uses the cache above (Redis), "sqlite" a WAL file on this host,
+# "memory" is a per-process LRU for development.
+USSD_SESSION_STORE = {
+    "BACKEND": os.getenv("USSD_SESSION_BACKEND", "cache" if REDIS_URL else "sqlite"),
+    "TTL_SECONDS": int(os.getenv("USSD_SESSION_TTL_SECONDS", 300)),
+    "MAX_ENTRIES": 10000,
+    "CACHE": "default",
+    "PATH": os.getenv("USSD_SESSION_PATH", str(BASE_DIR / "ussd_sessions.sqlite3")),
+}
+
+# USSD hop budget (ussd/charges.py). Charges and OTP submits run in the background;
+# the hop answers once the gateway has, or when HOP_SECONDS is nearly up.
+USSD_DEADLINE = {
+    "HOP_SECONDS": float(os.getenv("USSD_HOP_SECONDS", 4)),
+    "REPLY_MARGIN_SECONDS": 0.3,
+    "CHARGE_SECONDS": float(os.getenv("USSD_CHARGE_SECONDS", 30)),
+}
+
+# USSD code / channel id / paylink slug → channel snapshot (paychannel/index.py).
+# Workers see each other's channel edits through the shared cache (REDIS_URL);
+# without it entries only live LOCAL_TTL_SECONDS.
+PAYMENT_CHANNEL_INDEX = {
+    "TTL_SECONDS": int(os.getenv("CHANNEL_INDEX_TTL_SECONDS", 60)),
+    "LOCAL_TTL_SECONDS": int(os.getenv("CHANNEL_INDEX_LOCAL_TTL_SECONDS", 2)),
+    "CHECK_SECONDS": 1,
+    "CACHE": "default",
+    "WARM_ON_STARTUP": os.getenv("CHANNEL_INDEX_WARM", "False") == "True",
+    "MAX_SLUGS": int(os.getenv("CHANNEL_INDEX_MAX_SLUGS", 10000)),
+    "NEGATIVE_TTL_SECONDS": int(os.getenv("CHANNEL_INDEX_NEGATIVE_TTL_SECONDS", 5)),
+}
+
+# Channel search for the API and admin (paychannel/search.py): SQLite FTS5 when
+# migrated, otherwise LIKE (PostgreSQL: served by pg_trgm indexes)
+PAYMENT_CHANNEL_SEARCH = {
+    "BACKEND": os.getenv("CHANNEL_SEARCH_BACKEND", "auto"),
+}
+
+# Public paylink endpoint (paychannel/paylinks.py): HTTP cache lifetimes
+PAYLINK_CACHE = {
+    "MAX_AGE_SECONDS": int(os.getenv("PAYLINK_MAX_AGE_SECONDS", 30)),
+    "STALE_WHILE_REVALIDATE_SECONDS": int(os.getenv("PAYLINK_STALE_WHILE_REVALIDATE_SECONDS", 300)),
+    "STALE_IF_ERROR_SECONDS": 86400,
+    "NOT_FOUND_MAX_AGE_SECONDS": 10,
+}
+
+# Hourly / daily payment rollups (payment/rollups.py): rebuild batch and dashboard range limits
+PAYMENT_ROLLUPS = {
+    "REBUILD_WINDOW_DAYS": int(os.getenv("PAYMENT_ROLLUP_REBUILD_WINDOW_DAYS", 7)),
+    "MAX_HOURLY_DAYS": 31,
+    "MAX_DAILY_DAYS": 731,
+}
+
+PAYMENT_IDEMPOTENCY = {
+    "CACHE": "default",
+    "TTL_SECONDS": int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 24 * 3600)),
+    "LOCK_SECONDS": 60,
+    "WAIT_SECONDS": 15,
+}
+
+
 CSRF_TRUSTED_ORIGINS = [
 "https://kivipay-backend-production.up.railway.app",
 # add your frontend domain(s) if needed
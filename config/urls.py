@@ -19,6 +19,8 @@ from django.urls import include, path
 
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 
+from payment.views import metrics_view
+
 urlpatterns = [
     
      
@@ -30,6 +32,9 @@ urlpatterns = [
     
     
     
+    # Prometheus scrape target
+    path('metrics', metrics_view, name='metrics'),
+
     path('admin/', admin.site.urls),
     path('', include('authentications.urls')),
     path('api/', include('paychannel.urls')),
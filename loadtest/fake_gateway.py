@@ -0,0 +1,418 @@
+"""
+Fake Paystack / PaySwitch gateway for offline load tests.
+
+Implements the endpoints PaystackMobileMoney and PaySwitchMobileMoney call:
+
+    Paystack   POST /charge
+               POST /charge/submit_otp
+               GET  /transaction/verify/<reference>
+               GET  /transaction?from=&to=&page=&perPage=
+    PaySwitch  POST /transaction/process
+               GET  /users/transactions/<reference>/status
+
+with configurable latency, errors, OTP prompts and delayed success.
+Standalone — standard library only, no Django.
+
+Usage:
+    python loadtest/fake_gateway.py --port 8765 \
+        --latency charge=lognormal:-1.6,0.5 --latency verify=uniform:0.02,0.08 \
+        --error-rate 0.02 --timeout-rate 0.01 --otp-rate 0.3 --success-after 5
+
+    PAYSTACK_BASE_URL=http://127.0.0.1:8765 \
+    PAYSWITCH_BASE_URL=http://127.0.0.1:8765 \
+    python manage.py runserver
+
+Latency specs (seconds):
+    fixed:0.2   uniform:0.1,0.5   normal:0.3,0.1   lognormal:<mu>,<sigma>   exp:<mean>
+Operations: charge, submit_otp, verify, list, process, status (or "default").
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+# -----------------------------
+# Latency distributions
+# -----------------------------
+def parse_latency(spec: str):
+    """
+    "lognormal:-1.6,0.5" → callable returning a delay in seconds.
+    """
+    kind, _, args = spec.partition(":")
+    params = [float(x) for x in args.split(",") if x]
+
+    samplers = {
+        "fixed": lambda: params[0],
+        "uniform": lambda: random.uniform(params[0], params[1]),
+        "normal": lambda: random.gauss(params[0], params[1]),
+        "lognormal": lambda: random.lognormvariate(params[0], params[1]),
+        "exp": lambda: random.expovariate(1 / params[0]),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution: {kind}")
+
+    sampler = samplers[kind]
+    return lambda: max(0.0, sampler())
+
+
+class GatewayConfig:
+    def __init__(
+        self,
+        latency=None,
+        error_rate=0.0,
+        timeout_rate=0.0,
+        hang_seconds=60.0,
+        otp_rate=0.0,
+        decline_rate=0.0,
+        success_after=0.0,
+        valid_otp=None,
+    ):
+        self.latency = {"default": parse_latency("fixed:0")}
+        for op, spec in (latency or {}).items():
+            self.latency[op] = parse_latency(spec)
+        self.error_rate = error_rate          # share of calls answered with HTTP 500
+        self.timeout_rate = timeout_rate      # share of calls that hang for hang_seconds
+        self.hang_seconds = hang_seconds
+        self.otp_rate = otp_rate              # share of Paystack charges that ask for an OTP
+        self.decline_rate = decline_rate      # share of transactions that end up failed
+        self.success_after = success_after    # seconds until a charge settles
+        self.valid_otp = valid_otp            # None = any digits accepted
+
+    def delay(self, op: str):
+        sampler = self.latency.get(op) or self.latency["default"]
+        return sampler()
+
+
+# -----------------------------
+# Transaction state
+# -----------------------------
+class Ledger:
+    """
+    In-memory record of every charge the fake gateway has seen.
+    """
+
+    def __init__(self, config: GatewayConfig):
+        self.config = config
+        self.transactions = {}
+        self.lock = threading.Lock()
+
+    def create(self, reference, amount, currency, channel, awaiting_otp=False):
+        declined = random.random() < self.config.decline_rate
+        txn = {
+            "id": random.randint(10**9, 10**10),
+            "reference": reference,
+            "amount": amount,
+            "currency": currency,
+            "channel": channel,
+            "created_at": time.time(),
+            "settle_at": None if awaiting_otp else time.time() + self.config.success_after,
+            "final_status": "failed" if declined else "success",
+            "awaiting_otp": awaiting_otp,
+        }
+        with self.lock:
+            self.transactions[reference] = txn
+        return txn
+
+    def get(self, reference):
+        with self.lock:
+            return self.transactions.get(reference)
+
+    def between(self, start=None, end=None):
+        with self.lock:
+            txns = list(self.transactions.values())
+        return sorted(
+            (t for t in txns
+             if (start is None or t["created_at"] >= start) and (end is None or t["created_at"] <= end)),
+            key=lambda t: t["created_at"],
+            reverse=True,
+        )
+
+    def submit_otp(self, reference, otp):
+        with self.lock:
+            txn = self.transactions.get(reference)
+            if txn is None:
+                return None, "Transaction not found"
+            if not txn["awaiting_otp"]:
+                return txn, "Transaction is not awaiting OTP"
+            if self.config.valid_otp is not None and otp != self.config.valid_otp:
+                return txn, "Invalid OTP"
+            txn["awaiting_otp"] = False
+            txn["settle_at"] = time.time() + self.config.success_after
+            return txn, None
+
+    @staticmethod
+    def status(txn):
+        if txn["awaiting_otp"]:
+            return "send_otp"
+        if time.time() < txn["settle_at"]:
+            return "ongoing"
+        return txn["final_status"]
+
+
+# -----------------------------
+# HTTP handler
+# -----------------------------
+class FakeGatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"     # keep-alive, like the real gateways
+    server_version = "FakeGateway/1.0"
+
+    ROUTES = [
+        ("POST", re.compile(r"^/charge/?$"), "charge"),
+        ("POST", re.compile(r"^/charge/submit_otp/?$"), "submit_otp"),
+        ("GET", re.compile(r"^/transaction/verify/(?P<reference>[^/?]+)"), "verify"),
+        ("GET", re.compile(r"^/transaction/?$"), "list"),
+        ("POST", re.compile(r"^/transaction/process/?$"), "process"),
+        ("GET", re.compile(r"^/users/transactions/(?P<reference>[^/?]+)/status"), "status"),
+    ]
+
+    @property
+    def config(self) -> GatewayConfig:
+        return self.server.config
+
+    @property
+    def ledger(self) -> Ledger:
+        return self.server.ledger
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def _send(self, code, body):
+        payload = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _dispatch(self):
+        url = urlsplit(self.path)
+        path = url.path
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        # PaySwitch's BASE_URL carries a version prefix
+        if path.startswith("/v1.1/"):
+            path = path[len("/v1.1"):]
+
+        for method, pattern, op in self.ROUTES:
+            match = pattern.match(path)
+            if method == self.command and match:
+                break
+        else:
+            return self._send(404, {"status": False, "message": "Not found"})
+
+        body = self._read_json() if self.command == "POST" else {}
+
+        # Fault injection
+        roll = random.random()
+        if roll < self.config.timeout_rate:
+            time.sleep(self.config.hang_seconds)
+        elif roll < self.config.timeout_rate + self.config.error_rate:
+            time.sleep(self.config.delay(op))
+            return self._send(500, {"status": False, "message": "Injected gateway error"})
+
+        time.sleep(self.config.delay(op))
+        code, response = getattr(self, f"handle_{op}")(body, **match.groupdict())
+        self._send(code, response)
+
+    do_GET = _dispatch
+    do_POST = _dispatch
+
+    # -------- Paystack --------
+    def handle_charge(self, body):
+        reference = body.get("reference") or f"T{uuid.uuid4().hex[:15]}"
+        awaiting_otp = random.random() < self.config.otp_rate
+        txn = self.ledger.create(
+            reference,
+            body.get("amount"),
+            body.get("currency", "GHS"),
+            "mobile_money",
+            awaiting_otp=awaiting_otp,
+        )
+        status = "send_otp" if awaiting_otp else "pay_offline"
+        data = {"reference": reference, "status": status}
+        if awaiting_otp:
+            data["display_text"] = "Please enter the OTP sent to your phone"
+        else:
+            data["display_text"] = "Please complete authorization process on your mobile phone"
+        return 200, {"status": True, "message": "Charge attempted", "data": data, "_id": txn["id"]}
+
+    def handle_submit_otp(self, body):
+        txn, error = self.ledger.submit_otp(body.get("reference"), str(body.get("otp", "")))
+        if txn is None:
+            return 400, {"status": False, "message": error}
+        if error:
+            return 200, {"status": True, "message": "Charge attempted", "data": {
+                "reference": txn["reference"], "status": "failed", "message": error,
+            }}
+        return 200, {"status": True, "message": "Charge attempted", "data": {
+            "reference": txn["reference"],
+            "status": "pending",
+            "message": "Please complete authorization process on your mobile phone",
+        }}
+
+    def handle_verify(self, body, reference):
+        txn = self.ledger.get(reference)
+        if txn is None:
+            return 400, {"status": False, "message": "Transaction reference not found"}
+        status = self.ledger.status(txn)
+        return 200, {"status": True, "message": "Verification successful", "data": {
+            "id": txn["id"],
+            "reference": reference,
+            "status": status,
+            "amount": txn["amount"],
+            "currency": txn["currency"],
+            "channel": txn["channel"],
+            "gateway_response": "Approved" if status == "success" else status.capitalize(),
+        }}
+
+    def handle_list(self, body):
+        def timestamp(value):
+            if not value:
+                return None
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp()
+
+        page = max(1, int(self.query.get("page", 1)))
+        per_page = max(1, int(self.query.get("perPage", 50)))
+        status = self.query.get("status")
+
+        txns = self.ledger.between(timestamp(self.query.get("from")), timestamp(self.query.get("to")))
+        rows = [
+            {
+                "id": t["id"],
+                "reference": t["reference"],
+                "status": self.ledger.status(t),
+                "amount": t["amount"],
+                "currency": t["currency"],
+                "channel": t["channel"],
+                "created_at": datetime.fromtimestamp(t["created_at"], timezone.utc).isoformat(),
+            }
+            for t in txns
+        ]
+        if status:
+            rows = [r for r in rows if r["status"] == status]
+
+        start = (page - 1) * per_page
+        return 200, {
+            "status": True,
+            "message": "Transactions retrieved",
+            "data": rows[start:start + per_page],
+            "meta": {
+                "total": len(rows),
+                "perPage": per_page,
+                "page": page,
+                "pageCount": max(1, -(-len(rows) // per_page)),
+            },
+        }
+
+    # -------- PaySwitch --------
+    def handle_process(self, body):
+        reference = body.get("transaction_id") or uuid.uuid4().hex[:16]
+        txn = self.ledger.create(reference, body.get("amount"), "GHS", "momo")
+        if txn["final_status"] == "failed":
+            return 200, {"status": "declined", "code": "100", "reason": "Transaction declined",
+                         "transaction_id": reference}
+        return 200, {"status": "approved", "code": "000", "reason": "Transaction successful",
+                     "transaction_id": reference}
+
+    def handle_status(self, body, reference):
+        txn = self.ledger.get(reference)
+        if txn is None:
+            return 404, {"status": "not found", "code": "404", "reason": "Transaction not found"}
+        status = self.ledger.status(txn)
+        mapped = {"success": "approved", "failed": "declined"}.get(status, "pending")
+        return 200, {"status": mapped, "code": "000" if mapped == "approved" else "100",
+                     "reason": status, "transaction_id": reference}
+
+
+class FakeGatewayServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, config: GatewayConfig, verbose=False):
+        super().__init__(address, FakeGatewayHandler)
+        self.config = config
+        self.ledger = Ledger(config)
+        self.verbose = verbose
+
+
+def serve(host="127.0.0.1", port=8765, config=None, verbose=False, background=False):
+    """
+    Start the fake gateway. With background=True returns the running server (for scripts/tests).
+    """
+    server = FakeGatewayServer((host, port), config or GatewayConfig(), verbose=verbose)
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+    print(f"Fake gateway listening on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Fake Paystack/PaySwitch gateway")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--config", help="JSON file with any of the options below, or a ussd_replay "
+                                         "scenario (CLI wins)")
+    parser.add_argument("--latency", action="append", default=[], metavar="OP=SPEC",
+                        help="e.g. charge=lognormal:-1.6,0.5 (repeatable)")
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--timeout-rate", type=float)
+    parser.add_argument("--hang-seconds", type=float)
+    parser.add_argument("--otp-rate", type=float)
+    parser.add_argument("--decline-rate", type=float)
+    parser.add_argument("--success-after", type=float)
+    parser.add_argument("--valid-otp")
+    parser.add_argument("--verbose", action="store_true")
+    return parser
+
+
+def config_from_args(args) -> GatewayConfig:
+    options = {}
+    if args.config:
+        with open(args.config) as fh:
+            loaded = json.load(fh)
+        # A ussd_replay scenario carries the gateway options under "gateway"
+        options.update(loaded.get("gateway", loaded))
+
+    latency = dict(options.pop("latency", {}))
+    for item in args.latency:
+        op, _, spec = item.partition("=")
+        latency[op] = spec
+
+    for name in ("error_rate", "timeout_rate", "hang_seconds", "otp_rate",
+                 "decline_rate", "success_after", "valid_otp"):
+        value = getattr(args, name)
+        if value is not None:
+            options[name] = value
+
+    return GatewayConfig(latency=latency, **options)
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    serve(args.host, args.port, config_from_args(args), verbose=args.verbose)
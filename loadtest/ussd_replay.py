@@ -0,0 +1,331 @@
+"""
+Replay scripted multi-hop USSD sessions against /api/ussd/ under load.
+
+Each virtual session dials the channel code, then sends the scenario's hops
+(confirm, OTP, cancel …) as the aggregator would, with think time between
+hops. Thousands of session IDs run concurrently across a thread pool, so
+follow-up hops land on whichever worker the server picks — exactly what the
+shared session store and the channel index have to survive.
+
+Standalone — standard library only, no Django.
+
+Usage:
+    # 1. fake gateway (or pass --gateway-port to start one in this process)
+    python loadtest/fake_gateway.py --port 8765 --config loadtest/scenarios/otp.json
+
+    # 2. the app, pointed at it, with several workers
+    PAYSTACK_BASE_URL=http://127.0.0.1:8765 PAYSWITCH_BASE_URL=http://127.0.0.1:8765 \
+        gunicorn config.wsgi -w 4 --threads 8
+
+    # 3. replay
+    python loadtest/ussd_replay.py loadtest/scenarios/otp.json \
+        --url http://127.0.0.1:8000 --token "$JWT" --code 144 \
+        --output results/otp-$(git rev-parse --short HEAD).json \
+        --baseline results/otp-previous.json
+
+Scenario file (JSON):
+    name, description
+    path          "/api/ussd/" or "/api/async/ussd/"
+    sessions      number of sessions to replay
+    concurrency   sessions in flight at once
+    think_time    latency spec between hops (see fake_gateway.parse_latency)
+    flows         [{"name", "weight", "hops": [{"name", "input", "when"?, "expect"?}]}]
+                  input may contain {code}; a hop with "when" only runs if the
+                  previous reply contains that text; "expect" counts mismatches
+    gateway       fake gateway options, used by --gateway-port and by
+                  fake_gateway.py --config <scenario>
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_gateway import GatewayConfig, parse_latency, serve  # noqa: E402
+
+
+SESSION_EXPIRED = "Session expired"
+
+
+# -----------------------------
+# Scenario
+# -----------------------------
+def load_scenario(path: str) -> dict:
+    with open(path) as fh:
+        scenario = json.load(fh)
+    scenario.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    scenario.setdefault("path", "/api/ussd/")
+    scenario.setdefault("sessions", 1000)
+    scenario.setdefault("concurrency", 100)
+    scenario.setdefault("think_time", "fixed:0")
+    if not scenario.get("flows"):
+        raise ValueError(f"{path}: scenario has no flows")
+    return scenario
+
+
+def pick_flow(flows):
+    return random.choices(flows, weights=[flow.get("weight", 1) for flow in flows])[0]
+
+
+# -----------------------------
+# HTTP (one keep-alive connection per worker thread)
+# -----------------------------
+class UssdClient:
+    def __init__(self, base_url: str, path: str, token: str = None, timeout: float = 30.0):
+        url = urlsplit(base_url)
+        self.https = url.scheme == "https"
+        self.host = url.hostname
+        self.port = url.port or (443 if self.https else 80)
+        self.path = path
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json"}
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = cls(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def post(self, body: dict):
+        """
+        (http_status, json_body or None). Reconnects once if the server closed the keep-alive.
+        """
+        payload = json.dumps(body)
+        for attempt in (1, 2):
+            conn = self._connection()
+            try:
+                conn.request("POST", self.path, payload, self.headers)
+                response = conn.getresponse()
+                raw = response.read()
+            except (http.client.HTTPException, ConnectionError):
+                conn.close()
+                self._local.conn = None
+                if attempt == 2:
+                    raise
+                continue
+            try:
+                return response.status, json.loads(raw)
+            except ValueError:
+                return response.status, None
+
+
+# -----------------------------
+# Results
+# -----------------------------
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = defaultdict(list)      # hop name → [seconds]
+        self.errors = defaultdict(int)        # hop name → transport / HTTP errors
+        self.unexpected = defaultdict(int)    # hop name → replies missing "expect"
+        self.expired = defaultdict(int)       # hop name → "Session expired" replies
+        self.sessions = 0
+        self.completed = 0
+
+    def hop(self, name, seconds, error=False, unexpected=False, expired=False):
+        with self.lock:
+            self.latency[name].append(seconds)
+            self.errors[name] += error
+            self.unexpected[name] += unexpected
+            self.expired[name] += expired
+
+    def session(self, completed: bool):
+        with self.lock:
+            self.sessions += 1
+            self.completed += completed
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * pct // 100))
+    return values[int(rank) - 1]
+
+
+def summarize(results: Results, scenario: dict, elapsed: float) -> dict:
+    hops = {}
+    total_hops = total_expired = 0
+    for name, values in results.latency.items():
+        values = sorted(values)
+        total_hops += len(values)
+        total_expired += results.expired[name]
+        hops[name] = {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+            "errors": results.errors[name],
+            "unexpected": results.unexpected[name],
+            "session_expired": results.expired[name],
+        }
+    return {
+        "scenario": scenario["name"],
+        "path": scenario["path"],
+        "sessions": results.sessions,
+        "completed_sessions": results.completed,
+        "concurrency": scenario["concurrency"],
+        "elapsed_seconds": round(elapsed, 3),
+        "hops_per_second": round(total_hops / elapsed, 2) if elapsed else None,
+        "sessions_per_second": round(results.sessions / elapsed, 2) if elapsed else None,
+        "session_expired_rate": round(total_expired / total_hops, 5) if total_hops else 0.0,
+        "hops": hops,
+    }
+
+
+# -----------------------------
+# Replay
+# -----------------------------
+def run_session(client: UssdClient, scenario: dict, results: Results, think, code: str):
+    flow = pick_flow(scenario["flows"])
+    session_id = uuid.uuid4().hex
+    msisdn = "233" + "".join(random.choices("0123456789", k=9))
+    reply = ""
+    completed = True
+
+    for index, hop in enumerate(flow["hops"]):
+        if hop.get("when") and hop["when"] not in reply:
+            continue
+        if index:
+            time.sleep(think())
+
+        body = {
+            "sessionID": session_id,
+            "msisdn": msisdn,
+            "userData": hop["input"].format(code=code),
+            "network": scenario.get("network", "MTN"),
+            "userID": scenario.get("user_id", "LOADTEST"),
+            "newSession": index == 0,
+        }
+        started = time.perf_counter()
+        try:
+            status, data = client.post(body)
+        except (OSError, http.client.HTTPException):
+            results.hop(hop["name"], time.perf_counter() - started, error=True)
+            completed = False
+            break
+        seconds = time.perf_counter() - started
+
+        reply = (data or {}).get("message") or ""
+        expired = SESSION_EXPIRED in reply
+        results.hop(
+            hop["name"],
+            seconds,
+            error=status != 200 or data is None,
+            unexpected=bool(hop.get("expect")) and hop["expect"] not in reply,
+            expired=expired,
+        )
+        if status != 200 or expired or not (data or {}).get("continueSession", False):
+            completed = completed and status == 200 and not expired
+            break
+
+    results.session(completed)
+
+
+def replay(scenario: dict, base_url: str, token: str = None, code: str = "144") -> dict:
+    client = UssdClient(base_url, scenario["path"], token, timeout=scenario.get("request_timeout", 30))
+    think = parse_latency(scenario["think_time"])
+    results = Results()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=scenario["concurrency"], thread_name_prefix="ussd-replay") as pool:
+        futures = [
+            pool.submit(run_session, client, scenario, results, think, code)
+            for _ in range(scenario["sessions"])
+        ]
+        for future in futures:
+            future.result()
+    return summarize(results, scenario, time.perf_counter() - started)
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+def _delta(current, previous):
+    if previous in (None, 0) or current is None:
+        return ""
+    change = (current - previous) / previous * 100
+    return f" ({change:+.1f}%)"
+
+
+def print_report(summary: dict, baseline: dict = None):
+    baseline_hops = (baseline or {}).get("hops", {})
+    print(f"Scenario {summary['scenario']}  {summary['path']}  "
+          f"{summary['sessions']} sessions @ {summary['concurrency']} concurrent")
+    print(f"  elapsed {summary['elapsed_seconds']}s   "
+          f"{summary['hops_per_second']} hops/s{_delta(summary['hops_per_second'], (baseline or {}).get('hops_per_second'))}   "
+          f"{summary['sessions_per_second']} sessions/s")
+    print(f"  completed sessions {summary['completed_sessions']}/{summary['sessions']}   "
+          f"session-expired rate {summary['session_expired_rate']:.3%}")
+    print(f"  {'hop':<12}{'count':>8}{'p50 ms':>16}{'p95 ms':>16}{'p99 ms':>16}{'errors':>8}{'unexp':>7}{'expired':>9}")
+    for name, hop in summary["hops"].items():
+        previous = baseline_hops.get(name, {})
+        print(
+            f"  {name:<12}{hop['count']:>8}"
+            + "".join(
+                f"{str(hop[key]) + _delta(hop[key], previous.get(key)):>16}"
+                for key in ("p50_ms", "p95_ms", "p99_ms")
+            )
+            + f"{hop['errors']:>8}{hop['unexpected']:>7}{hop['session_expired']:>9}"
+        )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Replay concurrent USSD sessions against /api/ussd/")
+    parser.add_argument("scenario", help="scenario JSON (see loadtest/scenarios/)")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="app base URL")
+    parser.add_argument("--token", default=os.getenv("KIVIPAY_JWT"), help="JWT for the Authorization header")
+    parser.add_argument("--code", default="144", help="USSD code of a ussd-enabled channel")
+    parser.add_argument("--sessions", type=int, help="override the scenario's session count")
+    parser.add_argument("--concurrency", type=int, help="override the scenario's concurrency")
+    parser.add_argument("--path", help="override the scenario's endpoint path")
+    parser.add_argument("--gateway-port", type=int,
+                        help="also start the fake gateway here with the scenario's gateway options")
+    parser.add_argument("--output", help="write the summary as JSON (compare across releases)")
+    parser.add_argument("--baseline", help="earlier --output file to show changes against")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    scenario = load_scenario(args.scenario)
+    for key in ("sessions", "concurrency", "path"):
+        if getattr(args, key) is not None:
+            scenario[key] = getattr(args, key)
+
+    if args.gateway_port:
+        serve(port=args.gateway_port, config=GatewayConfig(**scenario.get("gateway", {})), background=True)
+
+    summary = replay(scenario, args.url, args.token, args.code)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+    print_report(summary, baseline)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as fh:
+            json.dump(summary, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+from django.db import transaction
+from django.db.models import F
+
+from .models import FreeUssdCode, PaymentChannel, UssdCodeCounter
+
+
+# ======================================================
+# USSD CODE ALLOCATOR
+# ======================================================
+# Codes come from two places, lowest first:
+#   1. FreeUssdCode — codes released by deleted channels (and historic gaps);
+#   2. UssdCodeCounter — the high-water mark, bumped for brand-new codes.
+# Free codes are always below the high-water mark, so taking the lowest free
+# code first, then new ones, hands out the lowest unused code. Each step is an
+# indexed seek or a single-row UPDATE, independent of how many channels exist.
+
+COUNTER_ID = 1
+
+
+def _lock_counter():
+    """
+    Take the allocation lock: a no-op UPDATE of the counter row, held until
+    commit. Writing first also stops SQLite from failing a read transaction
+    that later tries to write ("database is locked") — it waits instead.
+    """
+    if not UssdCodeCounter.objects.filter(pk=COUNTER_ID).update(next_code=F("next_code")):
+        UssdCodeCounter.objects.get_or_create(pk=COUNTER_ID)
+
+
+def _take_free(count: int) -> list:
+    codes = list(FreeUssdCode.objects.order_by("code").values_list("code", flat=True)[:count])
+    FreeUssdCode.objects.filter(code__in=codes).delete()
+    return codes
+
+
+def _take_new(count: int) -> list:
+    UssdCodeCounter.objects.filter(pk=COUNTER_ID).update(next_code=F("next_code") + count)
+    end = UssdCodeCounter.objects.values_list("next_code", flat=True).get(pk=COUNTER_ID)
+    return list(range(end - count, end))
+
+
+def reserve_ussd_codes(count: int) -> list:
+    """
+    Reserve `count` unused codes (lowest first) and return them as strings.
+
+    Call inside the transaction that stores them: if it rolls back, so does
+    the reservation. Codes reserved but never stored should be handed back
+    with release_ussd_codes().
+    """
+    if count <= 0:
+        return []
+
+    codes = []
+    with transaction.atomic():
+        _lock_counter()
+        while len(codes) < count:
+            wanted = count - len(codes)
+            batch = _take_free(wanted)
+            if len(batch) < wanted:
+                batch += _take_new(wanted - len(batch))
+
+            # A code set by hand (e.g. imported) may already be in use — skip it, it stays taken
+            in_use = set(
+                PaymentChannel.objects
+                .filter(ussd__in=[str(code) for code in batch])
+                .values_list("ussd", flat=True)
+            )
+            codes += [code for code in batch if str(code) not in in_use]
+    return [str(code) for code in sorted(codes)]
+
+
+def allocate_ussd_code() -> str:
+    return reserve_ussd_codes(1)[0]
+
+
+def release_ussd_codes(codes) -> int:
+    """
+    Return codes to the pool (deleted channels, unused reservations).
+    Non-numeric codes and codes above the high-water mark are ignored.
+    """
+    numbers = {int(code) for code in codes if code and str(code).isdigit()}
+    if not numbers:
+        return 0
+    high_water = (
+        UssdCodeCounter.objects.filter(pk=COUNTER_ID).values_list("next_code", flat=True).first() or 1
+    )
+    free = [FreeUssdCode(code=number) for number in sorted(numbers) if 0 < number < high_water]
+    FreeUssdCode.objects.bulk_create(free, ignore_conflicts=True)
+    return len(free)
@@ -0,0 +1,396 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+
+# -----------------------------
+# Channel index defaults
+# -----------------------------
+# Override any key in settings.PAYMENT_CHANNEL_INDEX.
+DEFAULT_INDEX_SETTINGS = {
+    "TTL_SECONDS": 60,           # backstop expiry of every entry
+    "LOCAL_TTL_SECONDS": 2,      # expiry instead when CACHE is per-process (LocMem): other workers never see a bump
+    "CHECK_SECONDS": 1,          # how often the shared generation counter is polled
+    "CACHE": "default",          # alias holding the generation counter (Redis → cross-process)
+    "WARM_ON_STARTUP": False,    # preload every USSD-enabled channel when the app server starts
+    "MAX_SLUGS": 10000,          # paylink slugs kept per process, least recently used evicted first
+    "NEGATIVE_TTL_SECONDS": 5,   # how long "no such slug" is remembered
+    "LOAD_WAIT_SECONDS": 5,      # how long a miss waits on another thread's load of the same slug
+}
+
+GENERATION_KEY = "paychannel:index:generation"
+
+# Backends that are not shared between worker processes
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+def index_settings() -> dict:
+    return {**DEFAULT_INDEX_SETTINGS, **getattr(settings, "PAYMENT_CHANNEL_INDEX", {})}
+
+
+class ChannelSnapshot(NamedTuple):
+    """
+    The few PaymentChannel fields the USSD flow and payment creation need
+    (user_id stamps the merchant on new payments without a query).
+    """
+
+    id: str
+    name: str
+    slug: str
+    amount: Decimal
+    currency: str
+    ussd: str
+    ussd_enabled: bool
+    paylink_enabled: bool
+    user_id: int
+
+
+SNAPSHOT_FIELDS = (
+    "id", "name", "slug", "amount", "currency", "ussd", "ussd_enabled", "paylink_enabled", "user_id",
+)
+
+# Cached answer for a slug that matched no channel
+MISSING = object()
+
+
+class _Load:
+    """
+    One in-flight slug lookup; concurrent misses for the same slug wait on it.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+        self.snapshot = None
+
+
+# ======================================================
+# INDEX
+# ======================================================
+class ChannelIndex:
+    """
+    Process-local read-through index: USSD code / channel id / paylink slug →
+    ChannelSnapshot.
+
+    Slugs are public, so that map is bounded (LRU, MAX_SLUGS), remembers
+    unknown slugs for NEGATIVE_TTL_SECONDS, and lets only one thread query
+    for a given slug while the others wait for its answer.
+
+    Invalidation:
+    - post_save / post_delete on PaymentChannel and the admin bulk actions drop
+      entries in this process, and again once the transaction commits, when
+      they also bump a generation counter in the shared cache (bumped any
+      earlier, another process could reload the old row and keep it);
+    - other processes poll that counter every CHECK_SECONDS and clear
+      themselves when it moves (needs a shared cache, i.e. REDIS_URL);
+    - entries also expire after TTL_SECONDS as a backstop — after only
+      LOCAL_TTL_SECONDS when the counter lives in a per-process cache.
+    Unknown codes are never cached; unknown slugs are dropped when a channel
+    with that slug is saved.
+    """
+
+    def __init__(self, config: dict = None):
+        self.config = config or index_settings()
+        self.cache = caches[self.config["CACHE"]]
+        # Without a shared counter, short expiry is the only way other workers catch up
+        self.ttl = self.config["TTL_SECONDS"]
+        if isinstance(self.cache, PROCESS_LOCAL_CACHES):
+            self.ttl = min(self.ttl, self.config["LOCAL_TTL_SECONDS"])
+        self._by_code = {}
+        self._by_id = {}
+        self._by_slug = OrderedDict()
+        self._slug_of = {}  # channel id → slug, for slug entries only
+        self._loads = {}
+        self._lock = threading.Lock()
+        # Bumped on every invalidation: a load that started before one doesn't cache its result
+        self._epoch = 0
+        self._generation = None
+        self._checked_at = 0.0
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+    def _fresh(self, entry):
+        if entry is None:
+            return None
+        expires_at, snapshot = entry
+        return snapshot if expires_at > time.monotonic() else None
+
+    def peek_code(self, code):
+        self._check_generation()
+        return self._fresh(self._by_code.get(code))
+
+    def peek_id(self, channel_id):
+        self._check_generation()
+        return self._fresh(self._by_id.get(str(channel_id)))
+
+    def by_code(self, code):
+        """
+        Snapshot for a USSD code (enabled or not), or None if no such channel.
+        """
+        return self.peek_code(code) or self._load(ussd=code)
+
+    def by_id(self, channel_id):
+        return self.peek_id(channel_id) or self._load(id=channel_id)
+
+    async def aby_code(self, code):
+        return self.peek_code(code) or await sync_to_async(self._load)(ussd=code)
+
+    async def aby_id(self, channel_id):
+        return self.peek_id(channel_id) or await sync_to_async(self._load)(id=channel_id)
+
+    def peek_slug(self, slug):
+        """
+        Snapshot, MISSING (known not to exist) or None (not cached).
+        """
+        self._check_generation()
+        with self._lock:
+            entry = self._by_slug.get(slug)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop_slug(slug)
+                return None
+            self._by_slug.move_to_end(slug)
+            return entry[1]
+
+    def by_slug(self, slug):
+        """
+        Snapshot for a paylink slug, or None if no such channel.
+        """
+        snapshot = self.peek_slug(slug)
+        if snapshot is None:
+            snapshot = self._load_slug(slug)
+        return None if snapshot is MISSING else snapshot
+
+    async def aby_slug(self, slug):
+        snapshot = self.peek_slug(slug)
+        if snapshot is None:
+            snapshot = await sync_to_async(self._load_slug)(slug)
+        return None if snapshot is MISSING else snapshot
+
+    # -----------------------------
+    # Loading
+    # -----------------------------
+    def _fetch(self, **lookup):
+        from .models import PaymentChannel
+
+        row = PaymentChannel.objects.filter(**lookup).values(*SNAPSHOT_FIELDS).first()
+        if row is None:
+            return None
+        return ChannelSnapshot(**{**row, "id": str(row["id"])})
+
+    def _load(self, **lookup):
+        epoch = self._epoch
+        snapshot = self._fetch(**lookup)
+        if snapshot is not None:
+            self._put(snapshot, epoch)
+        return snapshot
+
+    def _put(self, snapshot, epoch=None):
+        entry = (time.monotonic() + self.ttl, snapshot)
+        with self._lock:
+            if epoch is not None and epoch != self._epoch:
+                return
+            self._by_id[snapshot.id] = entry
+            if snapshot.ussd:
+                self._by_code[snapshot.ussd] = entry
+
+    def _load_slug(self, slug):
+        """
+        Query for a slug once, however many threads miss on it at the same time.
+        """
+        with self._lock:
+            load = self._loads.get(slug)
+            leader = load is None
+            if leader:
+                load = self._loads[slug] = _Load()
+                epoch = self._epoch
+
+        if not leader:
+            if load.done.wait(self.config["LOAD_WAIT_SECONDS"]) and load.ok:
+                return load.snapshot
+            # The leader failed or is stuck — look it up ourselves, uncached
+            return self._fetch(slug=slug) or MISSING
+
+        try:
+            load.snapshot = self._fetch(slug=slug) or MISSING
+            load.ok = True
+            self._put_slug(slug, load.snapshot, epoch)
+            return load.snapshot
+        finally:
+            with self._lock:
+                self._loads.pop(slug, None)
+            load.done.set()
+
+    def _put_slug(self, slug, snapshot, epoch):
+        ttl = self.config["NEGATIVE_TTL_SECONDS"] if snapshot is MISSING else self.ttl
+        with self._lock:
+            if epoch != self._epoch:
+                return
+            self._drop_slug(slug)
+            self._by_slug[slug] = (time.monotonic() + ttl, snapshot)
+            if snapshot is not MISSING:
+                self._slug_of[snapshot.id] = slug
+            while len(self._by_slug) > self.config["MAX_SLUGS"]:
+                self._drop_slug(next(iter(self._by_slug)))
+
+    def _drop_slug(self, slug):
+        # Caller holds self._lock
+        entry = self._by_slug.pop(slug, None)
+        if entry is not None and entry[1] is not MISSING:
+            self._slug_of.pop(entry[1].id, None)
+
+    def warm(self) -> int:
+        """
+        Preload every USSD-enabled channel in one query. Returns the count.
+        """
+        from .models import PaymentChannel
+
+        # Adopt the current generation first so the next lookup doesn't discard the warm-up
+        self._generation = self.cache.get(GENERATION_KEY)
+        self._checked_at = time.monotonic()
+        rows = (
+            PaymentChannel.objects
+            .filter(ussd_enabled=True)
+            .exclude(ussd__isnull=True)
+            .values(*SNAPSHOT_FIELDS)
+        )
+        count = 0
+        epoch = self._epoch
+        for row in rows.iterator(chunk_size=2000):
+            self._put(ChannelSnapshot(**{**row, "id": str(row["id"])}), epoch)
+            count += 1
+        return count
+
+    # -----------------------------
+    # Invalidation
+    # -----------------------------
+    def invalidate(self, channel_id=None, code=None, slug=None):
+        """
+        Drop one channel (by id, code and/or slug) here and signal other processes.
+        Dropping a slug also forgets that it didn't exist.
+
+        Inside a transaction the drop is repeated and the signal sent on
+        commit: until then any reader still sees the old row.
+        """
+        self._drop(channel_id, code, slug)
+
+        def committed():
+            self._drop(channel_id, code, slug)
+            self._bump_generation()
+
+        transaction.on_commit(committed)
+
+    def _drop(self, channel_id=None, code=None, slug=None):
+        with self._lock:
+            self._epoch += 1
+            entry = self._by_id.pop(str(channel_id), None) if channel_id is not None else None
+            if entry is not None and entry[1].ussd:
+                self._by_code.pop(entry[1].ussd, None)
+            if code is not None:
+                entry = self._by_code.pop(code, None)
+                if entry is not None:
+                    self._by_id.pop(entry[1].id, None)
+            if channel_id is not None and str(channel_id) in self._slug_of:
+                # Covers a renamed slug: the entry under the old one goes too
+                self._drop_slug(self._slug_of[str(channel_id)])
+            if slug is not None:
+                self._drop_slug(slug)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+        def committed():
+            with self._lock:
+                self._clear()
+            self._bump_generation()
+
+        transaction.on_commit(committed)
+
+    def _clear(self):
+        # Caller holds self._lock
+        self._epoch += 1
+        self._by_code.clear()
+        self._by_id.clear()
+        self._by_slug.clear()
+        self._slug_of.clear()
+
+    def _bump_generation(self):
+        try:
+            self.cache.add(GENERATION_KEY, 0, None)
+            self._generation = self.cache.incr(GENERATION_KEY)
+        except ValueError:
+            # Key evicted between add and incr — the next check clears everyone anyway
+            self._generation = None
+
+    def _check_generation(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.config["CHECK_SECONDS"]:
+            return
+        self._checked_at = now
+        generation = self.cache.get(GENERATION_KEY)
+        if generation != self._generation:
+            with self._lock:
+                self._clear()
+            self._generation = generation
+
+
+# -----------------------------
+# Process-wide index
+# -----------------------------
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_channel_index() -> ChannelIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ChannelIndex()
+    return _index
+
+
+def warm_channel_index() -> int:
+    return get_channel_index().warm()
+
+
+def warm_on_startup():
+    """
+    Called from wsgi.py / asgi.py. A missing or unmigrated database must not
+    stop the server from booting, so failures just leave the index cold.
+    """
+    if not index_settings()["WARM_ON_STARTUP"]:
+        return
+    from django.db import DatabaseError
+
+    try:
+        warm_channel_index()
+    except DatabaseError:
+        pass
+
+
+def _reset_after_fork():
+    global _index_lock
+    # Keep entries warmed in a preloading master; only the locks are unsafe to inherit
+    _index_lock = threading.Lock()
+    if _index is not None:
+        _index._lock = threading.Lock()
+        # Loads in flight in the parent's other threads never finish here
+        _index._loads = {}
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
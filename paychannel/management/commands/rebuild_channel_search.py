@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from paychannel.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the channel search index (SQLite FTS5) from the channel table."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        indexed = backend.rebuild()
+        self.stdout.write(f"backend={backend.name} indexed={indexed}")
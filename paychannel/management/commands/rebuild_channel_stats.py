@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from paychannel.models import PaymentChannel
+from paychannel.stats import rebuild_channel_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute per-channel payment totals (ChannelPaymentStats) from the payment table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--channel", action="append", default=[], metavar="SLUG",
+                            help="Only this channel (repeatable); default all")
+
+    def handle(self, *args, **options):
+        channel_ids = None
+        if options["channel"]:
+            channel_ids = list(
+                PaymentChannel.objects.filter(slug__in=options["channel"]).values_list("pk", flat=True)
+            )
+            if len(channel_ids) != len(set(options["channel"])):
+                raise CommandError("Unknown channel slug")
+
+        rebuilt = rebuild_channel_stats(channel_ids)
+        self.stdout.write(f"rebuilt={rebuilt}")
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.27 on 2026-10-16 23:17
+
+from django.db import migrations, models
+
+
+def seed_allocator(apps, schema_editor):
+    """
+    One-off scan of existing codes: high-water mark = max + 1, gaps go to the free list.
+    """
+    PaymentChannel = apps.get_model("paychannel", "PaymentChannel")
+    UssdCodeCounter = apps.get_model("paychannel", "UssdCodeCounter")
+    FreeUssdCode = apps.get_model("paychannel", "FreeUssdCode")
+
+    used = {
+        int(code)
+        for code in PaymentChannel.objects.exclude(ussd__isnull=True).values_list("ussd", flat=True)
+        if code.isdigit()
+    }
+    high_water = max(used, default=0) + 1
+    UssdCodeCounter.objects.create(id=1, next_code=high_water)
+    FreeUssdCode.objects.bulk_create(
+        (FreeUssdCode(code=code) for code in range(1, high_water) if code not in used),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paychannel', '0002_alter_paymentchannel_id_alter_paymentchannel_ussd'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FreeUssdCode',
+            fields=[
+                ('code', models.PositiveIntegerField(primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UssdCodeCounter',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('next_code', models.PositiveIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(seed_allocator, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.27 on 2026-10-16 23:20
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+import django.db.models.deletion
+
+
+def seed_stats(apps, schema_editor):
+    """
+    Initial totals from the existing payments, one grouped query.
+    """
+    Payment = apps.get_model("payment", "Payment")
+    ChannelPaymentStats = apps.get_model("paychannel", "ChannelPaymentStats")
+
+    success = Q(status="success")
+    rows = (
+        Payment.objects.values("channel_id").order_by().annotate(
+            payments_count=Count("id"),
+            pending_count=Count("id", filter=Q(status="pending")),
+            success_count=Count("id", filter=success),
+            failed_count=Count("id", filter=Q(status="failed")),
+            abandoned_count=Count("id", filter=Q(status="abandoned")),
+            reversed_count=Count("id", filter=Q(status="reversed")),
+            paylink_count=Count("id", filter=Q(channel_type="paylink")),
+            ussd_count=Count("id", filter=Q(channel_type="ussd")),
+            success_amount=Sum("amount", filter=success),
+            paylink_success_amount=Sum("amount", filter=success & Q(channel_type="paylink")),
+            ussd_success_amount=Sum("amount", filter=success & Q(channel_type="ussd")),
+            last_payment_at=Max("created_at"),
+        )
+    )
+    ChannelPaymentStats.objects.bulk_create(
+        (
+            ChannelPaymentStats(**{
+                key: (value or 0) if key.endswith(("_count", "_amount")) else value
+                for key, value in row.items()
+            })
+            for row in rows
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paychannel', '0003_ussd_code_allocator'),
+        ('payment', '0008_chargeoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChannelPaymentStats',
+            fields=[
+                ('channel', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='paychannel.paymentchannel')),
+                ('payments_count', models.IntegerField(default=0)),
+                ('pending_count', models.IntegerField(default=0)),
+                ('success_count', models.IntegerField(default=0)),
+                ('failed_count', models.IntegerField(default=0)),
+                ('abandoned_count', models.IntegerField(default=0)),
+                ('reversed_count', models.IntegerField(default=0)),
+                ('paylink_count', models.IntegerField(default=0)),
+                ('ussd_count', models.IntegerField(default=0)),
+                ('success_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('paylink_success_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ussd_success_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('last_payment_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(seed_stats, migrations.RunPython.noop),
+    ]
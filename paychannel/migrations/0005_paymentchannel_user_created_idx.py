@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-16 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paychannel', '0004_channelpaymentstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymentchannel',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='paychannel_user_created_idx'),
+        ),
+    ]
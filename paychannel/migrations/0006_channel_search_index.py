@@ -0,0 +1,72 @@
+from django.db import DatabaseError, migrations
+
+
+FTS_TABLE = "paychannel_search"
+COLUMNS = ("name", "slug", "ussd", "paylink", "email", "phone")
+
+# PostgreSQL: pg_trgm GIN indexes matching Django's icontains SQL, UPPER(col::text) LIKE UPPER(%s)
+TRIGRAM_INDEXES = (
+    ("paychannel_name_trgm", "paychannel_paymentchannel", "name"),
+    ("paychannel_slug_trgm", "paychannel_paymentchannel", "slug"),
+    ("paychannel_ussd_trgm", "paychannel_paymentchannel", "ussd"),
+    ("paychannel_paylink_trgm", "paychannel_paymentchannel", "paylink"),
+    ("paychannel_user_email_trgm", "authentications_customuser", "email"),
+    ("paychannel_user_phone_trgm", "authentications_customuser", "phone_number"),
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for name, table, column in TRIGRAM_INDEXES:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+            )
+        return
+    if vendor != "sqlite":
+        return
+
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"channel_id UNINDEXED, {', '.join(COLUMNS)}, tokenize='trigram')"
+        )
+    except DatabaseError:
+        # SQLite built without FTS5 / older than 3.34 — search falls back to LIKE
+        return
+
+    PaymentChannel = apps.get_model("paychannel", "PaymentChannel")
+    rows = PaymentChannel.objects.values_list(
+        "id", "name", "slug", "ussd", "paylink", "user__email", "user__phone_number"
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, channel_id, {', '.join(COLUMNS)}) "
+            f"VALUES ({', '.join(['%s'] * (len(COLUMNS) + 2))})",
+            [
+                (channel_id.int >> 65, channel_id.hex, *[field or "" for field in fields])
+                for channel_id, *fields in rows.iterator(chunk_size=2000)
+            ],
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for name, _, _ in TRIGRAM_INDEXES:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+    elif vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentications', '0001_initial'),
+        ('paychannel', '0005_paymentchannel_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 import uuid
 from django.utils.text import slugify
 
@@ -27,13 +27,22 @@ class PaymentChannel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # A merchant's channels newest first; keyset pages seek on (created_at, id)
+            models.Index(fields=["user", "created_at", "id"], name="paychannel_user_created_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(f"{self.name}-{uuid.uuid4().hex[:6]}")
-        if not self.ussd:
+        if self.ussd:
+            return super().save(*args, **kwargs)
+
+        # Allocate in the same transaction as the insert so a failed save hands the code back
+        with transaction.atomic():
             self.ussd = generate_ussd_code()
-    
-        super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
 
     def __str__(self):
         methods = []
@@ -47,26 +56,69 @@ class PaymentChannel(models.Model):
     
 def generate_ussd_code():
     """
-    Generate the lowest available unique USSD code for PaymentChannel.
-    Starts from 1 and fills any gaps in existing codes.
-    Returns the code as a string.
+    Lowest free USSD code, as a string. See paychannel/codes.py.
+    """
+    from .codes import allocate_ussd_code
+
+    return allocate_ussd_code()
+
+
+# -----------------------------
+# USSD code allocation
+# -----------------------------
+class UssdCodeCounter(models.Model):
+    """
+    Single-row high-water mark: every code below next_code has been handed
+    out at some point. Updating it is the allocation lock.
     """
-    existing_codes = (
-        PaymentChannel.objects.exclude(ussd__isnull=True)
-        .exclude(ussd__exact="")
-        .values_list("ussd", flat=True)
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    next_code = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"next USSD code {self.next_code}"
+
+
+class FreeUssdCode(models.Model):
+    """
+    Codes below the high-water mark that are free again (deleted channels,
+    historic gaps). The primary-key index makes "lowest free" one seek.
+    """
+    code = models.PositiveIntegerField(primary_key=True)
+
+    def __str__(self):
+        return str(self.code)
+
+
+class ChannelPaymentStats(models.Model):
+    """
+    Running payment totals for one channel, updated in the same transaction
+    as every Payment insert, status change and delete (paychannel/stats.py).
+    Recompute with `manage.py rebuild_channel_stats`.
+    """
+    channel = models.OneToOneField(
+        PaymentChannel, on_delete=models.CASCADE, primary_key=True, related_name="stats"
     )
 
-    # Convert existing codes to a set of integers
-    existing_codes_set = set()
-    for code in existing_codes:
-        if code.isdigit():
-            existing_codes_set.add(int(code))
+    payments_count = models.IntegerField(default=0)
+
+    # By status
+    pending_count = models.IntegerField(default=0)
+    success_count = models.IntegerField(default=0)
+    failed_count = models.IntegerField(default=0)
+    abandoned_count = models.IntegerField(default=0)
+    reversed_count = models.IntegerField(default=0)
 
-    # Find the smallest available number starting from 1
-    code = 1
-    while code in existing_codes_set:
-        code += 1
+    # By channel type
+    paylink_count = models.IntegerField(default=0)
+    ussd_count = models.IntegerField(default=0)
 
-    return str(code)
+    # Successful payments only
+    success_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paylink_success_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ussd_success_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
 
+    last_payment_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.channel_id}: {self.payments_count} payments"
@@ -0,0 +1,246 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# ======================================================
+# KEYSET (CURSOR) PAGINATION
+# ======================================================
+# A page is "the next N rows after this one" in the list's ordering, with the
+# primary key appended as a tie-breaker: WHERE (created_at, id) < (:c, :i)
+# ORDER BY created_at DESC, id DESC LIMIT N+1. With an index on the filter
+# and ordering columns that is one index seek per page, however deep — no
+# OFFSET scan and no COUNT(*) unless the client asks for one.
+#
+# The cursor is opaque (base64 JSON): the ordering it was issued for, the
+# boundary row's values, and the direction. Ordering fields must be
+# non-null columns on the model or annotations.
+
+class KeysetPagination:
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, page_size: int, default_ordering=("-created_at",)):
+        self.page_size = page_size
+        self.default_ordering = tuple(default_ordering)
+
+    # -----------------------------
+    # Ordering
+    # -----------------------------
+    def get_ordering(self, queryset) -> list:
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        ordering = ordering or list(self.default_ordering)
+        pk = queryset.model._meta.pk.name
+        if not any(field.lstrip("-") in (pk, "pk") for field in ordering):
+            # Same direction as the leading field, so one index serves the whole ORDER BY
+            ordering.append(f"-{pk}" if ordering[0].startswith("-") else pk)
+        return ordering
+
+    @staticmethod
+    def _flip(ordering) -> list:
+        return [field[1:] if field.startswith("-") else f"-{field}" for field in ordering]
+
+    @staticmethod
+    def _after(ordering, values) -> Q:
+        """
+        Rows strictly after `values` in `ordering`:
+        (a > x) OR (a = x AND b > y) OR … with each comparison following its field's direction.
+        """
+        condition = Q()
+        for position, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            step = Q(**{f"{name}__{lookup}": values[position]})
+            for earlier, value in zip(ordering[:position], values):
+                step &= Q(**{earlier.lstrip("-"): value})
+            condition |= step
+        # Redundant bound on the leading column: the OR alone hides the range from the planner,
+        # which then seeks only on the equality prefix and filters every earlier row
+        leading = ordering[0].lstrip("-")
+        bound = "lte" if ordering[0].startswith("-") else "gte"
+        return Q(**{f"{leading}__{bound}": values[0]}) & condition
+
+    # -----------------------------
+    # Cursor encoding
+    # -----------------------------
+    def encode_cursor(self, ordering, values, reverse: bool) -> str:
+        payload = {"o": ",".join(ordering), "v": [_json_value(value) for value in values], "r": int(reverse)}
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, request, queryset, ordering):
+        """
+        (values, reverse) from the request's cursor, or None on the first page.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+            payload = json.loads(raw)
+            # A cursor only means something in the ordering it was issued for
+            if payload["o"] != ",".join(ordering) or len(payload["v"]) != len(ordering):
+                raise ValueError
+            opts = queryset.model._meta
+            names = [field.lstrip("-") for field in ordering]
+            values = [
+                # Annotations (e.g. search_rank) round-trip as plain JSON values
+                value if name in queryset.query.annotations
+                else opts.get_field(opts.pk.name if name == "pk" else name).to_python(value)
+                for name, value in zip(names, payload["v"])
+            ]
+            return values, bool(payload.get("r"))
+        except (ValueError, TypeError, KeyError, FieldDoesNotExist, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    # -----------------------------
+    # Paging
+    # -----------------------------
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = self.get_ordering(queryset)
+        cursor = self.decode_cursor(request, queryset, ordering)
+        reverse = bool(cursor and cursor[1])
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, "").lower() in ("1", "true", "yes"):
+            self.count = queryset.count()
+
+        if reverse:
+            page = queryset.order_by(*self._flip(ordering)).filter(self._after(self._flip(ordering), cursor[0]))
+        else:
+            page = queryset.order_by(*ordering)
+            if cursor:
+                page = page.filter(self._after(ordering, cursor[0]))
+
+        rows = list(page[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        fields = [field.lstrip("-") for field in ordering]
+        first = [getattr(rows[0], field) for field in fields] if rows else None
+        last = [getattr(rows[-1], field) for field in fields] if rows else None
+
+        self.next_cursor = self.previous_cursor = None
+        if reverse:
+            # We came back from a later page, so there is always a next one
+            self.next_cursor = self.encode_cursor(ordering, last or cursor[0], reverse=False)
+            if has_more and rows:
+                self.previous_cursor = self.encode_cursor(ordering, first, reverse=True)
+        else:
+            if has_more:
+                self.next_cursor = self.encode_cursor(ordering, last, reverse=False)
+            if cursor:
+                self.previous_cursor = self.encode_cursor(ordering, first or cursor[0], reverse=True)
+        return rows
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), "page")
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        body = {"next": self._link(self.next_cursor), "previous": self._link(self.previous_cursor)}
+        if self.count is not None:
+            body["count"] = self.count
+        body["results"] = data
+        return Response(body)
+
+
+def _json_value(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+# -----------------------------
+# Page numbers by default, keyset on request
+# -----------------------------
+class PageOrKeysetPagination(PageNumberPagination):
+    """
+    PageNumberPagination unless the client asks for cursors with
+    ?pagination=cursor (or follows a `cursor` link); `count=true` adds the
+    total to a cursor page.
+    """
+
+    mode_query_param = "pagination"
+    default_ordering = ("-created_at",)
+
+    def wants_keyset(self, request) -> bool:
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if not self.wants_keyset(request):
+            return super().paginate_queryset(queryset, request, view)
+        ordering = getattr(view, "ordering", None) or self.default_ordering
+        self.keyset = KeysetPagination(self.get_page_size(request), ordering)
+        return self.keyset.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class KeysetCursorPagination(PageOrKeysetPagination):
+    """
+    Keyset pages only — for lists too large for page numbers to be sensible.
+    """
+
+    def wants_keyset(self, request) -> bool:
+        return True
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "count": {"type": "integer", "description": f"Only with ?{KeysetPagination.count_query_param}=true"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        parameters = [
+            {
+                "name": KeysetPagination.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Cursor from a previous next/previous link",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": KeysetPagination.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Include the total count (one extra COUNT query)",
+                "schema": {"type": "boolean"},
+            },
+        ]
+        if self.page_size_query_param:
+            parameters.append({
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Items per page",
+                "schema": {"type": "integer"},
+            })
+        return parameters
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import threading
+from functools import lru_cache
+from typing import NamedTuple
+
+from django.conf import settings
+
+from .index import get_channel_index
+
+
+# -----------------------------
+# Paylink resolution defaults
+# -----------------------------
+# Override any key in settings.PAYLINK_CACHE.
+DEFAULT_PAYLINK_SETTINGS = {
+    "MAX_AGE_SECONDS": 30,                  # browsers / CDNs serve without asking for this long
+    "STALE_WHILE_REVALIDATE_SECONDS": 300,  # …then serve stale while refetching in the background
+    "STALE_IF_ERROR_SECONDS": 86400,        # …or while we are down
+    "NOT_FOUND_MAX_AGE_SECONDS": 10,        # unknown slugs, so a typo'd link can't pin a 404 for long
+    "PAYLOADS": 10000,                      # rendered payloads kept per process
+}
+
+
+def paylink_settings() -> dict:
+    return {**DEFAULT_PAYLINK_SETTINGS, **getattr(settings, "PAYLINK_CACHE", {})}
+
+
+class PaylinkPayload(NamedTuple):
+    body: bytes
+    etag: str
+
+
+# ======================================================
+# PAYLOADS
+# ======================================================
+# What a payer's page needs, rendered once per channel version: snapshots
+# are immutable, so a changed channel is a new snapshot and a new payload.
+def render_payload(snapshot) -> PaylinkPayload:
+    body = json.dumps(
+        {
+            "slug": snapshot.slug,
+            "name": snapshot.name,
+            "amount": f"{snapshot.amount:.2f}",
+            "currency": snapshot.currency,
+            "methods": {
+                "paylink": snapshot.paylink_enabled,
+                "ussd": bool(snapshot.ussd_enabled and snapshot.ussd),
+            },
+            "ussd": snapshot.ussd if snapshot.ussd_enabled else None,
+        },
+        separators=(",", ":"),
+        sort_keys=True,
+    ).encode()
+    # Strong validator: same bytes, same tag, in every process
+    return PaylinkPayload(body, '"%s"' % hashlib.sha256(body).hexdigest()[:32])
+
+
+_render = None
+_render_lock = threading.Lock()
+
+
+def paylink_payload(snapshot) -> PaylinkPayload:
+    global _render
+    if _render is None:
+        with _render_lock:
+            if _render is None:
+                _render = lru_cache(maxsize=paylink_settings()["PAYLOADS"])(render_payload)
+    return _render(snapshot)
+
+
+def resolve_paylink(slug):
+    """
+    Payload for a slug, or None if no such channel. No query on a warm hit.
+    """
+    snapshot = get_channel_index().by_slug(slug)
+    return None if snapshot is None else paylink_payload(snapshot)
+
+
+def refresh_paylink(slug):
+    """
+    Drop the slug's cached snapshot and render the current channel straight
+    away — run after the commit that changed it.
+    """
+    get_channel_index().invalidate(slug=slug)
+    return resolve_paylink(slug)
+
+
+# -----------------------------
+# HTTP caching
+# -----------------------------
+def cache_control(found: bool = True) -> str:
+    config = paylink_settings()
+    if not found:
+        return f"public, max-age={config['NOT_FOUND_MAX_AGE_SECONDS']}"
+    return (
+        f"public, max-age={config['MAX_AGE_SECONDS']}, "
+        f"stale-while-revalidate={config['STALE_WHILE_REVALIDATE_SECONDS']}, "
+        f"stale-if-error={config['STALE_IF_ERROR_SECONDS']}"
+    )
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    If-None-Match uses the weak comparison: W/"x" matches "x".
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
@@ -0,0 +1,241 @@
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter, search_smart_split
+
+
+# -----------------------------
+# Search defaults
+# -----------------------------
+# Override any key in settings.PAYMENT_CHANNEL_SEARCH.
+DEFAULT_SEARCH_SETTINGS = {
+    "BACKEND": "auto",  # "auto" (FTS5 on SQLite when the table exists), "fts5" or "like"
+}
+
+FTS_TABLE = "paychannel_search"
+
+# Searchable columns, as (FTS5 column, ORM lookup path)
+SEARCH_FIELDS = (
+    ("name", "name"),
+    ("slug", "slug"),
+    ("ussd", "ussd"),
+    ("paylink", "paylink"),
+    ("email", "user__email"),
+    ("phone", "user__phone_number"),
+)
+
+# The trigram tokenizer indexes 3-character sequences; shorter terms can't use it
+MIN_FTS_TERM = 3
+
+
+def search_settings() -> dict:
+    return {**DEFAULT_SEARCH_SETTINGS, **getattr(settings, "PAYMENT_CHANNEL_SEARCH", {})}
+
+
+def search_rank(query: str):
+    """
+    Cheap relevance for matched rows: exact name, name prefix, name substring, other field.
+    """
+    return Case(
+        When(name__iexact=query, then=Value(0)),
+        When(name__istartswith=query, then=Value(1)),
+        When(name__icontains=query, then=Value(2)),
+        default=Value(3),
+        output_field=IntegerField(),
+    )
+
+
+# ======================================================
+# BACKENDS
+# ======================================================
+class LikeSearch:
+    """
+    Every term must appear (case-insensitively) in one of the searched
+    fields — ORM paths from SEARCH_FIELDS, all of them by default.
+
+    On PostgreSQL the pg_trgm GIN indexes from migration 0006 serve these
+    UPPER(col) LIKE '%term%' filters; elsewhere they scan. Nothing to sync.
+    """
+
+    name = "like"
+
+    def term_filter(self, term, fields) -> Q:
+        condition = Q()
+        for path in fields:
+            condition |= Q(**{f"{path}__icontains": term})
+        return condition
+
+    def filter(self, queryset, terms, fields):
+        for term in terms:
+            queryset = queryset.filter(self.term_filter(term, fields))
+        return queryset
+
+    def search(self, queryset, terms, fields=None):
+        """
+        `queryset` narrowed to channels matching every term, annotated with search_rank (lower is better).
+        """
+        terms = [term for term in terms if term]
+        if not terms:
+            return queryset
+        fields = list(fields or [path for _, path in SEARCH_FIELDS])
+        unknown = set(fields) - {path for _, path in SEARCH_FIELDS}
+        if unknown:
+            raise ValueError(f"Not searchable: {', '.join(sorted(unknown))}")
+        return self.filter(queryset, terms, fields).annotate(search_rank=search_rank(" ".join(terms)))
+
+    def index(self, channel_ids):
+        pass
+
+    def remove(self, channel_ids):
+        pass
+
+    def rebuild(self) -> int:
+        return 0
+
+
+class Fts5Search(LikeSearch):
+    """
+    SQLite FTS5 table (trigram tokenizer, so substrings match like icontains)
+    with one row per channel, keyed by a rowid derived from the channel's UUID.
+    Kept in step by the post_save / post_delete receivers in signals.py.
+    """
+
+    name = "fts5"
+
+    @staticmethod
+    def rowid(channel_id) -> int:
+        value = channel_id if isinstance(channel_id, uuid.UUID) else uuid.UUID(str(channel_id))
+        # Top 63 bits: a positive SQLite integer that stays put across VACUUM
+        return value.int >> 65
+
+    @staticmethod
+    def phrase(term) -> str:
+        return '"' + term.replace('"', '""') + '"'
+
+    def filter(self, queryset, terms, fields):
+        long_terms = [term for term in terms if len(term) >= MIN_FTS_TERM]
+        if long_terms:
+            columns = " ".join(column for column, path in SEARCH_FIELDS if path in fields)
+            match = "{%s} : (%s)" % (columns, " AND ".join(self.phrase(term) for term in long_terms))
+            queryset = queryset.filter(
+                id__in=RawSQL(f"SELECT channel_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+            )
+        # Short terms narrow the (already indexed) matches with LIKE
+        return super().filter(queryset, [term for term in terms if len(term) < MIN_FTS_TERM], fields)
+
+    def _rows(self, channels):
+        from .models import PaymentChannel
+
+        values = ["id"] + [path for _, path in SEARCH_FIELDS]
+        for row in PaymentChannel.objects.filter(channels).values_list(*values).iterator(chunk_size=2000):
+            channel_id, *fields = row
+            yield (self.rowid(channel_id), channel_id.hex, *[field or "" for field in fields])
+
+    def _write(self, cursor, rows):
+        columns = ", ".join(column for column, _ in SEARCH_FIELDS)
+        placeholders = ", ".join(["%s"] * (len(SEARCH_FIELDS) + 2))
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, channel_id, {columns}) VALUES ({placeholders})", rows
+        )
+
+    def index(self, channel_ids):
+        """
+        (Re)index these channels — call inside the transaction that saved them.
+        """
+        channel_ids = list(channel_ids)
+        if not channel_ids:
+            return
+        rows = list(self._rows(Q(pk__in=channel_ids)))
+        with connection.cursor() as cursor:
+            self._delete(cursor, channel_ids)
+            self._write(cursor, rows)
+
+    def remove(self, channel_ids):
+        with connection.cursor() as cursor:
+            self._delete(cursor, channel_ids)
+
+    def _delete(self, cursor, channel_ids):
+        cursor.executemany(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(self.rowid(pk),) for pk in channel_ids]
+        )
+
+    def rebuild(self) -> int:
+        count = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            batch = []
+            for row in self._rows(Q()):
+                batch.append(row)
+                if len(batch) == 2000:
+                    self._write(cursor, batch)
+                    count, batch = count + len(batch), []
+            self._write(cursor, batch)
+        return count + len(batch)
+
+
+# -----------------------------
+# Process-wide backend
+# -----------------------------
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _fts_available() -> bool:
+    if connection.vendor != "sqlite":
+        return False
+    try:
+        return FTS_TABLE in connection.introspection.table_names()
+    except DatabaseError:
+        return False
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                choice = search_settings()["BACKEND"]
+                if choice == "auto":
+                    choice = "fts5" if _fts_available() else "like"
+                _backend = Fts5Search() if choice == "fts5" else LikeSearch()
+    return _backend
+
+
+def reset_search_backend():
+    global _backend
+    _backend = None
+
+
+def search_channels(queryset, query, fields=None):
+    """
+    Filter `queryset` by a search string (whitespace-separated terms, quotes
+    keep phrases together), annotated with search_rank.
+    """
+    return get_search_backend().search(queryset, search_smart_split(query), fields)
+
+
+# -----------------------------
+# DRF filter backend
+# -----------------------------
+class ChannelSearchFilter(SearchFilter):
+    """
+    ?search= over the view's search_fields through the channel search
+    backend. Results come best match first unless the client picked an
+    ?ordering= — list it after OrderingFilter in filter_backends so the rank
+    goes in front.
+    """
+
+    ordering_param = "ordering"
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        queryset = get_search_backend().search(queryset, terms, self.get_search_fields(view, request))
+        if request.query_params.get(self.ordering_param):
+            return queryset
+        return queryset.order_by("search_rank", *queryset.query.order_by)
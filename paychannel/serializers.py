@@ -1,6 +1,6 @@
 from rest_framework import serializers
-from .models import PaymentChannel
-from django.db.models import Sum
+from drf_spectacular.utils import extend_schema_field
+from .models import ChannelPaymentStats, PaymentChannel
 from decimal import Decimal
 
 
@@ -65,25 +65,71 @@ class PaymentChannelUpdateSerializer(serializers.ModelSerializer):
 
 
 
+class ChannelPaymentStatsSerializer(serializers.ModelSerializer):
+    """
+    Running totals for one channel (ChannelPaymentStats).
+    """
+    class Meta:
+        model = ChannelPaymentStats
+        fields = [
+            "payments_count",
+            "pending_count",
+            "success_count",
+            "failed_count",
+            "abandoned_count",
+            "reversed_count",
+            "paylink_count",
+            "ussd_count",
+            "success_amount",
+            "paylink_success_amount",
+            "ussd_success_amount",
+            "last_payment_at",
+        ]
+
+
+class PaymentChannelWithStatsSerializer(serializers.ModelSerializer):
+    """
+    A channel with its totals. Expects the queryset to select_related("stats").
+    """
+    stats = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PaymentChannel
+        fields = ["id", "name", "slug", "amount", "currency", "stats"]
+
+    @extend_schema_field(ChannelPaymentStatsSerializer)
+    def get_stats(self, obj):
+        # No row yet = no payments yet: serialize an unsaved all-zero row
+        stats = getattr(obj, "stats", None) or ChannelPaymentStats(channel=obj)
+        return ChannelPaymentStatsSerializer(stats).data
+
+
 class PaymentChannelStatsSerializer(serializers.Serializer):
+    """
+    Totals across all of a user's channels.
+    """
     total_channels = serializers.IntegerField()
-    total_amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
     last_created_slug = serializers.CharField(allow_null=True)
     last_created_at = serializers.DateTimeField(allow_null=True)
 
-    # New fields
-    payments_count = serializers.SerializerMethodField()
-    paylink_amount = serializers.SerializerMethodField()
-    ussd_amount = serializers.SerializerMethodField()
+    payments_count = serializers.IntegerField()
+    paylink_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    ussd_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+
 
-    def get_payments_count(self, obj):
-        # Count of all payments for this channel
-        return obj.payments.count()
+class PaylinkMethodsSerializer(serializers.Serializer):
+    paylink = serializers.BooleanField()
+    ussd = serializers.BooleanField()
 
-    # def get_paylink_amount(self, obj):
-    #     # Sum of all payments made via Paylink
-    #     return obj.payments.filter(, status="success").aggregate(total=Sum("amount"))["total"] or 0
 
-    # def get_ussd_amount(self, obj):
-    #     # Sum of all payments made via USSD
-    #     return obj.payments.filter(method="ussd", status="success").aggregate(total=Sum("amount"))["total"] or 0
+class PaylinkSerializer(serializers.Serializer):
+    """
+    Shape of the public paylink payload (rendered by paychannel/paylinks.py; documentation only).
+    """
+    slug = serializers.CharField()
+    name = serializers.CharField()
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    currency = serializers.CharField()
+    methods = PaylinkMethodsSerializer()
+    ussd = serializers.CharField(allow_null=True)
@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from authentications.models import CustomUser
+
+from .codes import release_ussd_codes
+from .index import get_channel_index
+from .models import PaymentChannel
+from .paylinks import refresh_paylink
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=PaymentChannel, dispatch_uid="channel_index_save")
+@receiver(post_delete, sender=PaymentChannel, dispatch_uid="channel_index_delete")
+def invalidate_channel_index(sender, instance, **kwargs):
+    # Local entries go now; other processes are told once the save commits
+    get_channel_index().invalidate(instance.id, instance.ussd, instance.slug)
+
+
+@receiver(post_save, sender=PaymentChannel, dispatch_uid="paylink_payload_save")
+def refresh_paylink_payload(sender, instance, **kwargs):
+    # After commit, so a reader between save and commit can't leave the old version cached
+    slug = instance.slug
+    transaction.on_commit(lambda: refresh_paylink(slug))
+
+
+@receiver(post_delete, sender=PaymentChannel, dispatch_uid="ussd_code_release")
+def release_ussd_code(sender, instance, **kwargs):
+    # Same transaction as the delete: the code is only free once the channel is gone
+    release_ussd_codes([instance.ussd])
+
+
+@receiver(post_save, sender=PaymentChannel, dispatch_uid="channel_search_save")
+def index_channel(sender, instance, **kwargs):
+    get_search_backend().index([instance.pk])
+
+
+@receiver(post_delete, sender=PaymentChannel, dispatch_uid="channel_search_delete")
+def unindex_channel(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(post_save, sender=CustomUser, dispatch_uid="channel_search_owner")
+def reindex_owner_channels(sender, instance, created, update_fields=None, **kwargs):
+    # Owner email / phone are searchable too; skip saves that can't touch them (e.g. last_login)
+    if created or (update_fields is not None and not {"email", "phone_number"} & set(update_fields)):
+        return
+    get_search_backend().index(instance.payment_channels.values_list("pk", flat=True))
@@ -0,0 +1,163 @@
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Q, Sum, Value, When
+from django.utils import timezone
+
+from payment.models import Payment
+
+from .models import ChannelPaymentStats, PaymentChannel
+
+
+# ======================================================
+# PER-CHANNEL PAYMENT AGGREGATES
+# ======================================================
+# Every Payment contributes to its channel's ChannelPaymentStats row:
+#   payments_count, <status>_count, <channel_type>_count (always)
+#   success_amount, <channel_type>_success_amount       (while status is success)
+# Inserts add the contribution, deletes subtract it, a status change applies
+# the difference between the old and the new one. Callers run inside the
+# transaction that writes the Payment, so the totals commit (or roll back)
+# with it.
+
+STATUS_COLUMNS = {status: f"{status}_count" for status, _ in Payment.STATUS_CHOICES}
+TYPE_COLUMNS = {channel_type: f"{channel_type}_count" for channel_type, _ in Payment.CHANNEL_TYPE}
+TYPE_AMOUNT_COLUMNS = {
+    channel_type: f"{channel_type}_success_amount" for channel_type, _ in Payment.CHANNEL_TYPE
+}
+
+
+def contribution(status, channel_type, amount) -> Counter:
+    delta = Counter({"payments_count": 1})
+    if status in STATUS_COLUMNS:
+        delta[STATUS_COLUMNS[status]] += 1
+    if channel_type in TYPE_COLUMNS:
+        delta[TYPE_COLUMNS[channel_type]] += 1
+    if status == Payment.STATUS_SUCCESS:
+        delta["success_amount"] += Decimal(amount)
+        if channel_type in TYPE_AMOUNT_COLUMNS:
+            delta[TYPE_AMOUNT_COLUMNS[channel_type]] += Decimal(amount)
+    return delta
+
+
+def _apply(deltas: dict, last_payment_at: dict = None, create: bool = True):
+    """
+    {channel_id: {column: delta}} → one UPDATE per channel.
+    """
+    last_payment_at = last_payment_at or {}
+    now = timezone.now()
+    for channel_id, delta in deltas.items():
+        updates = {column: F(column) + value for column, value in delta.items() if value}
+        latest = last_payment_at.get(channel_id)
+        if latest is not None:
+            updates["last_payment_at"] = Case(
+                When(Q(last_payment_at__isnull=True) | Q(last_payment_at__lt=latest), then=Value(latest)),
+                default=F("last_payment_at"),
+            )
+        if not updates:
+            continue
+        updates["updated_at"] = now
+
+        if not ChannelPaymentStats.objects.filter(channel_id=channel_id).update(**updates) and create:
+            # First payment for this channel: create the row, then apply the same update
+            ChannelPaymentStats.objects.get_or_create(channel_id=channel_id)
+            ChannelPaymentStats.objects.filter(channel_id=channel_id).update(**updates)
+
+
+# -----------------------------
+# Recording
+# -----------------------------
+def record_payments(rows, sign: int = 1):
+    """
+    rows: (channel_id, status, channel_type, amount, created_at) of inserted
+    (sign=1) or deleted (sign=-1) payments.
+    """
+    deltas = defaultdict(Counter)
+    latest = {}
+    for channel_id, status, channel_type, amount, created_at in rows:
+        for column, value in contribution(status, channel_type, amount).items():
+            deltas[channel_id][column] += sign * value
+        if sign > 0 and created_at is not None:
+            latest[channel_id] = max(created_at, latest.get(channel_id, created_at))
+    # Deletes never create a row: in a channel cascade its stats row may already be gone
+    _apply(deltas, latest, create=sign > 0)
+
+
+def record_status_changes(rows, new_status):
+    """
+    rows: (channel_id, old_status, channel_type, amount) of payments that moved to new_status.
+    """
+    deltas = defaultdict(Counter)
+    for channel_id, old_status, channel_type, amount in rows:
+        if old_status == new_status:
+            continue
+        delta = deltas[channel_id]
+        for column, value in contribution(new_status, channel_type, amount).items():
+            delta[column] += value
+        for column, value in contribution(old_status, channel_type, amount).items():
+            delta[column] -= value
+    _apply(deltas)
+
+
+# -----------------------------
+# Rebuild
+# -----------------------------
+def rebuild_channel_stats(channel_ids=None) -> int:
+    """
+    Recompute the totals from the payment table (all channels, or some).
+
+    Existing stats rows are locked first: a payment write that commits
+    before our read is counted by it, one that commits after waits for the
+    lock and applies its delta on top — nothing is lost or counted twice.
+    """
+    channels = PaymentChannel.objects.all()
+    if channel_ids is not None:
+        channels = channels.filter(pk__in=list(channel_ids))
+
+    success = Q(status=Payment.STATUS_SUCCESS)
+    aggregates = {
+        "payments_count": Count("id"),
+        "success_amount": Sum("amount", filter=success),
+        "last_payment_at": Max("created_at"),
+        **{column: Count("id", filter=Q(status=status)) for status, column in STATUS_COLUMNS.items()},
+        **{column: Count("id", filter=Q(channel_type=kind)) for kind, column in TYPE_COLUMNS.items()},
+        **{
+            column: Sum("amount", filter=success & Q(channel_type=kind))
+            for kind, column in TYPE_AMOUNT_COLUMNS.items()
+        },
+    }
+
+    with transaction.atomic():
+        existing = set(
+            ChannelPaymentStats.objects
+            .select_for_update()
+            .filter(channel_id__in=channels.values("pk"))
+            .values_list("pk", flat=True)
+        )
+        payments = Payment.objects.filter(channel_id__in=channels.values("pk"))
+        totals = {
+            row.pop("channel_id"): row
+            for row in payments.values("channel_id").order_by().annotate(**aggregates)
+        }
+
+        now = timezone.now()
+        fresh = []
+        for channel_id in channels.values_list("pk", flat=True):
+            row = totals.get(channel_id, {})
+            fresh.append(ChannelPaymentStats(
+                channel_id=channel_id,
+                updated_at=now,
+                last_payment_at=row.get("last_payment_at"),
+                **{column: row.get(column) or 0 for column in aggregates if column != "last_payment_at"},
+            ))
+
+        # Update in place so writers queued on the row lock apply their delta to the new totals
+        fields = list(aggregates) + ["updated_at"]
+        ChannelPaymentStats.objects.bulk_update(
+            [stats for stats in fresh if stats.channel_id in existing], fields, batch_size=500
+        )
+        ChannelPaymentStats.objects.bulk_create(
+            [stats for stats in fresh if stats.channel_id not in existing], batch_size=1000
+        )
+    return len(fresh)
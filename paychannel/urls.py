@@ -1,7 +1,8 @@
 from django.urls import path
 from .views import (
+    PaylinkAPIView,
     PaymentChannelAPIView,
-    # PaymentChannelStatsAPIView,
+    PaymentChannelStatsAPIView,
     PaymentChannelUpdateAPIView
 )
 
@@ -10,7 +11,10 @@ urlpatterns = [
     path("channels/", PaymentChannelAPIView.as_view(), name="payment-channel-list-create"),  # GET + POST
 
     # API to get stats for all payment channels
-    # path("channels/stats/", PaymentChannelStatsAPIView.as_view(), name="payment-channel-stats"),
+    path("channels/stats/", PaymentChannelStatsAPIView.as_view(), name="payment-channel-stats"),
+
+    # Public: resolve a paylink slug for the payer's page (HTTP-cacheable)
+    path("paylinks/<slug:slug>/", PaylinkAPIView.as_view(), name="paylink-resolve"),
 
     # API to retrieve or update a specific channel by slug
     path("channels/<slug:slug>/", PaymentChannelUpdateAPIView.as_view(), name="payment-channel-update"),  # GET, PATCH, PUT
@@ -1,20 +1,30 @@
 from rest_framework.generics import CreateAPIView, ListAPIView, RetrieveUpdateAPIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.authentication import SessionAuthentication
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from rest_framework.views import APIView
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 from rest_framework.parsers import JSONParser, FormParser, MultiPartParser
 
+from django.http import HttpResponse, JsonResponse
 from django.utils.text import slugify
 from datetime import datetime
 from django.db import models
+from django.db.models import Count, Max, Sum
 from .models import PaymentChannel
-from .serializers import PaymentChannelSerializer, PaymentChannelUpdateSerializer, PaymentChannelStatsSerializer
+from .pagination import PageOrKeysetPagination
+from .paylinks import cache_control, etag_matches, resolve_paylink
+from .search import ChannelSearchFilter
+from .serializers import (
+    PaylinkSerializer,
+    PaymentChannelSerializer,
+    PaymentChannelStatsSerializer,
+    PaymentChannelUpdateSerializer,
+    PaymentChannelWithStatsSerializer,
+)
 
 
 # ------------------------
@@ -30,7 +40,7 @@ def generate_unique_slug(name: str) -> str:
 # ------------------------
 # Pagination
 # ------------------------
-class PaymentChannelPagination(PageNumberPagination):
+class PaymentChannelPagination(PageOrKeysetPagination):
     page_size = 10
     page_size_query_param = "per_page"
     max_page_size = 100
@@ -43,9 +53,22 @@ class PaymentChannelPagination(PageNumberPagination):
     description="Create a payment channel (Paylink, USSD, or both). GET supports pagination and search.",
     responses={201: PaymentChannelSerializer, 400: "Validation error"},
     parameters=[
-        OpenApiParameter(name="search", description="Search channels by name", required=False, type=str),
+        OpenApiParameter(
+            name="search",
+            description="Search channels by name; best matches first",
+            required=False,
+            type=str,
+        ),
         OpenApiParameter(name="page", description="Page number for pagination", required=False, type=int),
         OpenApiParameter(name="per_page", description="Items per page", required=False, type=int),
+        OpenApiParameter(
+            name="pagination",
+            description="'cursor' for keyset pagination: next/previous links instead of page numbers, no OFFSET or COUNT",
+            required=False,
+            type=str,
+        ),
+        OpenApiParameter(name="cursor", description="Cursor from a previous next/previous link", required=False, type=str),
+        OpenApiParameter(name="count", description="With cursor pagination: include the total count", required=False, type=bool),
     ],
     tags=["Payment Channels"],
 )
@@ -59,7 +82,8 @@ class PaymentChannelAPIView(CreateAPIView, ListAPIView):
     permission_classes = [IsAuthenticated]
 
     pagination_class = PaymentChannelPagination
-    filter_backends = [SearchFilter, OrderingFilter]
+    # Search runs after ordering so best matches come first (unless ?ordering= is given)
+    filter_backends = [OrderingFilter, ChannelSearchFilter]
     search_fields = ["name"]
     ordering_fields = ["created_at", "name"]
     ordering = ["-created_at"]
@@ -88,7 +112,57 @@ class PaymentChannelAPIView(CreateAPIView, ListAPIView):
             status=201,
         )
 
-# --
+# ------------------------
+# Payment stats per channel
+# ------------------------
+@extend_schema(
+    description=(
+        "Payment totals for the logged-in user's channels: a summary across all channels plus a "
+        "paginated list of channels with counts by status and channel type, success amounts and "
+        "the last payment time. Served from incrementally maintained aggregates."
+    ),
+    parameters=[
+        OpenApiParameter(name="page", description="Page number for pagination", required=False, type=int),
+        OpenApiParameter(name="per_page", description="Items per page", required=False, type=int),
+    ],
+    tags=["Payment Channels"],
+)
+class PaymentChannelStatsAPIView(ListAPIView):
+    serializer_class = PaymentChannelWithStatsSerializer
+    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = PaymentChannelPagination
+
+    def get_queryset(self):
+        # One joined row per channel — no per-channel COUNT / SUM
+        return (
+            PaymentChannel.objects
+            .filter(user=self.request.user)
+            .select_related("stats")
+            .order_by("-created_at")
+        )
+
+    def get_summary(self):
+        channels = PaymentChannel.objects.filter(user=self.request.user)
+        totals = channels.aggregate(
+            total_channels=Count("id"),
+            last_created_at=Max("created_at"),
+            payments_count=Sum("stats__payments_count"),
+            total_amount=Sum("stats__success_amount"),
+            paylink_amount=Sum("stats__paylink_success_amount"),
+            ussd_amount=Sum("stats__ussd_success_amount"),
+        )
+        summary = {key: value or 0 for key, value in totals.items() if key != "last_created_at"}
+        summary["last_created_at"] = totals["last_created_at"]
+        summary["last_created_slug"] = channels.order_by("-created_at").values_list("slug", flat=True).first()
+        return PaymentChannelStatsSerializer(summary).data
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        response.data["summary"] = self.get_summary()
+        return response
+
+
 # ------------------------
 # Update PaymentChannel
 # ------------------------
@@ -128,3 +202,40 @@ class PaymentChannelUpdateAPIView(RetrieveUpdateAPIView):
     def perform_update(self, serializer):
         """Save changes without modifying slug"""
         serializer.save()
+
+
+# ------------------------
+# Public paylink resolution
+# ------------------------
+@extend_schema(
+    description=(
+        "Public: what a payer's page needs to show a paylink — name, amount, currency and enabled "
+        "methods. Served from a precomputed payload with a strong ETag; send If-None-Match to get "
+        "304 Not Modified. Cache-Control allows browsers and CDNs to cache and serve stale while revalidating."
+    ),
+    responses={200: PaylinkSerializer, 304: None, 404: None},
+    parameters=[
+        OpenApiParameter(name="slug", description="Paylink slug", required=True, type=str, location=OpenApiParameter.PATH),
+    ],
+    tags=["Payment Channels"],
+    auth=[],
+)
+class PaylinkAPIView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, slug):
+        # Precomputed bytes: no serializer and, on a warm cache, no query
+        payload = resolve_paylink(slug)
+        if payload is None:
+            response = JsonResponse({"error": "pay channel not found"}, status=404)
+            response["Cache-Control"] = cache_control(found=False)
+            return response
+
+        if etag_matches(request.headers.get("If-None-Match"), payload.etag):
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(payload.body, content_type="application/json")
+        response["ETag"] = payload.etag
+        response["Cache-Control"] = cache_control()
+        return response
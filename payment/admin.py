@@ -1,6 +1,10 @@
-from django.contrib import admin
-from .models import Payment
+from collections import Counter
+
+from django.contrib import admin, messages
+from .models import ChargeOutbox, Payment, PaymentStatusAudit, WebhookEvent
 from django.contrib.admin import SimpleListFilter
+from .exports import export_response
+from .transitions import transition_payments
 # Register your models here.
 
 # admin.site.register(Payment)
@@ -32,6 +36,19 @@ class AmountRangeFilter(SimpleListFilter):
             return queryset.filter(amount__gt=200)
 
 
+# -----------------------------
+# Export actions (streamed — "select all" exports the whole filtered list)
+# -----------------------------
+def export_csv(modeladmin, request, queryset):
+    return export_response(queryset, output="csv")
+export_csv.short_description = "Export selected payments (CSV)"
+
+
+def export_ndjson_gzip(modeladmin, request, queryset):
+    return export_response(queryset, output="ndjson", gzip=True)
+export_ndjson_gzip.short_description = "Export selected payments (NDJSON, gzip)"
+
+
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     # List view columns
@@ -72,10 +89,11 @@ class PaymentAdmin(admin.ModelAdmin):
     # Pagination
     list_per_page = 25
 
-    # Read-only fields
+    # Read-only fields (status moves only through the actions below, so it is checked and audited)
     readonly_fields = (
         "id",
         "reference",
+        "status",
         "created_at",
     )
 
@@ -90,5 +108,156 @@ class PaymentAdmin(admin.ModelAdmin):
         "mark_as_success",
         "mark_as_failed",
         "mark_as_reversed",
+        export_csv,
+        export_ndjson_gzip,
+    )
+
+    # Bulk status transitions — a few queries per 500 payments, whatever the selection size
+    def _transition(self, request, queryset, new_status):
+        result = transition_payments(
+            queryset.values_list("reference", flat=True),
+            new_status,
+            source=PaymentStatusAudit.SOURCE_ADMIN,
+            actor=request.user,
+            note="Admin action",
+        )
+        self.message_user(request, f"{len(result.changed)} payment(s) marked as {new_status}.", messages.SUCCESS)
+        if result.skipped:
+            reasons = Counter(result.skipped.values())
+            self.message_user(
+                request,
+                f"{len(result.skipped)} skipped: "
+                + ", ".join(f"{count} {reason}" for reason, count in reasons.most_common()),
+                messages.WARNING,
+            )
+
+    def mark_as_success(self, request, queryset):
+        self._transition(request, queryset, Payment.STATUS_SUCCESS)
+
+    mark_as_success.short_description = "Mark selected payments as success"
+
+    def mark_as_failed(self, request, queryset):
+        self._transition(request, queryset, Payment.STATUS_FAILED)
+
+    mark_as_failed.short_description = "Mark selected payments as failed"
+
+    def mark_as_reversed(self, request, queryset):
+        self._transition(request, queryset, Payment.STATUS_REVERSED)
+
+    mark_as_reversed.short_description = "Mark selected payments as reversed"
+
+
+@admin.register(PaymentStatusAudit)
+class PaymentStatusAuditAdmin(admin.ModelAdmin):
+    list_display = (
+        "payment",
+        "from_status",
+        "to_status",
+        "source",
+        "actor",
+        "created_at",
+    )
+    list_filter = (
+        "source",
+        "to_status",
+        "created_at",
+    )
+    search_fields = (
+        "payment__reference",
+    )
+    date_hierarchy = "created_at"
+    ordering = ("-created_at",)
+    list_per_page = 50
+    list_select_related = ("payment", "actor")
+    readonly_fields = (
+        "payment",
+        "from_status",
+        "to_status",
+        "source",
+        "actor",
+        "note",
+        "created_at",
     )
 
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = (
+        "event",
+        "reference",
+        "received_at",
+        "processed_at",
+        "attempts",
+        "parked_at",
+    )
+    list_filter = (
+        "event",
+        ("processed_at", admin.EmptyFieldListFilter),
+        ("parked_at", admin.EmptyFieldListFilter),
+    )
+    search_fields = (
+        "event_id",
+        "reference",
+    )
+    date_hierarchy = "received_at"
+    ordering = ("-received_at",)
+    list_per_page = 50
+    readonly_fields = (
+        "event_id",
+        "event",
+        "reference",
+        "payload",
+        "received_at",
+        "processed_at",
+        "attempts",
+        "last_error",
+        "parked_at",
+    )
+    actions = ("requeue_events",)
+
+    def requeue_events(self, request, queryset):
+        requeued = queryset.filter(processed_at__isnull=True).update(parked_at=None, attempts=0, last_error="")
+        self.message_user(request, f"{requeued} event(s) requeued.", messages.SUCCESS)
+
+    requeue_events.short_description = "Requeue selected unprocessed events"
+
+
+
+@admin.register(ChargeOutbox)
+class ChargeOutboxAdmin(admin.ModelAdmin):
+    list_display = (
+        "payment",
+        "state",
+        "gateway",
+        "next_action",
+        "attempts",
+        "available_at",
+        "dispatched_at",
+    )
+    list_filter = (
+        "state",
+        "gateway",
+    )
+    search_fields = (
+        "payment__reference",
+    )
+    date_hierarchy = "created_at"
+    ordering = ("-created_at",)
+    list_per_page = 50
+    list_select_related = ("payment",)
+    readonly_fields = (
+        "payment",
+        "currency",
+        "payload",
+        "state",
+        "attempts",
+        "available_at",
+        "locked_until",
+        "gateway",
+        "response",
+        "next_action",
+        "last_error",
+        "created_at",
+        "dispatched_at",
+    )
@@ -0,0 +1,307 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from paychannel.index import get_channel_index
+from .clients import get_async_paystack
+from .gateways import GatewayUnavailable, get_router
+from .idempotency import idempotent
+from .models import ChargeOutbox, Payment
+from .outbox import enqueue_charge, outbox_enabled, record_customer_action
+from .references import new_reference
+from .serializers import CreatePaymentSerializer, VerifyPaymentOTPSerializer, VerifyPaymentSerializer
+from .views import (
+    QUEUED_OUTBOX_STATES,
+    WAITING_ACTIONS,
+    customer_action_response,
+    otp_result_response,
+    queued_payment_response,
+    record_verification,
+    settled_payment_response,
+)
+
+
+# =========================================================
+# Async (ASGI) variants of the gateway-bound payment views.
+#
+# Served under /api/async/... — behaviour and response bodies match the
+# DRF views in payment/views.py, but the gateway round-trip is awaited on
+# the event loop instead of blocking a worker thread.
+# Run with an ASGI server, e.g.:
+#   gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+# =========================================================
+
+
+def parse_json(request):
+    try:
+        return json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+
+
+async def authenticate(request):
+    """
+    JWT-authenticate a plain Django request. Returns the user or None.
+    """
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def token_user_id(request):
+    """
+    User id from a valid Bearer token, without a database lookup.
+    """
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        token = auth.get_validated_token(raw_token)
+    except AuthenticationFailed:
+        return None
+    return token.get(jwt_settings.USER_ID_CLAIM)
+
+
+def create_owner(request):
+    data = parse_json(request)
+    return data.get("slug") if isinstance(data, dict) else None
+
+
+def unauthorized():
+    return JsonResponse(
+        {"detail": "Authentication credentials were not provided."},
+        status=status.HTTP_401_UNAUTHORIZED,
+    )
+
+
+# ================================
+# Create a payment (pending)
+# ================================
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncCreatePaymentView(View):
+    http_method_names = ["post"]
+
+    @idempotent("create", owner=create_owner)
+    async def post(self, request):
+        data = parse_json(request)
+        if data is None:
+            return JsonResponse({"error": "Invalid JSON"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = CreatePaymentSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        slug = serializer.validated_data["slug"]
+        amount = serializer.validated_data["amount"]
+        charge_type = serializer.validated_data["charge_type"]
+        phone_number = serializer.validated_data.get("phone_number")
+        channel_type = serializer.validated_data["channel_type"]
+        email = data.get("email")
+
+        payment_channel = await get_channel_index().aby_slug(slug)
+        if payment_channel is None:
+            return JsonResponse(
+                {"error": "pay channel not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        if charge_type != "momo":
+            return JsonResponse(
+                {"error": "Card payments are not supported yet"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        reference = new_reference()
+
+        #if no email generate email
+        if not email:
+            email = f"{phone_number}@gmail.com"
+
+        # 📮 Outbox mode: record the charge, let a dispatcher send it (same as CreatePaymentAPIView)
+        if outbox_enabled():
+            # Payment + outbox row in one transaction, dispatch on commit — sync ORM, in a thread
+            await sync_to_async(enqueue_charge)(
+                {
+                    "channel_id": payment_channel.id,
+                    "merchant_id": payment_channel.user_id,
+                    "amount": amount,
+                    "reference": reference,
+                    "email": email,
+                    "phone_number": phone_number,
+                    "channel_type": channel_type,
+                    "charge_type": charge_type,
+                },
+                email=email,
+                amount=int(amount),
+                provider_name="MTN",
+                phone=phone_number,
+                metadata={"description": "Mobile Money Payment"},
+            )
+            return JsonResponse(
+                {
+                    "message": "Payment queued",
+                    "payment_reference": reference,
+                    "status": Payment.STATUS_PENDING,
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
+
+        try:
+            gateway_name, momo_charge = await get_router().acharge(
+                "GHS",
+                email=email,
+                amount=int(amount),
+                provider_name="MTN",
+                phone=phone_number,
+                reference=reference,
+                metadata={"description": "Mobile Money Payment"},
+            )
+        except GatewayUnavailable as e:
+            return JsonResponse(
+                {"error": str(e), "payment_reference": reference},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        charge_data = momo_charge.get("data") or {}
+
+        if momo_charge.get("status") is True:
+            await Payment.objects.acreate(
+                channel_id=payment_channel.id,
+                merchant_id=payment_channel.user_id,
+                amount=amount,
+                reference=reference,
+                email=email,
+                phone_number=phone_number,
+                channel_type=channel_type,
+                charge_type=charge_type,
+                gateway=gateway_name,
+                status="pending",
+            )
+
+            return JsonResponse(
+                {
+                    "message": momo_charge.get("message"),
+                    "payment_reference": reference,
+                    "status": charge_data.get("status"),
+                    "gateway": gateway_name,
+                },
+                status=status.HTTP_201_CREATED,
+            )
+
+        return JsonResponse(
+            {
+                "message": momo_charge.get("message"),
+                "payment_reference": reference,
+                "status": charge_data.get("status"),
+                "gateway": gateway_name,
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+
+# =========================================
+# Verify payment with the gateway
+# =========================================
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncVerifyPaymentView(View):
+    http_method_names = ["post"]
+
+    async def post(self, request):
+        if await authenticate(request) is None:
+            return unauthorized()
+
+        serializer = VerifyPaymentSerializer(data=parse_json(request) or {})
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        reference = serializer.validated_data["reference"]
+
+        found = await (
+            Payment.objects.filter(reference=reference)
+            .values_list("gateway", "status", "outbox__state", "outbox__next_action")
+            .afirst()
+        )
+        if found is None:
+            return JsonResponse({"error": "Payment not found"}, status=status.HTTP_404_NOT_FOUND)
+        gateway_name, payment_status, outbox_state, next_action = found
+
+        # 📮 Charge not sent yet — nothing to ask the gateway
+        if outbox_state in QUEUED_OUTBOX_STATES and payment_status == Payment.STATUS_PENDING:
+            body, http_status = queued_payment_response(reference)
+            return JsonResponse(body, status=http_status)
+
+        # Already settled (webhook / reconciliation) — answer locally, no gateway call
+        if payment_status != Payment.STATUS_PENDING:
+            body, http_status = settled_payment_response(reference, payment_status)
+            return JsonResponse(body, status=http_status)
+
+        # 🔑 Charge sent from the outbox but the gateway is waiting on the customer's OTP
+        if outbox_state == ChargeOutbox.STATE_SENT and next_action in WAITING_ACTIONS:
+            body, http_status = customer_action_response(reference, next_action)
+            return JsonResponse(body, status=http_status)
+
+        # 🔍 Verify with the gateway that took the charge (awaited — no thread held)
+        try:
+            response = await get_router().averify(gateway_name, reference)
+        except GatewayUnavailable as e:
+            return JsonResponse(
+                {"message": str(e), "reference": reference},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        # Row lock + update stays in a thread: select_for_update needs a sync transaction
+        body, http_status = await sync_to_async(record_verification)(reference, response)
+        return JsonResponse(body, status=http_status)
+
+
+# =========================================
+# Submit MoMo OTP
+# =========================================
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncVerifyPaymentOTPView(View):
+    http_method_names = ["post"]
+
+    @idempotent("verify-otp", owner=token_user_id)
+    async def post(self, request):
+        if await authenticate(request) is None:
+            return unauthorized()
+
+        serializer = VerifyPaymentOTPSerializer(data=parse_json(request) or {})
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        otp = serializer.validated_data["otp"]
+        reference = serializer.validated_data["reference"]
+
+        gateway_name = await (
+            Payment.objects.filter(reference=reference, status="pending")
+            .values_list("gateway", flat=True)
+            .afirst()
+        )
+        if gateway_name is None:
+            return JsonResponse(
+                {"message": "Pending payment not found", "otp_verified": False},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        if gateway_name != "paystack":
+            return JsonResponse(
+                {"message": "OTP is not required for this payment", "otp_verified": False},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        result = await get_async_paystack().submit_otp(otp, reference)
+        await sync_to_async(record_customer_action)(reference, result)
+
+        body, http_status = otp_result_response(result)
+        return JsonResponse(body, status=http_status)
@@ -0,0 +1,78 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------------
+# Process-wide background executors
+# -----------------------------
+# Used for work that must not hold up the HTTP response (webhook processing,
+# outbox dispatch, USSD charges). Anything submitted here must also be safe to
+# pick up later from a management-command worker — the executor is a fast
+# path, not a durable queue.
+#
+# USSD charges and OTP submits get their own pool: a hop has a few seconds to
+# answer, so they must not queue behind a burst of webhook or outbox work.
+POOL_SIZE_SETTINGS = {
+    "default": ("BACKGROUND_WORKERS", 8),
+    "ussd": ("USSD_WORKERS", 8),
+}
+
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def get_executor(pool: str = "default") -> ThreadPoolExecutor:
+    executor = _executors.get(pool)
+    if executor is None:
+        with _executor_lock:
+            executor = _executors.get(pool)
+            if executor is None:
+                setting, default = POOL_SIZE_SETTINGS[pool]
+                executor = _executors[pool] = ThreadPoolExecutor(
+                    max_workers=getattr(settings, setting, default),
+                    thread_name_prefix=f"kivipay-{'bg' if pool == 'default' else pool}",
+                )
+    return executor
+
+
+def _run(fn, args, kwargs):
+    close_old_connections()
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", getattr(fn, "__name__", fn))
+        raise
+    finally:
+        # Worker threads are long-lived; don't leak one DB connection per thread
+        connections.close_all()
+
+
+def submit(fn, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs) on the background executor. Returns a Future.
+    """
+    return get_executor().submit(_run, fn, args, kwargs)
+
+
+def submit_to(pool: str, fn, *args, **kwargs):
+    """
+    Same as submit(), on the named pool (see POOL_SIZE_SETTINGS).
+    """
+    return get_executor(pool).submit(_run, fn, args, kwargs)
+
+
+def _reset_after_fork():
+    global _executors, _executor_lock
+    _executors = {}
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,69 @@
+import threading
+
+from .paystack import PaystackMobileMoney, AsyncPaystackMobileMoney
+from .payswitch import PaySwitchMobileMoney, AsyncPaySwitchMobileMoney
+
+
+# -----------------------------
+# Process-wide gateway clients
+# -----------------------------
+# Clients are stateless apart from their credentials and pooled sessions,
+# so one instance per gateway is shared by every request in the process.
+GATEWAY_CLIENTS = {
+    "paystack": PaystackMobileMoney,
+    "payswitch": PaySwitchMobileMoney,
+}
+
+ASYNC_GATEWAY_CLIENTS = {
+    "paystack": AsyncPaystackMobileMoney,
+    "payswitch": AsyncPaySwitchMobileMoney,
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _get_or_create(key, client_class):
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = client_class()
+            _clients[key] = client
+        return client
+
+
+def get_client(gateway: str):
+    if gateway not in GATEWAY_CLIENTS:
+        raise ValueError(f"Unknown payment gateway: {gateway}")
+    return _get_or_create(gateway, GATEWAY_CLIENTS[gateway])
+
+
+def get_async_client(gateway: str):
+    if gateway not in ASYNC_GATEWAY_CLIENTS:
+        raise ValueError(f"Unknown payment gateway: {gateway}")
+    return _get_or_create(("async", gateway), ASYNC_GATEWAY_CLIENTS[gateway])
+
+
+def get_paystack() -> PaystackMobileMoney:
+    return get_client("paystack")
+
+
+def get_payswitch() -> PaySwitchMobileMoney:
+    return get_client("payswitch")
+
+
+def get_async_paystack() -> AsyncPaystackMobileMoney:
+    return get_async_client("paystack")
+
+
+def get_async_payswitch() -> AsyncPaySwitchMobileMoney:
+    return get_async_client("payswitch")
+
+
+def reset_clients():
+    with _clients_lock:
+        _clients.clear()
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from .background import submit_to
+from .sessions import gateway_settings
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    """
+    A time budget shared by every step of one operation.
+
+    Gateway calls take their (connect, read) timeouts from what is left
+    instead of the fixed PAYMENT_GATEWAYS values, so failing over to a
+    second gateway can never overrun the caller's budget.
+    """
+
+    MIN_TIMEOUT = 0.05   # below this a request cannot complete; treat the budget as spent
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() < self.MIN_TIMEOUT
+
+    def timeout(self, gateway: str):
+        """
+        (connect, read) for a call to `gateway`: the configured values, capped by the remaining budget.
+        """
+        remaining = self.remaining()
+        if remaining < self.MIN_TIMEOUT:
+            raise DeadlineExceeded(f"{self.seconds}s budget spent")
+        config = gateway_settings(gateway)
+        return (
+            min(float(config["CONNECT_TIMEOUT"]), remaining),
+            min(float(config["READ_TIMEOUT"]), remaining),
+        )
+
+
+# -----------------------------
+# Background work with a bounded wait
+# -----------------------------
+def run_within(deadline: Deadline, fn, *args, pool: str = "default", **kwargs):
+    """
+    Start fn on the background executor (`pool`) and wait for it while the
+    deadline lasts. Raises DeadlineExceeded if it is still running — the work
+    itself carries on and must record its own outcome.
+    """
+    future = submit_to(pool, fn, *args, **kwargs)
+    try:
+        return future.result(timeout=deadline.remaining())
+    except FutureTimeout:
+        raise DeadlineExceeded(f"{fn.__name__} still running after {deadline.seconds}s") from None
+
+
+async def arun_within(deadline: Deadline, fn, *args, pool: str = "default", **kwargs):
+    """
+    Async form of run_within. The wait is never cancelled into the work:
+    asyncio.wait leaves the executor future running when it times out.
+    """
+    future = asyncio.wrap_future(submit_to(pool, fn, *args, **kwargs))
+    done, _ = await asyncio.wait({future}, timeout=deadline.remaining())
+    if not done:
+        raise DeadlineExceeded(f"{fn.__name__} still running after {deadline.seconds}s")
+    return future.result()
@@ -0,0 +1,472 @@
+import json
+import threading
+import time
+from collections import deque
+
+import httpx
+import requests
+from django.conf import settings
+
+from .clients import get_client, get_async_client
+from .sessions import request_not_sent
+
+
+# -----------------------------
+# Router defaults
+# -----------------------------
+# Override any key in settings.PAYMENT_GATEWAY_ROUTER.
+DEFAULT_ROUTER_SETTINGS = {
+    "ORDER": ["paystack", "payswitch"],   # preference when all gateways are healthy
+    "WINDOW_SECONDS": 60,                 # rolling window for error rate / p95
+    "MIN_CALLS": 10,                      # calls in window before the breaker may trip
+    "ERROR_RATE_THRESHOLD": 0.5,          # open the breaker above this error rate
+    "OPEN_SECONDS": 30,                   # how long an open breaker rejects calls
+    "SLOW_P95_SECONDS": 10,               # p95 above this marks a gateway as degraded
+}
+
+
+def router_settings() -> dict:
+    return {**DEFAULT_ROUTER_SETTINGS, **getattr(settings, "PAYMENT_GATEWAY_ROUTER", {})}
+
+
+class GatewayUnavailable(Exception):
+    """
+    No gateway could take the call (all breakers open / currency unsupported).
+    """
+
+
+# ======================================================
+# CIRCUIT BREAKER
+# ======================================================
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker for one gateway.
+
+    closed    → calls flow, outcomes recorded
+    open      → calls rejected until OPEN_SECONDS have passed
+    half_open → a single trial call; success closes, failure re-opens
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, config: dict = None):
+        self.name = name
+        self.config = config or router_settings()
+        self.state = self.CLOSED
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._calls = deque(maxlen=1000)   # (timestamp, ok, latency)
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        horizon = now - self.config["WINDOW_SECONDS"]
+        while self._calls and self._calls[0][0] < horizon:
+            self._calls.popleft()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.config["OPEN_SECONDS"]:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            # HALF_OPEN: let exactly one trial call through
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record(self, ok: bool, latency: float):
+        now = time.monotonic()
+        with self._lock:
+            self._calls.append((now, ok, latency))
+            self._prune(now)
+
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+                if ok:
+                    self.state = self.CLOSED
+                    self._calls.clear()
+                else:
+                    self._open(now)
+                return
+
+            if self.state == self.CLOSED and len(self._calls) >= self.config["MIN_CALLS"]:
+                if self._error_rate() > self.config["ERROR_RATE_THRESHOLD"]:
+                    self._open(now)
+
+    def release(self):
+        """
+        Forget a half-open trial that ended without an outcome (validation error, bug, cancellation).
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _open(self, now):
+        self.state = self.OPEN
+        self.opened_at = now
+
+    def _error_rate(self) -> float:
+        if not self._calls:
+            return 0.0
+        return sum(1 for _, ok, _ in self._calls if not ok) / len(self._calls)
+
+    def _p95(self):
+        if not self._calls:
+            return None
+        latencies = sorted(latency for _, _, latency in self._calls)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def stats(self):
+        with self._lock:
+            self._prune(time.monotonic())
+            return len(self._calls), self._error_rate(), self._p95()
+
+    def snapshot(self) -> dict:
+        calls, error_rate, p95 = self.stats()
+        retry_in = None
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self.config["OPEN_SECONDS"] - (time.monotonic() - self.opened_at))
+        return {
+            "gateway": self.name,
+            "state": self.state,
+            "calls_in_window": calls,
+            "error_rate": round(error_rate, 4),
+            "p95_latency": round(p95, 4) if p95 is not None else None,
+            "retry_in_seconds": round(retry_in, 2) if retry_in is not None else None,
+        }
+
+
+# ======================================================
+# GATEWAYS — common charge / verify interface
+# ======================================================
+# Every gateway returns Paystack-shaped dicts:
+#   {"status": bool, "message": str, "data": {"status": "...", ...}}
+# so views treat them the same way.
+class Gateway:
+    name = None
+    currencies = None   # None = any currency
+
+    def supports(self, currency: str) -> bool:
+        return self.currencies is None or currency.upper() in self.currencies
+
+    @staticmethod
+    def is_failure(result) -> bool:
+        """
+        True when a result means the gateway itself is unhealthy (not a declined payment).
+        """
+        return False
+
+    def charge(self, **kwargs) -> dict:
+        raise NotImplementedError
+
+    def verify(self, reference: str, timeout=None) -> dict:
+        raise NotImplementedError
+
+    async def acharge(self, **kwargs) -> dict:
+        raise NotImplementedError
+
+    async def averify(self, reference: str, timeout=None) -> dict:
+        raise NotImplementedError
+
+
+class PaystackGateway(Gateway):
+    name = "paystack"
+
+    @staticmethod
+    def is_failure(result) -> bool:
+        # Transport errors raise (and count) on their own; 5xx come back as "error" results
+        return bool(result.get("error"))
+
+    def charge(self, **kwargs):
+        return get_client(self.name).charge(**kwargs)
+
+    def verify(self, reference, timeout=None):
+        return get_client(self.name).verify(reference, timeout=timeout)
+
+    async def acharge(self, **kwargs):
+        return await get_async_client(self.name).charge(**kwargs)
+
+    async def averify(self, reference, timeout=None):
+        return await get_async_client(self.name).verify(reference, timeout=timeout)
+
+
+class PaySwitchGateway(Gateway):
+    """
+    PaySwitch (theteller) — GHS only, no OTP flow.
+    """
+    name = "payswitch"
+    currencies = {"GHS"}
+
+    # theteller statuses → Paystack-style statuses understood by map_gateway_status
+    STATUS_MAP = {
+        "approved": "success",
+        "successful": "success",
+        "declined": "failed",
+        "failed": "failed",
+        "cancelled": "abandoned",
+    }
+
+    @staticmethod
+    def is_failure(result) -> bool:
+        return bool(result.get("error"))
+
+    def normalize_charge(self, result: dict) -> dict:
+        raw = result.get("data") or {}
+        gateway_status = "success" if result.get("status") is True else "failed"
+        if result.get("error"):
+            gateway_status = None
+        return {
+            **result,
+            "data": {**raw, "status": gateway_status, "gateway_response": raw.get("reason")},
+        }
+
+    def normalize_verify(self, raw: dict) -> dict:
+        gateway_status = self.STATUS_MAP.get(str(raw.get("status", "")).lower(), "pending")
+        return {
+            "status": True,
+            "message": raw.get("reason") or "Verification successful",
+            "data": {**raw, "status": gateway_status},
+        }
+
+    def charge(self, **kwargs):
+        return self.normalize_charge(get_client(self.name).charge(**kwargs))
+
+    def verify(self, reference, timeout=None):
+        return self.normalize_verify(get_client(self.name).verify(reference, timeout=timeout))
+
+    async def acharge(self, **kwargs):
+        return self.normalize_charge(await get_async_client(self.name).charge(**kwargs))
+
+    async def averify(self, reference, timeout=None):
+        return self.normalize_verify(await get_async_client(self.name).verify(reference, timeout=timeout))
+
+
+GATEWAYS = {
+    "paystack": PaystackGateway,
+    "payswitch": PaySwitchGateway,
+}
+
+# Payment.gateway default — what rows from before gateway routing were charged with
+DEFAULT_GATEWAY = "paystack"
+
+# Gateway reached (or may have been) but misbehaved — counts against its breaker.
+# Only the ones request_not_sent() accepts are retried on the next gateway.
+GATEWAY_ERRORS = (requests.exceptions.RequestException, httpx.HTTPError, json.JSONDecodeError)
+
+
+# ======================================================
+# ROUTER
+# ======================================================
+class GatewayRouter:
+    """
+    Picks a gateway for each charge and fails over when one is unhealthy.
+
+    Ordering: healthy gateways first (breaker closed, error rate and p95 under
+    the configured limits), then by configured preference, then by p95.
+    Failover only happens when the charge provably did not reach the first
+    gateway (breaker open, connection refused, DNS, connect timeout) — a
+    read timeout or dropped connection may still have created the charge, so
+    it is returned as a failure instead of being retried elsewhere.
+    """
+
+    def __init__(self, config: dict = None):
+        self.config = config or router_settings()
+        self.gateways = {name: GATEWAYS[name]() for name in self.config["ORDER"]}
+        self.breakers = {name: CircuitBreaker(name, self.config) for name in self.gateways}
+
+    # -----------------------------
+    # Selection
+    # -----------------------------
+    def _rank(self, name):
+        calls, error_rate, p95 = self.breakers[name].stats()
+        degraded = calls >= self.config["MIN_CALLS"] and (
+            error_rate > self.config["ERROR_RATE_THRESHOLD"]
+            or (p95 is not None and p95 > self.config["SLOW_P95_SECONDS"])
+        )
+        return (degraded, self.config["ORDER"].index(name), p95 or 0.0)
+
+    def candidates(self, currency: str):
+        names = [name for name, gateway in self.gateways.items() if gateway.supports(currency)]
+        return sorted(names, key=self._rank)
+
+    # -----------------------------
+    # Outcome bookkeeping
+    # -----------------------------
+    def _finish(self, name, started, result=None, error=None):
+        gateway = self.gateways[name]
+        ok = error is None and not gateway.is_failure(result)
+        self.breakers[name].record(ok, time.monotonic() - started)
+
+    # -----------------------------
+    # Charge (sync)
+    # -----------------------------
+    def charge(self, currency: str, deadline=None, **kwargs):
+        """
+        Returns (gateway_name, result). Raises GatewayUnavailable if no gateway could be tried.
+
+        With a Deadline, each attempt's timeout is what is left of it and no
+        further gateway is tried once it is spent.
+        """
+        last_error = None
+        for name in self.candidates(currency):
+            if deadline is not None and deadline.expired():
+                last_error = last_error or "deadline exceeded"
+                break
+            breaker = self.breakers[name]
+            if not breaker.allow():
+                continue
+            if deadline is not None:
+                kwargs["timeout"] = deadline.timeout(name)
+
+            started = time.monotonic()
+            result = error = None
+            try:
+                result = self.gateways[name].charge(currency=currency, **kwargs)
+            except GATEWAY_ERRORS as e:
+                error = e
+            finally:
+                if result is None and error is None:
+                    # ValueError before any request (provider / currency / amount), a bug or
+                    # a cancellation: nothing to record, but free a half-open trial slot
+                    breaker.release()
+
+            self._finish(name, started, result=result, error=error)
+            if error is not None:
+                if request_not_sent(error):
+                    last_error = error
+                    continue
+                # Outcome unknown: the charge may exist — never re-send it elsewhere.
+                # Tag where, so the caller can settle it through that gateway
+                error.gateway = name
+                raise error
+            if result.get("error") == "connect":
+                last_error = result.get("message")
+                continue
+            return name, result
+
+        raise GatewayUnavailable(f"No payment gateway available for {currency}: {last_error or 'all circuits open'}")
+
+    def _verifying(self, gateway_name):
+        """
+        The gateway a stored Payment is verified with. Rows saved before the
+        gateway column default to Paystack; one no longer in ORDER is a
+        handled error, not a KeyError.
+        """
+        gateway_name = gateway_name or DEFAULT_GATEWAY
+        if gateway_name not in self.gateways:
+            raise GatewayUnavailable(f"{gateway_name} is not a configured payment gateway")
+        return gateway_name
+
+    def verify(self, gateway_name: str, reference: str, timeout=None):
+        """
+        Verification must go to the gateway that took the charge — no failover.
+        """
+        gateway_name = self._verifying(gateway_name)
+        breaker = self.breakers[gateway_name]
+        if not breaker.allow():
+            raise GatewayUnavailable(f"{gateway_name} circuit is open")
+
+        started = time.monotonic()
+        result = error = None
+        try:
+            result = self.gateways[gateway_name].verify(reference, timeout=timeout)
+        except Exception as e:
+            error = e
+        finally:
+            if result is None and error is None:
+                # Cancelled: nothing to record, but free a half-open trial slot
+                breaker.release()
+        self._finish(gateway_name, started, result=result, error=error)
+        if error is not None:
+            raise error
+        return result
+
+    # -----------------------------
+    # Charge / verify (async)
+    # -----------------------------
+    async def acharge(self, currency: str, deadline=None, **kwargs):
+        last_error = None
+        for name in self.candidates(currency):
+            if deadline is not None and deadline.expired():
+                last_error = last_error or "deadline exceeded"
+                break
+            breaker = self.breakers[name]
+            if not breaker.allow():
+                continue
+            if deadline is not None:
+                kwargs["timeout"] = deadline.timeout(name)
+
+            started = time.monotonic()
+            result = error = None
+            try:
+                result = await self.gateways[name].acharge(currency=currency, **kwargs)
+            except GATEWAY_ERRORS as e:
+                error = e
+            finally:
+                if result is None and error is None:
+                    # ValueError before any request (provider / currency / amount), a bug or
+                    # a cancellation: nothing to record, but free a half-open trial slot
+                    breaker.release()
+
+            self._finish(name, started, result=result, error=error)
+            if error is not None:
+                if request_not_sent(error):
+                    last_error = error
+                    continue
+                # Outcome unknown: the charge may exist — never re-send it elsewhere.
+                # Tag where, so the caller can settle it through that gateway
+                error.gateway = name
+                raise error
+            if result.get("error") == "connect":
+                last_error = result.get("message")
+                continue
+            return name, result
+
+        raise GatewayUnavailable(f"No payment gateway available for {currency}: {last_error or 'all circuits open'}")
+
+    async def averify(self, gateway_name: str, reference: str, timeout=None):
+        gateway_name = self._verifying(gateway_name)
+        breaker = self.breakers[gateway_name]
+        if not breaker.allow():
+            raise GatewayUnavailable(f"{gateway_name} circuit is open")
+
+        started = time.monotonic()
+        result = error = None
+        try:
+            result = await self.gateways[gateway_name].averify(reference, timeout=timeout)
+        except Exception as e:
+            error = e
+        finally:
+            if result is None and error is None:
+                # Cancelled: nothing to record, but free a half-open trial slot
+                breaker.release()
+        self._finish(gateway_name, started, result=result, error=error)
+        if error is not None:
+            raise error
+        return result
+
+    # -----------------------------
+    # Inspection
+    # -----------------------------
+    def snapshot(self) -> list:
+        return [self.breakers[name].snapshot() for name in self.gateways]
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> GatewayRouter:
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = GatewayRouter()
+    return _router
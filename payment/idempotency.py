@@ -0,0 +1,226 @@
+import asyncio
+import functools
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+
+# -----------------------------
+# Idempotency defaults
+# -----------------------------
+# Override any key in settings.PAYMENT_IDEMPOTENCY.
+DEFAULT_IDEMPOTENCY_SETTINGS = {
+    "CACHE": "default",        # alias in settings.CACHES — must be shared (Redis) across workers
+    "TTL_SECONDS": 24 * 3600,  # how long a stored response is replayed
+    "LOCK_SECONDS": 60,        # in-flight marker lifetime (longer than any gateway call)
+    "WAIT_SECONDS": 15,        # how long a concurrent duplicate waits for the first response
+    "POLL_SECONDS": 0.1,
+}
+
+
+def idempotency_settings() -> dict:
+    return {**DEFAULT_IDEMPOTENCY_SETTINGS, **getattr(settings, "PAYMENT_IDEMPOTENCY", {})}
+
+
+def cache_keys(scope: str, owner, key: str):
+    """
+    (stored-response key, in-flight key) for one merchant + Idempotency-Key.
+    The client key is hashed so arbitrary header values are safe cache keys.
+    """
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    base = f"idem:{scope}:{owner}:{digest}"
+    return f"{base}:response", f"{base}:lock"
+
+
+def fingerprint(body: bytes) -> str:
+    return hashlib.sha256(body or b"").hexdigest()
+
+
+# -----------------------------
+# Stored responses
+# -----------------------------
+def _mismatch():
+    return (
+        {"error": f"{IDEMPOTENCY_HEADER} was already used with a different request body"},
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+
+
+def _in_progress():
+    return (
+        {"error": f"A request with this {IDEMPOTENCY_HEADER} is still in progress"},
+        status.HTTP_409_CONFLICT,
+    )
+
+
+def _bad_key():
+    return (
+        {"error": f"{IDEMPOTENCY_HEADER} must be 1-255 characters"},
+        status.HTTP_400_BAD_REQUEST,
+    )
+
+
+def _storable(http_status: int) -> bool:
+    # 5xx (gateway down, crash) must stay retryable
+    return http_status < 500
+
+
+def _replay(stored: dict, request_fingerprint: str):
+    if stored["fingerprint"] != request_fingerprint:
+        return (*_mismatch(), False)
+    return stored["body"], stored["status"], True
+
+
+# -----------------------------
+# Decorator
+# -----------------------------
+def idempotent(scope: str, owner):
+    """
+    Honour an Idempotency-Key header on a view's post(self, request).
+
+    owner(request) returns the merchant the key belongs to (paylink slug,
+    user id …) or None to skip idempotency. The first response (< 500) is
+    stored for TTL_SECONDS and replayed for the same merchant + key without
+    running the view again. A duplicate arriving while the first is still
+    running waits for its response instead of charging twice.
+
+    Works on DRF views (Response) and async Django views (JsonResponse).
+    """
+
+    def decorator(view_method):
+        if asyncio.iscoroutinefunction(view_method):
+
+            @functools.wraps(view_method)
+            async def async_wrapper(self, request, *args, **kwargs):
+                prepared = _prepare(scope, owner, request)
+                if prepared is None:
+                    return await view_method(self, request, *args, **kwargs)
+                if isinstance(prepared, tuple):
+                    return JsonResponse(prepared[0], status=prepared[1])
+
+                replayed = await _aclaim(prepared)
+                if replayed is not None:
+                    return _json_replay(*replayed)
+
+                try:
+                    response = await view_method(self, request, *args, **kwargs)
+                    if _storable(response.status_code):
+                        await prepared.cache.aset(
+                            prepared.response_key,
+                            prepared.stored(json.loads(response.content), response.status_code),
+                            prepared.config["TTL_SECONDS"],
+                        )
+                    return response
+                finally:
+                    await prepared.cache.adelete(prepared.lock_key)
+
+            return async_wrapper
+
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            prepared = _prepare(scope, owner, request)
+            if prepared is None:
+                return view_method(self, request, *args, **kwargs)
+            if isinstance(prepared, tuple):
+                return Response(prepared[0], status=prepared[1])
+
+            replayed = _claim(prepared)
+            if replayed is not None:
+                return _drf_replay(*replayed)
+
+            try:
+                response = view_method(self, request, *args, **kwargs)
+                if _storable(response.status_code):
+                    prepared.cache.set(
+                        prepared.response_key,
+                        prepared.stored(response.data, response.status_code),
+                        prepared.config["TTL_SECONDS"],
+                    )
+                return response
+            finally:
+                prepared.cache.delete(prepared.lock_key)
+
+        return wrapper
+
+    return decorator
+
+
+class _Prepared:
+    def __init__(self, scope, owner, key, request_fingerprint):
+        self.config = idempotency_settings()
+        self.cache = caches[self.config["CACHE"]]
+        self.response_key, self.lock_key = cache_keys(scope, owner, key)
+        self.fingerprint = request_fingerprint
+
+    def stored(self, body, http_status):
+        return {"fingerprint": self.fingerprint, "body": body, "status": http_status}
+
+
+def _prepare(scope, owner, request):
+    """
+    None → no idempotency for this request; tuple → immediate error response.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return None
+    if not 0 < len(key) <= 255:
+        return _bad_key()
+
+    # Read the raw body before owner() may parse it (DRF can't expose both afterwards)
+    request_fingerprint = fingerprint(request.body)
+    merchant = owner(request)
+    if merchant is None:
+        return None
+    return _Prepared(scope, merchant, key, request_fingerprint)
+
+
+def _claim(prepared):
+    """
+    Returns (body, status, replayed) to answer with, or None if this request
+    now owns the key.
+    """
+    config = prepared.config
+    deadline = time.monotonic() + config["WAIT_SECONDS"]
+    while True:
+        stored = prepared.cache.get(prepared.response_key)
+        if stored is not None:
+            return _replay(stored, prepared.fingerprint)
+        if prepared.cache.add(prepared.lock_key, prepared.fingerprint, config["LOCK_SECONDS"]):
+            return None
+        if time.monotonic() >= deadline:
+            return (*_in_progress(), False)
+        time.sleep(config["POLL_SECONDS"])
+
+
+async def _aclaim(prepared):
+    config = prepared.config
+    deadline = time.monotonic() + config["WAIT_SECONDS"]
+    while True:
+        stored = await prepared.cache.aget(prepared.response_key)
+        if stored is not None:
+            return _replay(stored, prepared.fingerprint)
+        if await prepared.cache.aadd(prepared.lock_key, prepared.fingerprint, config["LOCK_SECONDS"]):
+            return None
+        if time.monotonic() >= deadline:
+            return (*_in_progress(), False)
+        await asyncio.sleep(config["POLL_SECONDS"])
+
+
+def _drf_replay(body, http_status, replayed):
+    return Response(body, status=http_status, headers={REPLAY_HEADER: "true"} if replayed else None)
+
+
+def _json_replay(body, http_status, replayed):
+    response = JsonResponse(body, status=http_status)
+    if replayed:
+        response[REPLAY_HEADER] = "true"
+    return response
@@ -0,0 +1,37 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from payment.outbox import dispatch_pending
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Send queued gateway charges from the charge outbox (catches anything the in-process executor missed)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--workers", type=int, default=8, help="Concurrent gateway calls")
+        parser.add_argument("--loop", type=int, default=0, help="Run as a worker, polling every N seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                close_old_connections()
+                while True:
+                    summary = dispatch_pending(limit=options["batch_size"], workers=options["workers"])
+                    if summary["due"] or summary["expired"] or not options["loop"]:
+                        self.stdout.write(", ".join(f"{key}={value}" for key, value in summary.items()))
+                    if summary["due"] < options["batch_size"]:
+                        break
+            except Exception:
+                if not options["loop"]:
+                    raise
+                logger.exception("Outbox dispatch run failed, retrying in %ss", options["loop"])
+
+            if not options["loop"]:
+                break
+            time.sleep(options["loop"])
@@ -0,0 +1,40 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from payment.webhooks import process_pending_events
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Apply stored webhook events to payments (catches anything the in-process executor missed)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--loop", type=int, default=0, help="Run as a worker, polling every N seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            try:
+                close_old_connections()
+                while True:
+                    handled = process_pending_events(limit=options["batch_size"])
+                    total += handled
+                    # A short batch means the queue is drained (or some events failed — retried next run)
+                    if handled < options["batch_size"]:
+                        break
+            except Exception:
+                if not options["loop"]:
+                    raise
+                logger.exception("Webhook processing run failed, retrying in %ss", options["loop"])
+
+            if total or not options["loop"]:
+                self.stdout.write(f"Processed {total} webhook event(s)")
+
+            if not options["loop"]:
+                break
+            time.sleep(options["loop"])
@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from payment.rollups import rebuild_rollups
+
+
+def _moment(value, option):
+    moment = parse_datetime(value)
+    if moment is None:
+        raise CommandError(f"{option} must be an ISO datetime")
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+class Command(BaseCommand):
+    help = "Recompute the hourly and daily payment rollups from the payment table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="ISO datetime; default the first payment")
+        parser.add_argument("--until", help="ISO datetime; default now")
+        parser.add_argument("--merchant", action="append", default=[], metavar="EMAIL",
+                            help="Only this merchant (repeatable); default all")
+
+    def handle(self, *args, **options):
+        since = _moment(options["since"], "--since") if options["since"] else None
+        until = _moment(options["until"], "--until") if options["until"] else None
+
+        merchant_ids = None
+        if options["merchant"]:
+            merchant_ids = list(
+                get_user_model().objects.filter(email__in=options["merchant"]).values_list("pk", flat=True)
+            )
+            if len(merchant_ids) != len(set(options["merchant"])):
+                raise CommandError("Unknown merchant email")
+
+        hours, days = rebuild_rollups(since, until, merchant_ids)
+        self.stdout.write(f"hourly={hours} daily={days}")
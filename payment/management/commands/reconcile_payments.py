@@ -0,0 +1,57 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from payment.reconciliation import reconcile_pending
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Settle pending payments in bulk from Paystack's transaction listing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=float, default=24, help="Look back this many hours (default 24)")
+        parser.add_argument("--since", help="ISO datetime; overrides --hours")
+        parser.add_argument("--per-page", type=int, default=100, help="Transactions per listing page")
+        parser.add_argument("--min-age", type=int, default=60, help="Skip payments younger than N seconds")
+        parser.add_argument("--loop", type=int, default=0, help="Run as a worker, repeating every N seconds")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            since = parse_datetime(options["since"])
+            if since is None:
+                raise CommandError("--since must be an ISO datetime")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        while True:
+            try:
+                # A worker outlives its DB connection: drop it if it went stale or broke
+                close_old_connections()
+                window_start = since or timezone.now() - timedelta(hours=options["hours"])
+                summary = reconcile_pending(
+                    window_start,
+                    per_page=options["per_page"],
+                    min_age=timedelta(seconds=options["min_age"]),
+                )
+                self.stdout.write(
+                    f"pending={summary['pending']} pages={summary['pages']} "
+                    f"matched={summary['matched']} updated={summary['updated']}"
+                    + (f" error={summary['error']}" if "error" in summary else "")
+                )
+            except Exception:
+                if not options["loop"]:
+                    raise
+                # Keep the worker alive; the next run picks up the same window
+                logger.exception("Reconciliation run failed, retrying in %ss", options["loop"])
+
+            if not options["loop"]:
+                break
+            time.sleep(options["loop"])
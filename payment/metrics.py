@@ -0,0 +1,353 @@
+import asyncio
+import atexit
+import functools
+import glob
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+import requests
+from django.conf import settings
+
+
+# ======================================================
+# METRIC DEFINITIONS
+# ======================================================
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+METRICS = {
+    "kivipay_gateway_request_duration_seconds": (
+        HISTOGRAM, "Gateway call latency by gateway and operation.",
+    ),
+    "kivipay_gateway_requests_total": (
+        COUNTER, "Gateway calls by outcome (true, false, send_otp, timeout, connect_error, error).",
+    ),
+    "kivipay_gateway_requests_in_flight": (
+        GAUGE, "Gateway calls currently waiting on a response.",
+    ),
+    "kivipay_payments_created_total": (
+        COUNTER, "Payment rows created, by channel type and gateway.",
+    ),
+    "kivipay_payment_status_changes_total": (
+        COUNTER, "Payments moved to a new status.",
+    ),
+}
+
+
+# ======================================================
+# REGISTRY
+# ======================================================
+class Registry:
+    """
+    In-process metric store. Label sets are sorted (name, value) tuples.
+
+    With settings.METRICS_DIR set, each process writes its values to
+    <METRICS_DIR>/<pid>-<start ms>.json (at most once per FLUSH_SECONDS, and
+    at exit) and the /metrics view sums every file — so any gunicorn worker
+    can answer the scrape for all of them. The start time keeps a recycled
+    worker that reuses a pid from overwriting the totals of the dead one.
+    """
+
+    FLUSH_SECONDS = 1.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.gauges = defaultdict(float)
+        self.histograms = {}
+        self._last_flush = 0.0
+        self.filename = f"{os.getpid()}-{time.time_ns() // 1_000_000}.json"
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((labels or {}).items()))
+
+    def inc(self, name, labels=None, value=1.0):
+        with self._lock:
+            self.counters[self._key(name, labels)] += value
+        self._maybe_flush()
+
+    def gauge_add(self, name, labels=None, value=1.0):
+        with self._lock:
+            self.gauges[self._key(name, labels)] += value
+        self._maybe_flush()
+
+    def observe(self, name, value, labels=None):
+        key = self._key(name, labels)
+        with self._lock:
+            buckets, total, count = self.histograms.get(key, ([0] * len(LATENCY_BUCKETS), 0.0, 0))
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    buckets[i] += 1
+            self.histograms[key] = (buckets, total + value, count + 1)
+        self._maybe_flush()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                "gauges": [[name, list(labels), value] for (name, labels), value in self.gauges.items()],
+                "histograms": [
+                    [name, list(labels), list(buckets), total, count]
+                    for (name, labels), (buckets, total, count) in self.histograms.items()
+                ],
+            }
+
+    # -----------------------------
+    # Multi-process files
+    # -----------------------------
+    def _maybe_flush(self):
+        if metrics_dir() and time.monotonic() - self._last_flush >= self.FLUSH_SECONDS:
+            try:
+                self.flush()
+            except OSError:
+                # Never fail a payment because the metrics dir is unwritable
+                pass
+
+    def flush(self):
+        directory = metrics_dir()
+        if not directory:
+            return
+        self._last_flush = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        with os.fdopen(fd, "w") as fh:
+            json.dump(self.snapshot(), fh)
+        # Atomic swap: readers never see a half-written file
+        os.replace(tmp_path, os.path.join(directory, self.filename))
+
+
+def metrics_dir():
+    return getattr(settings, "METRICS_DIR", None)
+
+
+_registry = Registry()
+
+
+def get_registry() -> Registry:
+    return _registry
+
+
+def _reset_after_fork():
+    global _registry
+    # A forked worker starts from zero — otherwise it would re-report the parent's counts
+    _registry = Registry()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+atexit.register(lambda: _registry.flush())
+
+
+# ======================================================
+# GATEWAY INSTRUMENTATION
+# ======================================================
+def call_outcome(result) -> str:
+    """
+    Collapse a gateway response into a low-cardinality outcome label.
+    """
+    if not isinstance(result, dict):
+        return "error"
+    error = result.get("error")
+    if error == "connect":
+        return "connect_error"
+    if error == "timeout":
+        return "timeout"
+    if error:
+        return "error"
+    if result.get("status") is True:
+        data = result.get("data")
+        # Listing endpoints return a list of transactions under "data"
+        if isinstance(data, dict) and data.get("status") == "send_otp":
+            return "send_otp"
+        return "true"
+    return "false"
+
+
+def exception_outcome(exc) -> str:
+    if isinstance(exc, (requests.exceptions.ConnectionError, httpx.ConnectError, httpx.ConnectTimeout)):
+        return "connect_error"
+    if isinstance(exc, (requests.exceptions.Timeout, httpx.TimeoutException)):
+        return "timeout"
+    return "error"
+
+
+def _record(gateway, operation, started, outcome):
+    registry = get_registry()
+    labels = {"gateway": gateway, "operation": operation}
+    registry.observe("kivipay_gateway_request_duration_seconds", time.monotonic() - started, labels)
+    registry.inc("kivipay_gateway_requests_total", {**labels, "outcome": outcome})
+    registry.gauge_add("kivipay_gateway_requests_in_flight", labels, -1)
+
+
+def instrument(operation: str):
+    """
+    Time a gateway client method (sync or async) and count its outcome.
+    The gateway label comes from the client's GATEWAY attribute.
+    """
+
+    def decorator(method):
+        if asyncio.iscoroutinefunction(method):
+
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                get_registry().gauge_add(
+                    "kivipay_gateway_requests_in_flight", {"gateway": self.GATEWAY, "operation": operation}
+                )
+                started = time.monotonic()
+                try:
+                    result = await method(self, *args, **kwargs)
+                except Exception as e:
+                    _record(self.GATEWAY, operation, started, exception_outcome(e))
+                    raise
+                _record(self.GATEWAY, operation, started, call_outcome(result))
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            get_registry().gauge_add(
+                "kivipay_gateway_requests_in_flight", {"gateway": self.GATEWAY, "operation": operation}
+            )
+            started = time.monotonic()
+            try:
+                result = method(self, *args, **kwargs)
+            except Exception as e:
+                _record(self.GATEWAY, operation, started, exception_outcome(e))
+                raise
+            _record(self.GATEWAY, operation, started, call_outcome(result))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+# ======================================================
+# PAYMENT COUNTERS
+# ======================================================
+def payment_created(channel_type, gateway):
+    get_registry().inc(
+        "kivipay_payments_created_total",
+        {"channel_type": channel_type or "", "gateway": gateway or ""},
+    )
+
+
+def payment_status_changed(status, count=1):
+    if count:
+        get_registry().inc("kivipay_payment_status_changes_total", {"status": status}, count)
+
+
+# ======================================================
+# EXPOSITION
+# ======================================================
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect() -> dict:
+    """
+    Merged snapshot: this process only, or every process under METRICS_DIR.
+    Counters and histograms of exited workers are kept (they are totals);
+    gauges only count live processes.
+    """
+    registry = get_registry()
+    directory = metrics_dir()
+    if not directory:
+        return registry.snapshot()
+
+    registry.flush()
+    snapshots = []
+    newest = {}   # pid → start of the latest process with it; older files with that pid are dead
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        try:
+            with open(path) as fh:
+                snapshot = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        pid, _, started = os.path.basename(path)[:-len(".json")].partition("-")
+        pid, started = int(pid), int(started or 0)
+        snapshots.append((pid, started, snapshot))
+        newest[pid] = max(newest.get(pid, started), started)
+
+    merged = {"counters": defaultdict(float), "gauges": defaultdict(float), "histograms": {}}
+    for pid, started, snapshot in snapshots:
+        for name, labels, value in snapshot["counters"]:
+            merged["counters"][(name, tuple(map(tuple, labels)))] += value
+        if started == newest[pid] and _pid_alive(pid):
+            for name, labels, value in snapshot["gauges"]:
+                merged["gauges"][(name, tuple(map(tuple, labels)))] += value
+        for name, labels, buckets, total, count in snapshot["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            old_buckets, old_total, old_count = merged["histograms"].get(key, ([0] * len(buckets), 0.0, 0))
+            merged["histograms"][key] = (
+                [a + b for a, b in zip(old_buckets, buckets)],
+                old_total + total,
+                old_count + count,
+            )
+
+    return {
+        "counters": [[name, list(labels), value] for (name, labels), value in merged["counters"].items()],
+        "gauges": [[name, list(labels), value] for (name, labels), value in merged["gauges"].items()],
+        "histograms": [
+            [name, list(labels), buckets, total, count]
+            for (name, labels), (buckets, total, count) in merged["histograms"].items()
+        ],
+    }
+
+
+def _labels(pairs, extra=None) -> str:
+    pairs = list(pairs) + list(extra or [])
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _number(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render(snapshot: dict = None) -> str:
+    """
+    Prometheus text exposition format (version 0.0.4).
+    """
+    snapshot = snapshot or collect()
+    series = defaultdict(list)
+    for name, labels, value in sorted(snapshot["counters"] + snapshot["gauges"]):
+        series[name].append(f"{name}{_labels(labels)} {_number(value)}")
+    for name, labels, buckets, total, count in sorted(snapshot["histograms"]):
+        for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+            series[name].append(f"{name}_bucket{_labels(labels, [('le', _number(bound))])} {bucket_count}")
+        series[name].append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {count}")
+        series[name].append(f"{name}_sum{_labels(labels)} {_number(total)}")
+        series[name].append(f"{name}_count{_labels(labels)} {count}")
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(series.get(name, []))
+    return "\n".join(lines) + "\n"
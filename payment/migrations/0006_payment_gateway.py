@@ -0,0 +1,23 @@
+# Generated by Django 4.2.27 on 2026-10-16 22:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0005_alter_payment_charge_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='gateway',
+            field=models.CharField(choices=[('paystack', 'Paystack'), ('payswitch', 'PaySwitch')], default='paystack', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('success', 'Success'), ('failed', 'Failed'), ('abandoned', 'Abandoned'), ('reversed', 'Reversed')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.27 on 2026-10-16 23:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0007_webhookevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChargeOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(default='GHS', max_length=3)),
+                ('payload', models.JSONField()),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('in_flight', 'In flight'), ('sent', 'Sent'), ('failed', 'Failed'), ('unknown', 'Unknown')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('gateway', models.CharField(blank=True, max_length=20, null=True)),
+                ('response', models.JSONField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('dispatched_at', models.DateTimeField(blank=True, null=True)),
+                ('payment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='outbox', to='payment.payment')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['state', 'available_at'], name='outbox_due_idx')],
+            },
+        ),
+    ]
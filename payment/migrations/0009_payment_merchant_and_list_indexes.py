@@ -0,0 +1,57 @@
+# Generated by Django 4.2.27 on 2026-10-16 23:31
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def backfill_merchant(apps, schema_editor):
+    """
+    Existing payments take their channel's owner, in one UPDATE.
+    """
+    Payment = apps.get_model("payment", "Payment")
+    PaymentChannel = apps.get_model("paychannel", "PaymentChannel")
+    Payment.objects.filter(merchant__isnull=True).update(
+        merchant=Subquery(PaymentChannel.objects.filter(pk=OuterRef("channel_id")).values("user_id")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('paychannel', '0006_channel_search_index'),
+        ('payment', '0008_chargeoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='merchant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_merchant, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['merchant', 'created_at', 'id'], name='payment_merchant_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['merchant', 'status', 'created_at', 'id'], name='payment_merchant_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['channel', 'created_at', 'id'], name='payment_channel_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='payment_status_created_idx'),
+        ),
+        # payment_channel_created_idx covers channel_id lookups; drop the single-column FK index last
+        migrations.AlterField(
+            model_name='payment',
+            name='channel',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='paychannel.paymentchannel'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 4.2.27 on 2026-10-16 23:38
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncHour
+import django.db.models.deletion
+
+
+def seed_rollups(apps, schema_editor):
+    """
+    Hourly and daily rollups of the existing payments, one grouped query each.
+    """
+    Payment = apps.get_model("payment", "Payment")
+    for model_name, trunc in (("HourlyPaymentRollup", TruncHour), ("DailyPaymentRollup", TruncDay)):
+        Rollup = apps.get_model("payment", model_name)
+        rows = (
+            Payment.objects.filter(merchant__isnull=False)
+            .annotate(bucket=trunc("created_at"))
+            .values("bucket", "merchant_id", "channel_id", "channel_type", "charge_type", "status")
+            .order_by()
+            .annotate(payments_count=Count("id"), amount=Sum("amount"))
+        )
+        Rollup.objects.bulk_create(
+            (
+                Rollup(**{**row, "charge_type": row["charge_type"] or ""})
+                for row in rows.iterator(chunk_size=2000)
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('paychannel', '0006_channel_search_index'),
+        ('payment', '0009_payment_merchant_and_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlyPaymentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('channel_type', models.CharField(choices=[('paylink', 'Paylink'), ('ussd', 'USSD')], max_length=20)),
+                ('charge_type', models.CharField(blank=True, default='', max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('success', 'Success'), ('failed', 'Failed'), ('abandoned', 'Abandoned'), ('reversed', 'Reversed')], max_length=20)),
+                ('payments_count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+                ('channel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='paychannel.paymentchannel')),
+                ('merchant', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPaymentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('channel_type', models.CharField(choices=[('paylink', 'Paylink'), ('ussd', 'USSD')], max_length=20)),
+                ('charge_type', models.CharField(blank=True, default='', max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('success', 'Success'), ('failed', 'Failed'), ('abandoned', 'Abandoned'), ('reversed', 'Reversed')], max_length=20)),
+                ('payments_count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+                ('channel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='paychannel.paymentchannel')),
+                ('merchant', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='hourlypaymentrollup',
+            constraint=models.UniqueConstraint(fields=('merchant', 'bucket', 'channel', 'channel_type', 'charge_type', 'status'), name='payment_hourlypaymentrollup_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailypaymentrollup',
+            constraint=models.UniqueConstraint(fields=('merchant', 'bucket', 'channel', 'channel_type', 'charge_type', 'status'), name='payment_dailypaymentrollup_key'),
+        ),
+        migrations.RunPython(seed_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.27 on 2026-10-16 23:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('payment', '0010_payment_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentStatusAudit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(choices=[('pending', 'Pending'), ('success', 'Success'), ('failed', 'Failed'), ('abandoned', 'Abandoned'), ('reversed', 'Reversed')], max_length=20)),
+                ('to_status', models.CharField(choices=[('pending', 'Pending'), ('success', 'Success'), ('failed', 'Failed'), ('abandoned', 'Abandoned'), ('reversed', 'Reversed')], max_length=20)),
+                ('source', models.CharField(choices=[('admin', 'Admin'), ('api', 'API'), ('webhook', 'Webhook'), ('reconciliation', 'Reconciliation'), ('outbox', 'Outbox'), ('system', 'System')], default='system', max_length=20)),
+                ('note', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_audits', to='payment.payment')),
+            ],
+        ),
+    ]
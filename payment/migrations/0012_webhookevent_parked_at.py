@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 00:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0011_paymentstatusaudit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookevent',
+            name='parked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
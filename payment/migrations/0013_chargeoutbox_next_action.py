@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 00:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0012_webhookevent_parked_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chargeoutbox',
+            name='next_action',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
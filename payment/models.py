@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 import uuid
 
 # Create your models here.
@@ -33,8 +34,25 @@ class Payment(models.Model):
         ("card", "Card"),
     ]
 
+    GATEWAY_CHOICES = [
+        ("paystack", "Paystack"),
+        ("payswitch", "PaySwitch"),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    channel = models.ForeignKey("paychannel.PaymentChannel", on_delete=models.CASCADE, related_name="payments")
+    # Indexed by payment_channel_created_idx below (channel_id is its leading column)
+    channel = models.ForeignKey(
+        "paychannel.PaymentChannel", on_delete=models.CASCADE, related_name="payments", db_index=False
+    )
+    # Channel owner, copied on insert so a merchant's history is one index range (no join, no sort)
+    merchant = models.ForeignKey(
+        "authentications.CustomUser",
+        on_delete=models.CASCADE,
+        related_name="payments",
+        null=True,
+        editable=False,
+        db_index=False,
+    )
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     reference = models.CharField(max_length=100, unique=True)
     phone_number = models.CharField(max_length=20 , blank=True, null=True)
@@ -42,8 +60,211 @@ class Payment(models.Model):
     charge_type = models.CharField(max_length=20, choices=CHARGE_TYPE, blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
     channel_type =  models.CharField(max_length=20, choices=CHANNEL_TYPE)
+    # Gateway that took the charge — verification must go back to the same one
+    gateway = models.CharField(max_length=20, choices=GATEWAY_CHOICES, default="paystack")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Newest first with id as tie-breaker, matching the keyset pages of the payment list
+        indexes = [
+            models.Index(fields=["merchant", "created_at", "id"], name="payment_merchant_created_idx"),
+            models.Index(fields=["merchant", "status", "created_at", "id"], name="payment_merchant_status_idx"),
+            models.Index(fields=["channel", "created_at", "id"], name="payment_channel_created_idx"),
+            models.Index(fields=["status", "created_at", "id"], name="payment_status_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.reference} - {self.status}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status as loaded, so save() can tell a status change apart
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
+    def save(self, *args, **kwargs):
+        from paychannel.models import PaymentChannel
+        from paychannel.stats import record_payments, record_status_changes
+        from payment import rollups
+
+        creating = self._state.adding
+        previous = getattr(self, "_loaded_status", None)
+        if creating and self.merchant_id is None and self.channel_id is not None:
+            # Callers holding a channel snapshot pass merchant_id and skip the lookup
+            if Payment.channel.is_cached(self):
+                self.merchant_id = self.channel.user_id
+            else:
+                self.merchant_id = (
+                    PaymentChannel.objects.values_list("user_id", flat=True).get(pk=self.channel_id)
+                )
+        # Channel totals and rollups commit or roll back together with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if creating:
+                record_payments([(self.channel_id, self.status, self.channel_type, self.amount, self.created_at)])
+                rollups.record_payments([(
+                    self.merchant_id, self.channel_id, self.channel_type, self.charge_type,
+                    self.status, self.amount, self.created_at,
+                )])
+            elif previous is not None and previous != self.status:
+                record_status_changes([(self.channel_id, previous, self.channel_type, self.amount)], self.status)
+                rollups.record_status_changes([(
+                    self.merchant_id, self.channel_id, self.channel_type, self.charge_type,
+                    previous, self.amount, self.created_at,
+                )], self.status)
+        self._loaded_status = self.status
+
+
+
+class PaymentStatusAudit(models.Model):
+    """
+    One status change of a Payment made through the transition engine
+    (payment/transitions.py), written in bulk with the change itself.
+    """
+
+    SOURCE_ADMIN = "admin"
+    SOURCE_API = "api"
+    SOURCE_WEBHOOK = "webhook"
+    SOURCE_RECONCILIATION = "reconciliation"
+    SOURCE_OUTBOX = "outbox"
+    SOURCE_SYSTEM = "system"
+
+    SOURCE_CHOICES = [
+        (SOURCE_ADMIN, "Admin"),
+        (SOURCE_API, "API"),
+        (SOURCE_WEBHOOK, "Webhook"),
+        (SOURCE_RECONCILIATION, "Reconciliation"),
+        (SOURCE_OUTBOX, "Outbox"),
+        (SOURCE_SYSTEM, "System"),
+    ]
+
+    payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name="status_audits")
+    from_status = models.CharField(max_length=20, choices=Payment.STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=Payment.STATUS_CHOICES)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default=SOURCE_SYSTEM)
+    actor = models.ForeignKey(
+        "authentications.CustomUser", on_delete=models.SET_NULL, related_name="+", blank=True, null=True
+    )
+    note = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.payment_id}: {self.from_status} → {self.to_status}"
+
+
+
+class PaymentRollup(models.Model):
+    """
+    Payment count and amount for one (merchant, channel, channel_type,
+    charge_type, status) per time bucket. Kept current in the same
+    transaction as every Payment insert, status change and delete
+    (payment/rollups.py); rebuild with `manage.py rebuild_payment_rollups`.
+    """
+    bucket = models.DateTimeField()   # start of the hour / day (settings.TIME_ZONE)
+    merchant = models.ForeignKey(
+        "authentications.CustomUser", on_delete=models.CASCADE, related_name="+", db_index=False
+    )
+    channel = models.ForeignKey("paychannel.PaymentChannel", on_delete=models.CASCADE, related_name="+")
+    channel_type = models.CharField(max_length=20, choices=Payment.CHANNEL_TYPE)
+    charge_type = models.CharField(max_length=20, blank=True, default="")   # "" when the payment has none
+    status = models.CharField(max_length=20, choices=Payment.STATUS_CHOICES)
+    payments_count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        abstract = True
+        # Merchant first: a dashboard read is one range scan over (merchant, bucket)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["merchant", "bucket", "channel", "channel_type", "charge_type", "status"],
+                name="%(app_label)s_%(class)s_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.bucket:%Y-%m-%d %H:%M} {self.channel_id} {self.status}: {self.payments_count}"
+
+
+class HourlyPaymentRollup(PaymentRollup):
+    class Meta(PaymentRollup.Meta):
+        pass
+
+
+class DailyPaymentRollup(PaymentRollup):
+    class Meta(PaymentRollup.Meta):
+        pass
+
+
+
+class WebhookEvent(models.Model):
+    """
+    Raw gateway webhook, stored before any processing.
+    event_id is unique so redelivered events are dropped on insert.
+    """
+
+    event_id = models.CharField(max_length=255, unique=True)
+    event = models.CharField(max_length=100)
+    reference = models.CharField(max_length=100, blank=True, null=True, db_index=True)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    # Set once an event has failed MAX_ATTEMPTS times; it is skipped until requeued from the admin
+    parked_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["processed_at", "received_at"], name="webhook_unprocessed_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.event} - {self.reference}"
+
+
+
+class ChargeOutbox(models.Model):
+    """
+    Gateway charge waiting to be sent, written in the same transaction as its
+    pending Payment. Dispatcher workers claim rows, call the gateway and
+    record the outcome (see payment/outbox.py).
+    """
+
+    STATE_PENDING = "pending"
+    STATE_IN_FLIGHT = "in_flight"
+    STATE_SENT = "sent"
+    STATE_FAILED = "failed"
+    STATE_UNKNOWN = "unknown"
+
+    STATE_CHOICES = [
+        (STATE_PENDING, "Pending"),
+        (STATE_IN_FLIGHT, "In flight"),
+        (STATE_SENT, "Sent"),
+        (STATE_FAILED, "Failed"),
+        (STATE_UNKNOWN, "Unknown"),   # gateway may have taken it — settle via verify / webhook
+    ]
+
+    payment = models.OneToOneField(Payment, on_delete=models.CASCADE, related_name="outbox")
+    currency = models.CharField(max_length=3, default="GHS")
+    payload = models.JSONField()
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default=STATE_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    gateway = models.CharField(max_length=20, blank=True, null=True)
+    response = models.JSONField(blank=True, null=True)
+    # What the customer still has to do for a sent charge (e.g. send_otp), "" if nothing
+    next_action = models.CharField(max_length=20, blank=True, default="")
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["state", "available_at"], name="outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.payment_id} - {self.state}"
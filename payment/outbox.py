@@ -0,0 +1,224 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .background import submit
+from .gateways import GATEWAY_ERRORS, GatewayUnavailable, get_router
+from .models import ChargeOutbox, Payment, PaymentStatusAudit
+from .transitions import apply_status_changes
+
+
+# -----------------------------
+# Outbox defaults
+# -----------------------------
+# Override any key in settings.PAYMENT_CHARGE_OUTBOX.
+DEFAULT_OUTBOX_SETTINGS = {
+    "ENABLED": False,          # CreatePaymentAPIView enqueues and returns 202 instead of charging inline
+    "MAX_ATTEMPTS": 5,         # attempts while no gateway is reachable before the payment is failed
+    "RETRY_SECONDS": 5,        # first retry delay, doubled on every attempt
+    "LEASE_SECONDS": 120,      # a claimed row not finished by then is treated as a crashed dispatch
+}
+
+
+def outbox_settings() -> dict:
+    return {**DEFAULT_OUTBOX_SETTINGS, **getattr(settings, "PAYMENT_CHARGE_OUTBOX", {})}
+
+
+def outbox_enabled() -> bool:
+    return bool(outbox_settings()["ENABLED"])
+
+
+# -----------------------------
+# Enqueue
+# -----------------------------
+def enqueue_charge(payment_fields: dict, currency: str = "GHS", **charge_kwargs) -> Payment:
+    """
+    Create the pending Payment and its outbox row in one transaction.
+
+    After commit the charge is handed to the background executor; if that
+    process dies first, `manage.py dispatch_outbox` picks the row up.
+    """
+    with transaction.atomic():
+        payment = Payment.objects.create(status=Payment.STATUS_PENDING, **payment_fields)
+        entry = ChargeOutbox.objects.create(
+            payment=payment,
+            currency=currency,
+            payload={**charge_kwargs, "reference": payment.reference},
+        )
+        transaction.on_commit(lambda: submit(dispatch_one, entry.pk))
+    return payment
+
+
+# -----------------------------
+# Customer actions
+# -----------------------------
+# Charge statuses that wait on the customer rather than the gateway
+CUSTOMER_ACTIONS = ("send_otp", "send_pin", "send_phone", "send_birthday", "send_address", "open_url", "pay_offline")
+
+
+def customer_action(result: dict) -> str:
+    """
+    The next step a charge / submit_otp response asks of the customer, "" if none.
+    """
+    action = (result.get("data") or {}).get("status")
+    return action if action in CUSTOMER_ACTIONS else ""
+
+
+def record_customer_action(reference: str, result: dict) -> int:
+    """
+    After an accepted submit_otp, move the outbox row on to whatever the
+    gateway asks next so verify stops reporting the OTP as outstanding.
+    """
+    if result.get("status") is not True:
+        return 0
+    return ChargeOutbox.objects.filter(payment__reference=reference, state=ChargeOutbox.STATE_SENT).update(
+        next_action=customer_action(result)
+    )
+
+
+# -----------------------------
+# Dispatch
+# -----------------------------
+def claim(entry_id) -> bool:
+    """
+    Take a due pending row. The conditional UPDATE makes concurrent
+    dispatchers (threads or processes) race safely — exactly one wins.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=outbox_settings()["LEASE_SECONDS"])
+    return bool(
+        ChargeOutbox.objects
+        .filter(pk=entry_id, state=ChargeOutbox.STATE_PENDING, available_at__lte=now)
+        .update(
+            state=ChargeOutbox.STATE_IN_FLIGHT,
+            locked_until=now + lease,
+            attempts=F("attempts") + 1,
+        )
+    )
+
+
+def _finish(entry_id, **fields):
+    ChargeOutbox.objects.filter(pk=entry_id, state=ChargeOutbox.STATE_IN_FLIGHT).update(
+        locked_until=None,
+        dispatched_at=timezone.now(),
+        **fields,
+    )
+
+
+def _fail(entry, message):
+    with transaction.atomic():
+        _finish(entry.pk, state=ChargeOutbox.STATE_FAILED, last_error=message)
+        apply_status_changes({entry.payment.reference: Payment.STATUS_FAILED}, source=PaymentStatusAudit.SOURCE_OUTBOX)
+
+
+def dispatch_one(entry_id) -> str:
+    """
+    Claim one outbox row, send its charge through the gateway router and
+    record the outcome. Returns the final outbox state ("" if not claimed).
+
+    - charge accepted  → sent, Payment.gateway set; status settles via
+                         verify / webhook / reconciliation as before. If the
+                         gateway wants more from the customer (Paystack
+                         send_otp) it is kept in next_action for verify
+    - charge declined  → failed, Payment failed
+    - no gateway up    → back to pending with exponential backoff, failed
+                         after MAX_ATTEMPTS
+    - transport error  → unknown; the gateway may have taken the charge, so
+                         it is never re-sent and the Payment stays pending
+    """
+    if not claim(entry_id):
+        return ""
+
+    config = outbox_settings()
+    entry = ChargeOutbox.objects.select_related("payment").get(pk=entry_id)
+
+    try:
+        gateway_name, result = get_router().charge(entry.currency, **entry.payload)
+    except GatewayUnavailable as e:
+        if entry.attempts >= config["MAX_ATTEMPTS"]:
+            _fail(entry, str(e))
+            return ChargeOutbox.STATE_FAILED
+        delay = config["RETRY_SECONDS"] * 2 ** (entry.attempts - 1)
+        ChargeOutbox.objects.filter(pk=entry.pk, state=ChargeOutbox.STATE_IN_FLIGHT).update(
+            state=ChargeOutbox.STATE_PENDING,
+            locked_until=None,
+            available_at=timezone.now() + timedelta(seconds=delay),
+            last_error=str(e),
+        )
+        return ChargeOutbox.STATE_PENDING
+    except GATEWAY_ERRORS as e:
+        _finish(entry.pk, state=ChargeOutbox.STATE_UNKNOWN, last_error=str(e))
+        return ChargeOutbox.STATE_UNKNOWN
+    except ValueError as e:
+        # Invalid provider / amount — nothing was sent and retrying won't help
+        _fail(entry, str(e))
+        return ChargeOutbox.STATE_FAILED
+
+    if result.get("error"):
+        _finish(entry.pk, state=ChargeOutbox.STATE_UNKNOWN, gateway=gateway_name,
+                response=result, last_error=result.get("message", ""))
+        Payment.objects.filter(pk=entry.payment_id).update(gateway=gateway_name)
+        return ChargeOutbox.STATE_UNKNOWN
+
+    if result.get("status") is True:
+        with transaction.atomic():
+            _finish(entry.pk, state=ChargeOutbox.STATE_SENT, gateway=gateway_name, response=result,
+                    next_action=customer_action(result))
+            Payment.objects.filter(pk=entry.payment_id).update(gateway=gateway_name)
+        return ChargeOutbox.STATE_SENT
+
+    with transaction.atomic():
+        _finish(entry.pk, state=ChargeOutbox.STATE_FAILED, gateway=gateway_name,
+                response=result, last_error=result.get("message", ""))
+        Payment.objects.filter(pk=entry.payment_id).update(gateway=gateway_name)
+        apply_status_changes({entry.payment.reference: Payment.STATUS_FAILED}, source=PaymentStatusAudit.SOURCE_OUTBOX)
+    return ChargeOutbox.STATE_FAILED
+
+
+def expire_stale_leases() -> int:
+    """
+    Rows whose dispatcher died mid-call. The charge may or may not have
+    reached a gateway, so they become unknown rather than being re-sent.
+    """
+    return (
+        ChargeOutbox.objects
+        .filter(state=ChargeOutbox.STATE_IN_FLIGHT, locked_until__lt=timezone.now())
+        .update(state=ChargeOutbox.STATE_UNKNOWN, locked_until=None, last_error="Dispatch lease expired")
+    )
+
+
+def _dispatch_in_worker(entry_id):
+    close_old_connections()
+    try:
+        return dispatch_one(entry_id)
+    finally:
+        connections.close_all()
+
+
+def dispatch_pending(limit: int = 100, workers: int = 8) -> dict:
+    """
+    Drain up to `limit` due outbox rows with `workers` concurrent dispatchers.
+    Returns {state: count} for the rows handled.
+    """
+    expired = expire_stale_leases()
+
+    due = list(
+        ChargeOutbox.objects
+        .filter(state=ChargeOutbox.STATE_PENDING, available_at__lte=timezone.now())
+        .order_by("available_at")
+        .values_list("pk", flat=True)[:limit]
+    )
+
+    summary = {"due": len(due), "expired": expired}
+    if not due:
+        return summary
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(due)), thread_name_prefix="kivipay-outbox") as pool:
+        for state in pool.map(_dispatch_in_worker, due):
+            if state:
+                summary[state] = summary.get(state, 0) + 1
+    return summary
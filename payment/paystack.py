@@ -1,13 +1,25 @@
+import asyncio
 import requests
+import httpx
 import hmac
 import hashlib
 import json
 from django.conf import settings
 from decimal import Decimal
 
+from .sessions import (
+    get_session_pool,
+    gateway_timeout,
+    gateway_settings,
+    get_async_http_client,
+    async_gateway_timeout,
+)
+from .metrics import instrument
+
 
 class PaystackMobileMoney:
     BASE_URL = "https://api.paystack.co"
+    GATEWAY = "paystack"
 
     # -----------------------------
     # Mobile Money Providers
@@ -31,6 +43,41 @@ class PaystackMobileMoney:
             "Authorization": f"Bearer {self.secret_key}",
             "Content-Type": "application/json",
         }
+        # BASE_URL can be pointed at a local fake gateway (loadtest/fake_gateway.py)
+        self.BASE_URL = (gateway_settings(self.GATEWAY).get("BASE_URL") or self.BASE_URL).rstrip("/")
+        self.pool = get_session_pool(self.GATEWAY)
+
+    def _request(self, method: str, path: str, timeout=None, **kwargs):
+        """
+        Send a request over a pooled keep-alive session.
+        timeout: (connect, read) tuple or a single number; defaults to PAYMENT_GATEWAYS settings.
+        """
+        if timeout is None:
+            timeout = gateway_timeout(self.GATEWAY)
+
+        with self.pool.session() as session:
+            return session.request(
+                method,
+                f"{self.BASE_URL}{path}",
+                headers=self.headers,
+                timeout=timeout,
+                **kwargs,
+            )
+
+    @staticmethod
+    def _result(response) -> dict:
+        """
+        Response body; a 5xx becomes an "error" result (as PaySwitch reports
+        transport failures) so the gateway router counts it against Paystack.
+        """
+        if response.status_code >= 500:
+            return {
+                "status": False,
+                "message": f"Paystack returned HTTP {response.status_code}",
+                "data": None,
+                "error": "server",
+            }
+        return response.json()
 
     # -----------------------------
     # List Providers
@@ -56,6 +103,7 @@ class PaystackMobileMoney:
     # ------------------------------------
     # CREATE MOBILE MONEY CHARGE
     # ------------------------------------
+    @instrument("charge")
     def charge(
         self,
         email: str,
@@ -66,12 +114,32 @@ class PaystackMobileMoney:
         account: str = None,
         reference: str = None,
         metadata: dict = None,
+        timeout=None,
     ):
         """
         amount: in subunit (GHS pesewas / KES cents)
         provider_name: human-friendly name, e.g., 'MTN', 'M-PESA'
+        timeout: optional (connect, read) override for this call
         """
+        payload = self.build_charge_payload(
+            email, amount, currency, provider_name, phone, account, reference, metadata
+        )
+
+        response = self._request("POST", "/charge", json=payload, timeout=timeout)
+
+        return self._result(response)
 
+    def build_charge_payload(
+        self,
+        email: str,
+        amount: int,
+        currency: str,
+        provider_name: str,
+        phone: str = None,
+        account: str = None,
+        reference: str = None,
+        metadata: dict = None,
+    ) -> dict:
         if not self.is_valid_provider(provider_name):
             raise ValueError(f"Invalid provider: {provider_name}. Use PaystackMobileMoney.list_providers()")
 
@@ -95,31 +163,18 @@ class PaystackMobileMoney:
         if metadata:
             payload["metadata"] = metadata
 
-        response = requests.post(
-            f"{self.BASE_URL}/charge",
-            headers=self.headers,
-            json=payload,
-            timeout=30,
-        )
-
-        return response.json()
+        return payload
     
-    def submit_otp(self, otp, reference):
-        url = f"{self.BASE_URL}/charge/submit_otp"
-
-        headers = {
-            "Authorization": f"Bearer {self.secret_key}",
-            "Content-Type": "application/json",
-        }
-
+    @instrument("submit_otp")
+    def submit_otp(self, otp, reference, timeout=None):
         payload = {
             "otp": otp,
             "reference": reference,
         }
 
-        response = requests.post(url, json=payload, headers=headers)
+        response = self._request("POST", "/charge/submit_otp", json=payload, timeout=timeout)
         
-        return response.json()
+        return self._result(response)
     
     @staticmethod
     def to_pesewas(amount):
@@ -135,11 +190,106 @@ class PaystackMobileMoney:
     # ------------------------------------
     # VERIFY TRANSACTION (FALLBACK)
     # ------------------------------------
-    def verify(self, reference: str):
-        response = requests.get(
-            f"{self.BASE_URL}/transaction/verify/{reference}",
-            headers=self.headers,
-            timeout=30,
+    @instrument("verify")
+    def verify(self, reference: str, timeout=None):
+        # GET — retried with backoff by the session pool on connection errors / 5xx
+        response = self._request("GET", f"/transaction/verify/{reference}", timeout=timeout)
+        return self._result(response)
+
+    # ------------------------------------
+    # LIST TRANSACTIONS (RECONCILIATION)
+    # ------------------------------------
+    @instrument("list_transactions")
+    def list_transactions(
+        self,
+        from_date=None,
+        to_date=None,
+        page: int = 1,
+        per_page: int = 100,
+        status: str = None,
+        timeout=None,
+    ):
+        """
+        One page of the transaction listing.
+        from_date / to_date: datetimes (or ISO strings) bounding the window.
+        Response meta carries page / pageCount / total.
+        """
+        params = {"page": page, "perPage": per_page}
+        if from_date:
+            params["from"] = from_date.isoformat() if hasattr(from_date, "isoformat") else from_date
+        if to_date:
+            params["to"] = to_date.isoformat() if hasattr(to_date, "isoformat") else to_date
+        if status:
+            params["status"] = status
+
+        response = self._request("GET", "/transaction", params=params, timeout=timeout)
+        return self._result(response)
+
+
+
+class AsyncPaystackMobileMoney(PaystackMobileMoney):
+    """
+    asyncio version of PaystackMobileMoney for ASGI views.
+    charge / submit_otp / verify are coroutines; helpers are inherited.
+    """
+
+    async def _request(self, method: str, path: str, timeout=None, **kwargs):
+        client = get_async_http_client(self.GATEWAY)
+        timeout = async_gateway_timeout(self.GATEWAY, timeout)
+
+        if method != "GET":
+            return await client.request(
+                method, f"{self.BASE_URL}{path}", headers=self.headers, timeout=timeout, **kwargs
+            )
+
+        # Idempotent: retry read errors / 5xx with backoff, like the sync session pool
+        config = gateway_settings(self.GATEWAY)
+        retries = config["RETRIES"]
+        for attempt in range(retries + 1):
+            try:
+                response = await client.request(
+                    method, f"{self.BASE_URL}{path}", headers=self.headers, timeout=timeout, **kwargs
+                )
+                if response.status_code not in config["RETRY_STATUSES"] or attempt == retries:
+                    return response
+            except httpx.TransportError:
+                if attempt == retries:
+                    raise
+            await asyncio.sleep(config["BACKOFF_FACTOR"] * (2 ** attempt))
+
+    @instrument("charge")
+    async def charge(
+        self,
+        email: str,
+        amount: int,
+        currency: str,
+        provider_name: str,
+        phone: str = None,
+        account: str = None,
+        reference: str = None,
+        metadata: dict = None,
+        timeout=None,
+    ):
+        payload = self.build_charge_payload(
+            email, amount, currency, provider_name, phone, account, reference, metadata
         )
-        return response.json()
 
+        response = await self._request("POST", "/charge", json=payload, timeout=timeout)
+
+        return self._result(response)
+
+    @instrument("submit_otp")
+    async def submit_otp(self, otp, reference, timeout=None):
+        payload = {
+            "otp": otp,
+            "reference": reference,
+        }
+
+        response = await self._request("POST", "/charge/submit_otp", json=payload, timeout=timeout)
+
+        return self._result(response)
+
+    @instrument("verify")
+    async def verify(self, reference: str, timeout=None):
+        response = await self._request("GET", f"/transaction/verify/{reference}", timeout=timeout)
+        return self._result(response)
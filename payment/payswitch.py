@@ -1,9 +1,20 @@
 import uuid
 import requests
+import httpx
 from decimal import Decimal, ROUND_DOWN
 from requests.auth import HTTPBasicAuth
 from django.conf import settings
 
+from .sessions import (
+    get_session_pool,
+    gateway_timeout,
+    gateway_settings,
+    get_async_http_client,
+    async_gateway_timeout,
+    request_not_sent,
+)
+from .metrics import instrument
+
 
 class PaySwitchMobileMoney:
     """
@@ -11,6 +22,7 @@ class PaySwitchMobileMoney:
     """
 
     BASE_URL = "https://prod.theteller.net/v1.1"
+    GATEWAY = "payswitch"
     PROCESSING_CODE = "000200"
 
     # -----------------------------
@@ -32,6 +44,9 @@ class PaySwitchMobileMoney:
             "Content-Type": "application/json",
             "Cache-Control": "no-cache",
         }
+        # BASE_URL can be pointed at a local fake gateway (loadtest/fake_gateway.py)
+        self.BASE_URL = (gateway_settings(self.GATEWAY).get("BASE_URL") or self.BASE_URL).rstrip("/")
+        self.pool = get_session_pool(self.GATEWAY)
 
     # ======================================================
     # MONEY — EXACT RUST EQUIVALENT
@@ -86,6 +101,7 @@ class PaySwitchMobileMoney:
     # CHARGE (MoMo ONLY)
     # ======================================================
 
+    @instrument("charge")
     def charge(
         self,
         email: str,
@@ -96,12 +112,72 @@ class PaySwitchMobileMoney:
         account: str = None,
         reference: str = None,
         metadata: dict = None,
+        timeout=None,
     ):
         """
         amount: GHS (Decimal / int / string)
         currency: GHS only
+        timeout: optional (connect, read) override for this call
         """
 
+        body = self.build_charge_body(
+            email, amount, currency, provider_name, phone, account, reference, metadata
+        )
+
+            # -----------------------------
+            # MAKE REQUEST TO PAYMENT GATEWAY
+            # -----------------------------
+        if timeout is None:
+            timeout = gateway_timeout(self.GATEWAY)
+
+        try:
+            with self.pool.session() as session:
+                response = session.post(
+                    f"{self.BASE_URL}/transaction/process",
+                    auth=self.auth,
+                    headers=self.headers,
+                    json=body,
+                    timeout=timeout,
+                )
+            # response.raise_for_status()  # raise exception if HTTP 4xx/5xx
+
+            try:
+                response_json = response.json()
+            except ValueError:
+                return {
+                    "status": False,
+                    "message": "Invalid JSON response from payment provider",
+                    "data": None,
+                }
+
+        except (requests.exceptions.RequestException, AssertionError) as e:
+            # Network errors / gateway down
+            return {
+                "status": False,
+                "message": f"Payment request failed: {str(e)}",
+                "data": None,
+                # "connect" means the request never reached PaySwitch; anything
+                # else (reset, disconnect, read timeout) may have created the charge
+                "error": (
+                    "connect" if request_not_sent(e)
+                    else "timeout" if isinstance(e, requests.exceptions.Timeout)
+                    else "transport"
+                ),
+            }
+
+        return self.interpret_charge_response(response_json)
+
+    def build_charge_body(
+        self,
+        email: str,
+        amount,
+        currency: str,
+        provider_name: str,
+        phone: str = None,
+        account: str = None,
+        reference: str = None,
+        metadata: dict = None,
+    ) -> dict:
         if currency.upper() != "GHS":
             raise ValueError("PaySwitch supports GHS only")
 
@@ -116,7 +192,7 @@ class PaySwitchMobileMoney:
 
         formatted_amount = self.to_minor_units(Decimal(str(amount)))
 
-        body = {
+        return {
             "amount": formatted_amount,  # ✅ 12-digit pesewas
             "processing_code": self.PROCESSING_CODE,
             "transaction_id": payment_reference,
@@ -131,36 +207,8 @@ class PaySwitchMobileMoney:
             "customer_email": email,
         }
 
-            # -----------------------------
-            # MAKE REQUEST TO PAYMENT GATEWAY
-            # -----------------------------
-        try:
-            response = requests.post(
-                f"{self.BASE_URL}/transaction/process",
-                auth=self.auth,
-                headers=self.headers,
-                json=body,
-                # timeout=30,
-            )
-            # response.raise_for_status()  # raise exception if HTTP 4xx/5xx
-
-            try:
-                response_json = response.json()
-            except ValueError:
-                return {
-                    "status": False,
-                    "message": "Invalid JSON response from payment provider",
-                    "data": None,
-                }
-
-        except (requests.exceptions.RequestException, AssertionError) as e:
-            # Network errors / gateway down
-            return {
-                "status": False,
-                "message": f"Payment request failed: {str(e)}",
-                "data": None,
-            }
-
+    @staticmethod
+    def interpret_charge_response(response_json: dict) -> dict:
         # -----------------------------
         # HANDLE PAYMENT STATUS
         # -----------------------------
@@ -186,6 +234,95 @@ class PaySwitchMobileMoney:
                     "message": "Payment failed",
                     "data": response_json,
                 }
-                    
-                    
-                
\ No newline at end of file
+
+    # ======================================================
+    # VERIFY (TRANSACTION STATUS)
+    # ======================================================
+
+    def verify_headers(self) -> dict:
+        return {**self.headers, "Merchant-Id": self.merchant_id}
+
+    @instrument("verify")
+    def verify(self, reference: str, timeout=None):
+        """
+        Status of a transaction by transaction_id.
+        GET — retried with backoff by the session pool on connection errors / 5xx.
+        """
+        if timeout is None:
+            timeout = gateway_timeout(self.GATEWAY)
+
+        with self.pool.session() as session:
+            response = session.get(
+                f"{self.BASE_URL}/users/transactions/{reference}/status",
+                headers=self.verify_headers(),
+                timeout=timeout,
+            )
+        return response.json()
+
+
+class AsyncPaySwitchMobileMoney(PaySwitchMobileMoney):
+    """
+    asyncio version of PaySwitchMobileMoney for ASGI views.
+    """
+
+    @instrument("charge")
+    async def charge(
+        self,
+        email: str,
+        amount,
+        currency: str,
+        provider_name: str,
+        phone: str = None,
+        account: str = None,
+        reference: str = None,
+        metadata: dict = None,
+        timeout=None,
+    ):
+        body = self.build_charge_body(
+            email, amount, currency, provider_name, phone, account, reference, metadata
+        )
+
+        client = get_async_http_client(self.GATEWAY)
+
+        try:
+            response = await client.post(
+                f"{self.BASE_URL}/transaction/process",
+                auth=(self.username, self.api_key),
+                headers=self.headers,
+                json=body,
+                timeout=async_gateway_timeout(self.GATEWAY, timeout),
+            )
+
+            try:
+                response_json = response.json()
+            except ValueError:
+                return {
+                    "status": False,
+                    "message": "Invalid JSON response from payment provider",
+                    "data": None,
+                }
+
+        except httpx.HTTPError as e:
+            # Network errors / gateway down
+            return {
+                "status": False,
+                "message": f"Payment request failed: {str(e)}",
+                "data": None,
+                "error": (
+                    "connect" if request_not_sent(e)
+                    else "timeout" if isinstance(e, httpx.TimeoutException)
+                    else "transport"
+                ),
+            }
+
+        return self.interpret_charge_response(response_json)
+
+    @instrument("verify")
+    async def verify(self, reference: str, timeout=None):
+        client = get_async_http_client(self.GATEWAY)
+        response = await client.get(
+            f"{self.BASE_URL}/users/transactions/{reference}/status",
+            headers=self.verify_headers(),
+            timeout=async_gateway_timeout(self.GATEWAY, timeout),
+        )
+        return response.json()
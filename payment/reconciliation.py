@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .clients import get_paystack
+from .models import Payment, PaymentStatusAudit
+from .transitions import apply_status_changes, map_gateway_status
+
+
+# Charges are created at the gateway a moment before the local Payment row,
+# so the listing window is widened a little on both sides.
+WINDOW_SLACK = timedelta(minutes=5)
+
+
+def reconcile_pending(since, until=None, per_page: int = 100, min_age: timedelta = timedelta(minutes=1), client=None) -> dict:
+    """
+    Settle pending Paystack payments created in [since, until) in bulk.
+
+    1. Load the pending references for the window into memory (one query).
+    2. Page through Paystack's transaction listing for the same window and
+       match each transaction to a pending reference by dict lookup.
+    3. Apply all transitions with batched conditional UPDATEs via
+       map_gateway_status → apply_status_changes.
+
+    Thousands of pending rows cost ceil(transactions / per_page) HTTP calls
+    instead of one verify per payment. Payments younger than `min_age` are
+    skipped — the customer may still be approving them.
+    """
+    client = client or get_paystack()
+    until = until or timezone.now() - min_age
+
+    pending = set(
+        Payment.objects.filter(
+            status=Payment.STATUS_PENDING,
+            gateway="paystack",
+            created_at__gte=since,
+            created_at__lt=until,
+        ).values_list("reference", flat=True)
+    )
+
+    summary = {"pending": len(pending), "pages": 0, "matched": 0, "updated": 0}
+    if not pending:
+        return summary
+
+    changes = {}
+    unmatched = set(pending)
+    page = 1
+
+    while unmatched:
+        response = client.list_transactions(
+            from_date=since - WINDOW_SLACK,
+            to_date=until + WINDOW_SLACK,
+            page=page,
+            per_page=per_page,
+        )
+        summary["pages"] += 1
+
+        if not response or response.get("status") is False:
+            summary["error"] = (response or {}).get("message", "Transaction listing failed")
+            break
+
+        transactions = response.get("data") or []
+        for txn in transactions:
+            reference = txn.get("reference")
+            if reference not in unmatched:
+                continue
+            unmatched.discard(reference)
+            summary["matched"] += 1
+
+            new_status = map_gateway_status(txn.get("status"))
+            if new_status != Payment.STATUS_PENDING:
+                changes[reference] = new_status
+
+        meta = response.get("meta") or {}
+        if not transactions or page >= int(meta.get("pageCount") or page):
+            break
+        page += 1
+
+    summary["updated"] = apply_status_changes(changes, source=PaymentStatusAudit.SOURCE_RECONCILIATION)
+    return summary
@@ -0,0 +1,281 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import DailyPaymentRollup, HourlyPaymentRollup, Payment
+
+
+# ======================================================
+# TIME-BUCKETED PAYMENT ROLLUPS
+# ======================================================
+# Every Payment adds one to payments_count and its amount to amount of the
+# (merchant, channel, channel_type, charge_type, status) row of its hour and
+# of its day, bucketed by created_at. A status change moves the payment from
+# the old-status row to the new one in the same buckets; a delete takes it
+# out. Callers run inside the transaction that writes the Payment, as with
+# the channel totals (paychannel/stats.py).
+
+DEFAULT_ROLLUP_SETTINGS = {
+    "REBUILD_WINDOW_DAYS": 7,   # payments aggregated per rebuild transaction
+    "MAX_HOURLY_DAYS": 31,      # longest range the dashboard serves by the hour
+    "MAX_DAILY_DAYS": 731,      # …and by the day
+}
+
+GRANULARITIES = {"hour": HourlyPaymentRollup, "day": DailyPaymentRollup}
+
+DIMENSIONS = ("channel", "channel_type", "charge_type", "status")
+
+
+def rollup_settings() -> dict:
+    return {**DEFAULT_ROLLUP_SETTINGS, **getattr(settings, "PAYMENT_ROLLUPS", {})}
+
+
+def hour_bucket(moment):
+    return timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(moment):
+    return timezone.localtime(moment).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+BUCKETS = ((HourlyPaymentRollup, hour_bucket), (DailyPaymentRollup, day_bucket))
+
+
+KEY_FIELDS = ("merchant", "bucket", "channel", "channel_type", "charge_type", "status")
+
+UPSERT_BATCH = 500
+
+
+def _upsert(model, deltas, now):
+    """
+    One INSERT … ON CONFLICT DO UPDATE per batch of keys, adding the deltas
+    to the rows that exist and creating the others (SQLite ≥ 3.24, PostgreSQL).
+    """
+    connection = transaction.get_connection()
+    quote = connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in KEY_FIELDS + ("payments_count", "amount", "updated_at")]
+    table = quote(model._meta.db_table)
+    columns = ", ".join(quote(field.column) for field in fields)
+    conflict = ", ".join(quote(model._meta.get_field(name).column) for name in KEY_FIELDS)
+    sums = ", ".join(
+        f"{quote(column)} = {table}.{quote(column)} + EXCLUDED.{quote(column)}" for column in ("payments_count", "amount")
+    )
+    row_sql = "(" + ", ".join(["%s"] * len(fields)) + ")"
+
+    items = list(deltas.items())
+    size = min(UPSERT_BATCH, connection.ops.bulk_batch_size(fields, items) or UPSERT_BATCH)
+    with connection.cursor() as cursor:
+        for i in range(0, len(items), size):
+            batch = items[i:i + size]
+            params = []
+            for (bucket, merchant_id, channel_id, channel_type, charge_type, status), delta in batch:
+                values = (merchant_id, bucket, channel_id, channel_type, charge_type, status,
+                          delta["payments_count"], delta["amount"], now)
+                params.extend(field.get_db_prep_save(value, connection) for field, value in zip(fields, values))
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) VALUES {', '.join([row_sql] * len(batch))} "
+                f"ON CONFLICT ({conflict}) DO UPDATE SET {sums}, "
+                f"{quote('updated_at')} = EXCLUDED.{quote('updated_at')}",
+                params,
+            )
+
+
+def _update_each(model, deltas, now, create=True):
+    """
+    One UPDATE per key, creating missing rows only if `create` (other databases, and deletes).
+    """
+    for key, delta in deltas.items():
+        lookup = dict(zip(("bucket", "merchant_id", "channel_id", "channel_type", "charge_type", "status"), key))
+        updates = {column: F(column) + value for column, value in delta.items()}
+        updates["updated_at"] = now
+        if not model.objects.filter(**lookup).update(**updates) and create:
+            model.objects.get_or_create(**lookup)
+            model.objects.filter(**lookup).update(**updates)
+
+
+def _apply(deltas: dict, create: bool = True):
+    """
+    {(model, key): Counter(payments_count=…, amount=…)} → a few upserts per table.
+    (A status move out of a row that was never counted leaves it negative
+    until the next rebuild — the totals were already off.)
+    """
+    now = timezone.now()
+    by_model = defaultdict(dict)
+    for (model, key), delta in deltas.items():
+        if delta["payments_count"] or delta["amount"]:
+            by_model[model][key] = delta
+    upsert = create and transaction.get_connection().vendor in ("sqlite", "postgresql")
+    for model, model_deltas in by_model.items():
+        if upsert:
+            _upsert(model, model_deltas, now)
+        else:
+            _update_each(model, model_deltas, now, create)
+
+
+def _add(deltas, merchant_id, channel_id, channel_type, charge_type, status, amount, created_at, sign):
+    for model, bucket in BUCKETS:
+        delta = deltas[model, (bucket(created_at), merchant_id, channel_id, channel_type, charge_type or "", status)]
+        delta["payments_count"] += sign
+        delta["amount"] += sign * Decimal(amount)
+
+
+# -----------------------------
+# Recording
+# -----------------------------
+def record_payments(rows, sign: int = 1):
+    """
+    rows: (merchant_id, channel_id, channel_type, charge_type, status, amount, created_at)
+    of inserted (sign=1) or deleted (sign=-1) payments.
+    """
+    deltas = defaultdict(Counter)
+    for merchant_id, *fields in rows:
+        if merchant_id is not None:
+            _add(deltas, merchant_id, *fields, sign)
+    # Deletes never create a row: in a channel cascade its rollups may already be gone
+    _apply(deltas, create=sign > 0)
+
+
+def record_status_changes(rows, new_status):
+    """
+    rows: (merchant_id, channel_id, channel_type, charge_type, old_status, amount, created_at)
+    of payments that moved to new_status.
+    """
+    deltas = defaultdict(Counter)
+    for merchant_id, channel_id, channel_type, charge_type, old_status, amount, created_at in rows:
+        if merchant_id is None or old_status == new_status:
+            continue
+        common = (merchant_id, channel_id, channel_type, charge_type)
+        _add(deltas, *common, old_status, amount, created_at, -1)
+        _add(deltas, *common, new_status, amount, created_at, 1)
+    _apply(deltas)
+
+
+# -----------------------------
+# Rebuild
+# -----------------------------
+def _rebuild_window(start, end, merchant_ids=None) -> tuple:
+    """
+    Replace both rollups for [start, end) — local midnights — with fresh
+    totals from the payment table: one grouped query by the hour, the days
+    summed from those hours.
+    """
+    payments = Payment.objects.filter(created_at__gte=start, created_at__lt=end, merchant__isnull=False)
+    scope = Q(bucket__gte=start, bucket__lt=end)
+    if merchant_ids is not None:
+        payments = payments.filter(merchant_id__in=merchant_ids)
+        scope &= Q(merchant_id__in=merchant_ids)
+
+    hourly = (
+        payments
+        .annotate(bucket=TruncHour("created_at"))
+        .values_list("bucket", "merchant_id", "channel_id", "channel_type", "charge_type", "status")
+        .order_by()
+        .annotate(payments_count=Count("id"), amount=Sum("amount"))
+    )
+
+    now = timezone.now()
+    fresh = {HourlyPaymentRollup: [], DailyPaymentRollup: defaultdict(Counter)}
+    fields = ("bucket", "merchant_id", "channel_id", "channel_type", "charge_type", "status")
+    with transaction.atomic():
+        # Lock the rows being replaced: payment writes on them wait, then land on the new totals
+        for model in GRANULARITIES.values():
+            list(model.objects.select_for_update().filter(scope).values_list("pk", flat=True))
+
+        for bucket, merchant_id, channel_id, channel_type, charge_type, status, count, amount in hourly.iterator(
+            chunk_size=2000
+        ):
+            key = (hour_bucket(bucket), merchant_id, channel_id, channel_type, charge_type or "", status)
+            fresh[HourlyPaymentRollup].append(
+                HourlyPaymentRollup(payments_count=count, amount=amount, updated_at=now, **dict(zip(fields, key)))
+            )
+            day = fresh[DailyPaymentRollup][(day_bucket(bucket), *key[1:])]
+            day["payments_count"] += count
+            day["amount"] += amount
+
+        days = [
+            DailyPaymentRollup(updated_at=now, **dict(zip(fields, key)), **totals)
+            for key, totals in fresh[DailyPaymentRollup].items()
+        ]
+        for model in GRANULARITIES.values():
+            model.objects.filter(scope).delete()
+        HourlyPaymentRollup.objects.bulk_create(fresh[HourlyPaymentRollup], batch_size=1000)
+        DailyPaymentRollup.objects.bulk_create(days, batch_size=1000)
+    return len(fresh[HourlyPaymentRollup]), len(days)
+
+
+def rebuild_rollups(since=None, until=None, merchant_ids=None) -> tuple:
+    """
+    Recompute the hourly and daily rollups from the payment table, from
+    `since` (default: the first payment) to `until` (default: now), widened
+    to whole days. Runs one transaction per REBUILD_WINDOW_DAYS so a full
+    history backfill never holds one long lock. Returns (hours, days) rows
+    written.
+    """
+    if merchant_ids is not None:
+        merchant_ids = list(merchant_ids)
+    if since is None:
+        payments = Payment.objects.all()
+        if merchant_ids is not None:
+            payments = payments.filter(merchant_id__in=merchant_ids)
+        since = payments.aggregate(first=Min("created_at"))["first"]
+        if since is None:
+            return 0, 0
+    until = until or timezone.now()
+
+    window = timedelta(days=rollup_settings()["REBUILD_WINDOW_DAYS"])
+    start, last = day_bucket(since), day_bucket(until + timedelta(days=1))
+    written = [0, 0]
+    while start < last:
+        end = min(day_bucket(start + window), last)
+        hours, days = _rebuild_window(start, end, merchant_ids)
+        written[0] += hours
+        written[1] += days
+        start = end
+    return tuple(written)
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+def rollup_series(merchant, granularity="day", since=None, until=None, channel_id=None, group_by=(), **filters):
+    """
+    Buckets in [since, until) for one merchant, summed over every dimension
+    not in group_by. Reads only the rollup table: one range scan over
+    (merchant, bucket).
+    """
+    model = GRANULARITIES[granularity]
+    bucket = hour_bucket if granularity == "hour" else day_bucket
+    rows = model.objects.filter(merchant=merchant, bucket__gte=bucket(since), bucket__lt=until)
+    if channel_id is not None:
+        rows = rows.filter(channel_id=channel_id)
+    for field in ("channel_type", "charge_type", "status"):
+        if field in filters:
+            rows = rows.filter(**{field: filters[field]})
+
+    keys = ["bucket"] + ["channel__slug" if field == "channel" else field for field in group_by]
+    success = Q(status=Payment.STATUS_SUCCESS)
+    series = (
+        rows.values(*keys)
+        .order_by(*keys)
+        .annotate(
+            total_count=Sum("payments_count"),
+            total_amount=Sum("amount"),
+            success_count=Sum("payments_count", filter=success),
+            success_amount=Sum("amount", filter=success),
+        )
+    )
+    for row in series:
+        row["payments_count"], row["amount"] = row.pop("total_count"), row.pop("total_amount")
+        if "channel__slug" in row:
+            row["channel"] = row.pop("channel__slug")
+        if "charge_type" in row:
+            row["charge_type"] = row["charge_type"] or None
+        for column in ("success_count", "success_amount"):
+            row[column] = row[column] or 0
+        yield row
@@ -1,5 +1,9 @@
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Payment
+from .rollups import DIMENSIONS, rollup_settings
 
 
 class CreatePaymentSerializer(serializers.ModelSerializer):
@@ -74,4 +78,129 @@ class VerifyPaymentSerializer(serializers.Serializer):
     reference = serializers.CharField(required=True,
         help_text="Payment reference returned during charge initialization"
     )
-    
\ No newline at end of file
+    
+
+
+class PaymentListSerializer(serializers.ModelSerializer):
+    """
+    A merchant's payment, as listed by /api/payments/.
+    """
+    channel = serializers.SlugRelatedField(slug_field="slug", read_only=True)
+
+    class Meta:
+        model = Payment
+        fields = [
+            "id",
+            "reference",
+            "channel",
+            "amount",
+            "status",
+            "channel_type",
+            "charge_type",
+            "gateway",
+            "phone_number",
+            "email",
+            "created_at",
+        ]
+
+
+class PaymentListFilterSerializer(serializers.Serializer):
+    """
+    Query-string filters for the payment list.
+    """
+    channel = serializers.CharField(required=False, help_text="Channel slug")
+    status = serializers.ChoiceField(choices=Payment.STATUS_CHOICES, required=False)
+    channel_type = serializers.ChoiceField(choices=Payment.CHANNEL_TYPE, required=False)
+    charge_type = serializers.ChoiceField(choices=Payment.CHARGE_TYPE, required=False)
+    created_after = serializers.DateTimeField(required=False, help_text="Inclusive lower bound on created_at")
+    created_before = serializers.DateTimeField(required=False, help_text="Exclusive upper bound on created_at")
+
+    def validate(self, attrs):
+        after, before = attrs.get("created_after"), attrs.get("created_before")
+        if after and before and after >= before:
+            raise serializers.ValidationError({"created_before": "Must be later than created_after."})
+        return attrs
+
+
+class PaymentDashboardFilterSerializer(serializers.Serializer):
+    """
+    Query-string parameters for the payment dashboard.
+    """
+    granularity = serializers.ChoiceField(choices=["hour", "day"], default="day")
+    since = serializers.DateTimeField(
+        required=False, help_text="Inclusive; default 48 hours (hour) or 30 days (day) before until"
+    )
+    until = serializers.DateTimeField(required=False, help_text="Exclusive; default now")
+    group_by = serializers.CharField(
+        required=False, default="", help_text="Comma-separated: channel, channel_type, charge_type, status"
+    )
+    channel = serializers.CharField(required=False, help_text="Channel slug")
+    status = serializers.ChoiceField(choices=Payment.STATUS_CHOICES, required=False)
+    channel_type = serializers.ChoiceField(choices=Payment.CHANNEL_TYPE, required=False)
+    charge_type = serializers.ChoiceField(choices=Payment.CHARGE_TYPE, required=False)
+
+    def validate_group_by(self, value):
+        fields = [field.strip() for field in value.split(",") if field.strip()]
+        unknown = sorted(set(fields) - set(DIMENSIONS))
+        if unknown:
+            raise serializers.ValidationError(f"Unknown dimension(s): {', '.join(unknown)}.")
+        return list(dict.fromkeys(fields))
+
+    def validate(self, attrs):
+        hourly = attrs["granularity"] == "hour"
+        until = attrs.setdefault("until", timezone.now())
+        since = attrs.setdefault("since", until - (timedelta(hours=48) if hourly else timedelta(days=30)))
+        if since >= until:
+            raise serializers.ValidationError({"until": "Must be later than since."})
+        limit = rollup_settings()["MAX_HOURLY_DAYS" if hourly else "MAX_DAILY_DAYS"]
+        if until - since > timedelta(days=limit):
+            raise serializers.ValidationError(
+                {"since": f"At most {limit} days by the {attrs['granularity']}."}
+            )
+        return attrs
+
+
+class PaymentRollupSerializer(serializers.Serializer):
+    """
+    One bucket of the dashboard series; the dimension fields are present when grouped by.
+    """
+    bucket = serializers.DateTimeField()
+    channel = serializers.CharField(required=False)
+    channel_type = serializers.CharField(required=False)
+    charge_type = serializers.CharField(required=False)
+    status = serializers.CharField(required=False)
+    payments_count = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    success_count = serializers.IntegerField()
+    success_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class PaymentDashboardTotalsSerializer(serializers.Serializer):
+    """
+    The dashboard series summed over the whole range.
+    """
+    payments_count = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    success_count = serializers.IntegerField()
+    success_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class PaymentTransitionSerializer(serializers.Serializer):
+    """
+    Request body for the bulk status transition endpoint.
+    """
+    references = serializers.ListField(
+        child=serializers.CharField(max_length=100), allow_empty=False, max_length=10000
+    )
+    status = serializers.ChoiceField(
+        choices=[choice for choice in Payment.STATUS_CHOICES if choice[0] != Payment.STATUS_PENDING]
+    )
+    note = serializers.CharField(max_length=255, required=False, default="", allow_blank=True)
+
+
+class PaymentTransitionResultSerializer(serializers.Serializer):
+    status = serializers.CharField()
+    changed = serializers.IntegerField(help_text="Payments moved to the new status")
+    skipped = serializers.DictField(
+        child=serializers.CharField(), help_text="Reference → reason, for payments left as they were"
+    )
@@ -0,0 +1,226 @@
+import asyncio
+import os
+import queue
+import threading
+import weakref
+from contextlib import contextmanager
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError, NewConnectionError
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+
+# -----------------------------
+# Per-gateway defaults
+# -----------------------------
+# Any key can be overridden in settings.PAYMENT_GATEWAYS["<gateway>"].
+DEFAULT_GATEWAY_SETTINGS = {
+    "POOL_SIZE": 10,            # persistent sessions (and connections per host) per gateway
+    "ASYNC_POOL_SIZE": 200,     # concurrent connections per gateway per event loop (async clients)
+    "CONNECT_TIMEOUT": 5,       # seconds to establish TCP + TLS
+    "READ_TIMEOUT": 30,         # seconds to wait for the gateway to answer
+    "RETRIES": 3,               # retries for idempotent calls (GET) only
+    "BACKOFF_FACTOR": 0.3,      # 0.3s, 0.6s, 1.2s ...
+    "RETRY_STATUSES": (502, 503, 504),
+}
+
+
+def gateway_settings(gateway: str) -> dict:
+    """
+    Merged HTTP settings for a gateway ("paystack", "payswitch").
+    """
+    configured = getattr(settings, "PAYMENT_GATEWAYS", {}).get(gateway, {})
+    return {**DEFAULT_GATEWAY_SETTINGS, **configured}
+
+
+def gateway_timeout(gateway: str, connect=None, read=None):
+    """
+    (connect, read) timeout tuple for a gateway call, falling back to the configured values.
+    """
+    config = gateway_settings(gateway)
+    return (
+        connect if connect is not None else config["CONNECT_TIMEOUT"],
+        read if read is not None else config["READ_TIMEOUT"],
+    )
+
+
+def request_not_sent(exc) -> bool:
+    """
+    True only when `exc` proves the request never reached the gateway, so it
+    is safe to send it again elsewhere. requests wraps everything from a
+    refused connection to a peer that hung up mid-response in
+    ConnectionError, so look at the urllib3 error underneath: only a failed
+    connect (refused, unreachable, DNS) or a connect timeout counts.
+    """
+    if isinstance(exc, (requests.exceptions.ConnectTimeout, httpx.ConnectError, httpx.ConnectTimeout)):
+        return True
+    if not isinstance(exc, requests.exceptions.ConnectionError):
+        return False
+    reason = exc.args[0] if exc.args else None
+    if isinstance(reason, MaxRetryError):
+        reason = reason.reason
+    # NameResolutionError is a NewConnectionError in urllib3 2
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+class GatewaySessionPool:
+    """
+    A fixed pool of keep-alive `requests.Session` objects for one gateway.
+
+    Sessions are checked out for the duration of a single call so two threads
+    never share one, while the TCP/TLS connections inside each session are
+    reused across requests.
+    """
+
+    def __init__(self, gateway: str):
+        self.gateway = gateway
+        self.config = gateway_settings(gateway)
+        self.size = int(self.config["POOL_SIZE"])
+        self._sessions = queue.LifoQueue(maxsize=self.size)
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _build_session(self) -> requests.Session:
+        retry = Retry(
+            total=self.config["RETRIES"],
+            connect=self.config["RETRIES"],
+            read=self.config["RETRIES"],
+            status=self.config["RETRIES"],
+            backoff_factor=self.config["BACKOFF_FACTOR"],
+            status_forcelist=self.config["RETRY_STATUSES"],
+            # Charges and OTP submissions are POSTs and must never be replayed;
+            # only verify-style GETs are retried on read errors / 5xx.
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.size,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _acquire(self) -> requests.Session:
+        try:
+            return self._sessions.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._build_session()
+
+        # Pool exhausted: wait for a session to be returned
+        return self._sessions.get()
+
+    @contextmanager
+    def session(self):
+        session = self._acquire()
+        try:
+            yield session
+        finally:
+            self._sessions.put(session)
+
+    def close(self):
+        while True:
+            try:
+                self._sessions.get_nowait().close()
+            except queue.Empty:
+                break
+        self._created = 0
+
+
+# -----------------------------
+# Process-wide registry
+# -----------------------------
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_session_pool(gateway: str) -> GatewaySessionPool:
+    pool = _pools.get(gateway)
+    if pool is not None:
+        return pool
+
+    with _pools_lock:
+        pool = _pools.get(gateway)
+        if pool is None:
+            pool = GatewaySessionPool(gateway)
+            _pools[gateway] = pool
+        return pool
+
+
+def reset_session_pools():
+    """
+    Drop every pooled session (e.g. after fork or a settings change).
+    """
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+# -----------------------------
+# Async clients (one per gateway per event loop)
+# -----------------------------
+# httpx.AsyncClient is bound to the loop it first ran on, so clients are keyed
+# by loop and dropped automatically when the loop is garbage collected.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client(gateway: str) -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+
+    client = clients.get(gateway)
+    if client is None or client.is_closed:
+        config = gateway_settings(gateway)
+        size = int(config["ASYNC_POOL_SIZE"])
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+            # Connection failures are safe to retry for every method; nothing was sent.
+            transport=httpx.AsyncHTTPTransport(retries=config["RETRIES"]),
+            timeout=httpx.Timeout(config["READ_TIMEOUT"], connect=config["CONNECT_TIMEOUT"]),
+        )
+        clients[gateway] = client
+    return client
+
+
+async def close_async_http_clients():
+    """
+    Close the async clients bound to the running loop (call on ASGI shutdown).
+    """
+    loop = asyncio.get_running_loop()
+    for client in _async_clients.pop(loop, {}).values():
+        await client.aclose()
+
+
+def async_gateway_timeout(gateway: str, timeout=None) -> httpx.Timeout:
+    """
+    Convert a number / (connect, read) tuple into an httpx.Timeout.
+    """
+    if isinstance(timeout, httpx.Timeout):
+        return timeout
+    if timeout is None or isinstance(timeout, (tuple, list)):
+        connect, read = gateway_timeout(gateway, *(timeout or ()))
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+def _reset_after_fork():
+    global _pools_lock
+    _pools_lock = threading.Lock()
+    _pools.clear()
+    _async_clients.clear()
+
+
+# Sockets must not be shared between a parent and a forked worker (gunicorn --preload).
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .metrics import payment_created
+from .models import Payment
+
+
+@receiver(post_save, sender=Payment, dispatch_uid="payment_created_metric")
+def count_created_payment(sender, instance, created, **kwargs):
+    if created:
+        payment_created(instance.channel_type, instance.gateway)
+
+
+@receiver(post_delete, sender=Payment, dispatch_uid="payment_deleted_stats")
+def remove_from_channel_stats(sender, instance, **kwargs):
+    from paychannel.stats import record_payments
+    from payment import rollups
+
+    record_payments(
+        [(instance.channel_id, instance.status, instance.channel_type, instance.amount, None)], sign=-1
+    )
+    rollups.record_payments(
+        [(
+            instance.merchant_id, instance.channel_id, instance.channel_type, instance.charge_type,
+            instance.status, instance.amount, instance.created_at,
+        )],
+        sign=-1,
+    )
@@ -0,0 +1,196 @@
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from paychannel.stats import rebuild_channel_stats, record_status_changes
+
+from . import rollups
+from .metrics import payment_status_changed
+from .models import Payment, PaymentStatusAudit
+
+
+# ======================================================
+# TRANSITION ENGINE
+# ======================================================
+# Which status a payment may move to from each status. Settled payments only
+# move forward: a success can be reversed, a failure or reversal is final.
+ALLOWED_TRANSITIONS = {
+    Payment.STATUS_PENDING: (Payment.STATUS_SUCCESS, Payment.STATUS_FAILED, Payment.STATUS_ABANDONED),
+    # The payer may still complete an abandoned checkout, or the gateway fail it
+    Payment.STATUS_ABANDONED: (Payment.STATUS_SUCCESS, Payment.STATUS_FAILED),
+    Payment.STATUS_SUCCESS: (Payment.STATUS_REVERSED,),
+    Payment.STATUS_FAILED: (),
+    Payment.STATUS_REVERSED: (),
+}
+
+
+def allowed_sources(new_status) -> tuple:
+    """
+    Statuses a payment may move to new_status from.
+    """
+    return tuple(status for status, targets in ALLOWED_TRANSITIONS.items() if new_status in targets)
+
+
+class TransitionResult(NamedTuple):
+    changed: list   # references moved to the new status
+    skipped: dict   # reference → reason
+
+
+def map_gateway_status(gateway_status: str) -> str:
+    """
+    Normalize gateway statuses into internal statuses.
+    """
+
+    if gateway_status == "success":
+        return Payment.STATUS_SUCCESS
+
+    if gateway_status == "failed":
+        return Payment.STATUS_FAILED
+
+    if gateway_status == "abandoned":
+        return Payment.STATUS_ABANDONED
+
+    if gateway_status == "reversed":
+        return Payment.STATUS_REVERSED
+
+    # ongoing, pending, processing, queued
+    return Payment.STATUS_PENDING
+
+
+def transition_payments(
+    references,
+    new_status,
+    from_statuses=None,
+    source=PaymentStatusAudit.SOURCE_SYSTEM,
+    actor=None,
+    note: str = "",
+    batch_size: int = 500,
+) -> TransitionResult:
+    """
+    Move the payments with these references to new_status, where
+    ALLOWED_TRANSITIONS (narrowed to `from_statuses`, if given) permits.
+
+    Per batch, in its own transaction: the rows are read and locked, one
+    conditional UPDATE … WHERE status IN (allowed sources) moves them, and
+    the channel totals, rollups and one bulk insert of PaymentStatusAudit
+    rows follow. Each batch commits as it finishes, so a large selection
+    never holds its locks to the end, and a failure keeps the batches
+    already done. Rows already settled by a concurrent writer are left
+    alone and reported as skipped.
+    """
+    sources = allowed_sources(new_status)
+    if from_statuses is not None:
+        sources = tuple(status for status in sources if status in from_statuses)
+
+    references = list(dict.fromkeys(references))
+    changed, skipped = [], {}
+    for i in range(0, len(references), batch_size):
+        batch = references[i:i + batch_size]
+        with transaction.atomic():
+            rows = list(
+                Payment.objects
+                .select_for_update()
+                .filter(reference__in=batch)
+                .values_list(
+                    "pk", "reference", "status", "channel_id", "channel_type", "amount",
+                    "merchant_id", "charge_type", "created_at",
+                )
+            )
+            found = {row[1] for row in rows}
+            skipped.update((reference, "not found") for reference in batch if reference not in found)
+
+            movable = []
+            for row in rows:
+                status = row[2]
+                if status in sources:
+                    movable.append(row)
+                elif status == new_status:
+                    skipped[row[1]] = f"already {status}"
+                else:
+                    skipped[row[1]] = f"{status} → {new_status} not allowed"
+            if not movable:
+                continue
+
+            updated = (
+                Payment.objects
+                .filter(pk__in=[row[0] for row in movable], status__in=sources)
+                .update(status=new_status)
+            )
+            if updated != len(movable):
+                # Without row locks (SQLite) a concurrent writer got some rows first:
+                # keep the ones we moved, recount the totals they touched
+                moved = set(
+                    Payment.objects
+                    .filter(pk__in=[row[0] for row in movable], status=new_status)
+                    .values_list("pk", flat=True)
+                )
+                for row in movable:
+                    if row[0] not in moved:
+                        skipped[row[1]] = "changed concurrently"
+                rebuild_channel_stats({row[3] for row in movable})
+                rollups.rebuild_rollups(
+                    since=min(row[8] for row in movable),
+                    until=max(row[8] for row in movable),
+                    merchant_ids={row[6] for row in movable if row[6] is not None},
+                )
+                movable = [row for row in movable if row[0] in moved]
+            else:
+                record_status_changes(
+                    [(channel_id, status, channel_type, amount)
+                     for _, _, status, channel_id, channel_type, amount, *_ in movable],
+                    new_status,
+                )
+                rollups.record_status_changes(
+                    [(merchant_id, channel_id, channel_type, charge_type, status, amount, created_at)
+                     for _, _, status, channel_id, channel_type, amount, merchant_id, charge_type, created_at
+                     in movable],
+                    new_status,
+                )
+
+            now = timezone.now()
+            PaymentStatusAudit.objects.bulk_create(
+                [
+                    PaymentStatusAudit(
+                        payment_id=row[0],
+                        from_status=row[2],
+                        to_status=new_status,
+                        source=source,
+                        actor=actor,
+                        note=note,
+                        created_at=now,
+                    )
+                    for row in movable
+                ],
+                batch_size=batch_size,
+            )
+            payment_status_changed(new_status, len(movable))
+            changed.extend(row[1] for row in movable)
+    return TransitionResult(changed, skipped)
+
+
+def apply_status_changes(
+    changes: dict,
+    from_statuses=(Payment.STATUS_PENDING,),
+    batch_size: int = 500,
+    source=PaymentStatusAudit.SOURCE_SYSTEM,
+) -> int:
+    """
+    Bulk-apply {reference: new_status} from gateway results: one
+    transition_payments() per target status, only out of `from_statuses`,
+    each batch committed on its own (wrap the call in an atomic block to
+    apply all or nothing). Returns the number of rows changed.
+    """
+    by_status = defaultdict(list)
+    for reference, new_status in changes.items():
+        if new_status not in from_statuses:
+            by_status[new_status].append(reference)
+
+    updated = 0
+    for new_status, references in by_status.items():
+        result = transition_payments(
+            references, new_status, from_statuses=from_statuses, source=source, batch_size=batch_size
+        )
+        updated += len(result.changed)
+    return updated
@@ -1,10 +1,23 @@
 # payments/urls.py
 from django.urls import path
-from .views import  CreatePaymentAPIView, VerifyPaymentAPIView, VerifyPaymentOTPAPIView
+from .views import  CreatePaymentAPIView, VerifyPaymentAPIView, VerifyPaymentOTPAPIView, GatewayStatusAPIView, PaystackWebhookAPIView, PaymentListAPIView, PaymentExportAPIView, PaymentDashboardAPIView, PaymentTransitionAPIView
+from .async_views import AsyncCreatePaymentView, AsyncVerifyPaymentView, AsyncVerifyPaymentOTPView
 
 urlpatterns = [
     # API to create reusable paylink
 
+    # Merchant's payment history (keyset pagination)
+    path("payments/", PaymentListAPIView.as_view(), name="merchant-payment-list"),
+
+    # Streaming CSV / NDJSON export with the same filters
+    path("payments/export/", PaymentExportAPIView.as_view(), name="merchant-payment-export"),
+
+    # Payments per hour / day, read from the rollups
+    path("payments/dashboard/", PaymentDashboardAPIView.as_view(), name="merchant-payment-dashboard"),
+
+    # Bulk status transitions (admin)
+    path("payments/transitions/", PaymentTransitionAPIView.as_view(), name="payment-transitions"),
+
     # API to create payment (pending)
     path("payment/create/", CreatePaymentAPIView.as_view(), name="create-payment"),
 
@@ -14,4 +27,15 @@ urlpatterns = [
      # Verify MoMo OTP
     path("payment/verify-otp/", VerifyPaymentOTPAPIView.as_view(), name="verify-payment-otp"),
 
+    # Paystack webhook (HMAC-verified, queue-and-ack)
+    path("payment/webhook/paystack/", PaystackWebhookAPIView.as_view(), name="paystack-webhook"),
+
+    # Circuit-breaker state per gateway (admin)
+    path("payment/gateways/", GatewayStatusAPIView.as_view(), name="payment-gateways"),
+
+    # Async (ASGI) variants of the gateway-bound endpoints
+    path("async/payment/create/", AsyncCreatePaymentView.as_view(), name="async-create-payment"),
+    path("async/payment/verify/", AsyncVerifyPaymentView.as_view(), name="async-verify-payment"),
+    path("async/payment/verify-otp/", AsyncVerifyPaymentOTPView.as_view(), name="async-verify-payment-otp"),
+
 ]
@@ -1,21 +1,59 @@
-from datetime import datetime
 import time
 
 from rest_framework.views import APIView
+from rest_framework.generics import ListAPIView
+from rest_framework.authentication import SessionAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework import status
 
-from drf_spectacular.utils import extend_schema, OpenApiExample
+from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter
+from drf_spectacular.types import OpenApiTypes
 
 from payment.payswitch import PaySwitchMobileMoney
 
-from .models import Payment
-from .serializers import CreatePaymentSerializer, VerifyPaymentOTPSerializer, VerifyPaymentSerializer
-from paychannel.models import PaymentChannel
+from .models import ChargeOutbox, Payment, PaymentStatusAudit
+from .serializers import (
+    CreatePaymentSerializer,
+    PaymentDashboardFilterSerializer,
+    PaymentDashboardTotalsSerializer,
+    PaymentListFilterSerializer,
+    PaymentListSerializer,
+    PaymentRollupSerializer,
+    PaymentTransitionResultSerializer,
+    PaymentTransitionSerializer,
+    VerifyPaymentOTPSerializer,
+    VerifyPaymentSerializer,
+)
+from paychannel.index import get_channel_index
+from paychannel.pagination import KeysetCursorPagination
 from .paystack import PaystackMobileMoney
+from .clients import get_paystack
+from .exports import FORMATS as EXPORT_FORMATS, export_response
+from .gateways import GatewayUnavailable, get_router
+from .idempotency import IDEMPOTENCY_HEADER, idempotent
+from .metrics import payment_status_changed, render
+from .outbox import enqueue_charge, outbox_enabled, record_customer_action
+from .references import new_reference
+from .rollups import rollup_series
+from .transitions import map_gateway_status, transition_payments
+from .webhooks import store_event, verify_paystack_signature
 from config.settings import PAYSTACK_SECRET_KEY
 from django.db import transaction
+from django.http import HttpResponse
+from django.conf import settings
+
+
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    name=IDEMPOTENCY_HEADER,
+    location=OpenApiParameter.HEADER,
+    required=False,
+    description=(
+        "Unique key per logical request. Retries with the same key get the first "
+        "response back (header `Idempotent-Replayed: true`) instead of a new charge."
+    ),
+)
 
 
 # ================================
@@ -26,9 +64,13 @@ from django.db import transaction
     summary="Create payment",
     description=(
         "Create a new payment for a paylink. "
-        "The payment is created with **pending** status and a unique reference."
+        "The payment is created with **pending** status and a unique reference.\n\n"
+        "When the charge outbox is enabled the gateway call happens in the background: "
+        "the response is **202** and the outcome is read through payment verification, "
+        "which answers `next_action: send_otp` when the customer must submit an OTP."
     ),
     request=CreatePaymentSerializer,
+    parameters=[IDEMPOTENCY_KEY_PARAMETER],
     responses={
         201: {
             "type": "object",
@@ -38,6 +80,7 @@ from django.db import transaction
                 "status": {"type": "string"},
             },
         },
+        202: {"description": "Payment recorded, charge queued for the gateway"},
         404: {"description": "Paylink not found"},
     },
     examples=[
@@ -59,6 +102,8 @@ from django.db import transaction
 class CreatePaymentAPIView(APIView):
     permission_classes = [AllowAny]
 
+    # Anonymous endpoint — Idempotency-Keys are scoped to the paylink
+    @idempotent("create", owner=lambda request: request.data.get("slug"))
     def post(self, request):
         serializer = CreatePaymentSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -69,15 +114,15 @@ class CreatePaymentAPIView(APIView):
         channel_type = serializer.validated_data["channel_type"]
         email = request.data.get("email")
         
-        try:
-            payment_channel = PaymentChannel.objects.get(slug=slug)
-        except PaymentChannel.DoesNotExist:
+        # Paylink slugs are public and hot — resolved from the channel index, not a query per attempt
+        payment_channel = get_channel_index().by_slug(slug)
+        if payment_channel is None:
             return Response(
                 {"error": "pay channel not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        reference = f"PAY-{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        reference = new_reference()
         
         # print("secret key paystack", PAYSTACK_SECRET_KEY)
         
@@ -89,37 +134,68 @@ class CreatePaymentAPIView(APIView):
                 #if no email generate email
                 if not email:
                     email =  f"{phone_number}@gmail.com"
+
+                # 📮 Outbox mode: record the charge, let a dispatcher send it
+                if outbox_enabled():
+                    enqueue_charge(
+                        {
+                            "channel_id": payment_channel.id,
+                            "merchant_id": payment_channel.user_id,
+                            "amount": amount,
+                            "reference": reference,
+                            "email": email,
+                            "phone_number": phone_number,
+                            "channel_type": channel_type,
+                            "charge_type": charge_type,
+                        },
+                        email=email,
+                        amount=int(amount),
+                        provider_name="MTN",
+                        phone=phone_number,
+                        metadata={"description": "Mobile Money Payment"},
+                    )
+                    return Response(
+                        {
+                            "message": "Payment queued",
+                            "payment_reference": reference,
+                            "status": Payment.STATUS_PENDING,
+                        },
+                        status=status.HTTP_202_ACCEPTED,
+                    )
+
+                # Router picks Paystack or PaySwitch (GHS) based on circuit-breaker health
+                try:
+                    gateway_name, momo_charge = get_router().charge(
+                        "GHS",
+                        email=email,
+                        amount=int(amount),
+                        provider_name="MTN",
+                        phone=phone_number,
+                        reference=reference,
+                        metadata={"description": "Mobile Money Payment"},
+                    )
+                except GatewayUnavailable as e:
+                    return Response(
+                        {"error": str(e), "payment_reference": reference},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    )
             
-                paymentInitiziation = PaystackMobileMoney()
-                momo_charge = paymentInitiziation.charge(email, int(amount), "GHS", "MTN", phone_number, "", reference, {"key": "value"})
-                print(momo_charge)
-                
-            # case "momo":
-            #     if not phone_number:
-            #         return Response({"error": "Phone number is required for MoMo payments"},status=400)
-                    
-            #     #if no email generate email
-            #     if not email:
-            #         email =  f"{phone_number}@gmail.com"
-                
-            #     paymentInitiziation = PaySwitchMobileMoney()
-            #     momo_charge = paymentInitiziation.charge(email, int(amount), "GHS", "MTN", phone_number, "", reference, metadata={"description": "Mobile Money Payment"},)
-            #     # print(momo_charge)
-            
-            # case "card":
-            #     return Response({"error": "Card payments are not supported yet"},status=400)
+            case "card":
+                return Response({"error": "Card payments are not supported yet"},status=400)
         
 
         
         if momo_charge.get("status") is True:
             payment = Payment.objects.create(
-                channel=payment_channel,
+                channel_id=payment_channel.id,
+                merchant_id=payment_channel.user_id,
                 amount=amount,
                 reference=reference,
                 email = email,
                 phone_number = phone_number,
                 channel_type = channel_type,
                 charge_type = charge_type,
+                gateway = gateway_name,
                 status="pending",
             )
                  
@@ -128,6 +204,7 @@ class CreatePaymentAPIView(APIView):
                     "message": momo_charge.get("message"),
                     "payment_reference": reference,
                     "status": momo_charge.get("data").get("status"),
+                    "gateway": gateway_name,
                 },
                 status=status.HTTP_201_CREATED,
             )
@@ -135,7 +212,8 @@ class CreatePaymentAPIView(APIView):
             return Response(
                 {"message": momo_charge.get("message"),
                   "payment_reference": reference,
-                  "status": momo_charge.get("data").get("status"),
+                  "status": (momo_charge.get("data") or {}).get("status"),
+                  "gateway": gateway_name,
                  },
                 status=status.HTTP_400_BAD_REQUEST,
             )
@@ -155,6 +233,7 @@ class CreatePaymentAPIView(APIView):
 
     responses={
         200: {"description": "Payment marked as success"},
+        202: {"description": "Charge still queued, or waiting on the customer (`next_action`, e.g. send_otp)"},
         404: {"description": "Payment not found"},
     },
     tags=["Payments"],
@@ -167,119 +246,278 @@ class VerifyPaymentAPIView(APIView):
         serializer.is_valid(raise_exception=True)
         reference = serializer.validated_data["reference"]
 
-        # 🔍 Verify with gateway
-        gateway = PaystackMobileMoney()
-        response = gateway.verify(reference)
-
-        # ❌ Gateway-level failure
-        if not response or response.get("status") is False:
+        found = (
+            Payment.objects.filter(reference=reference)
+            .values_list("gateway", "status", "outbox__state", "outbox__next_action")
+            .first()
+        )
+        if found is None:
             return Response(
-                {
-                    "message": response.get("message", "Verification failed"),
-                    "reference": reference,
-                },
-                status=status.HTTP_400_BAD_REQUEST,
+                {"error": "Payment not found"},
+                status=status.HTTP_404_NOT_FOUND,
             )
+        gateway_name, payment_status, outbox_state, next_action = found
 
-        data = response.get("data", {})
-        
-        print("data", data)
-        
-        
-        gateway_status = data.get("status")
+        # 📮 Charge not sent yet — nothing to ask the gateway
+        if outbox_state in QUEUED_OUTBOX_STATES and payment_status == Payment.STATUS_PENDING:
+            body, http_status = queued_payment_response(reference)
+            return Response(body, status=http_status)
+
+        # Already settled (webhook / reconciliation) — answer locally, no gateway call
+        if payment_status != Payment.STATUS_PENDING:
+            body, http_status = settled_payment_response(reference, payment_status)
+            return Response(body, status=http_status)
+
+        # 🔑 Charge sent from the outbox but the gateway is waiting on the customer's OTP
+        if outbox_state == ChargeOutbox.STATE_SENT and next_action in WAITING_ACTIONS:
+            body, http_status = customer_action_response(reference, next_action)
+            return Response(body, status=http_status)
 
-        if not gateway_status:
+        # 🔍 Verify with the gateway that took the charge
+        try:
+            response = get_router().verify(gateway_name, reference)
+        except GatewayUnavailable as e:
             return Response(
-                {"error": "Invalid verification response"},
-                status=status.HTTP_400_BAD_REQUEST,
+                {"message": str(e), "reference": reference},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
             )
 
-        internal_status = map_gateway_status(gateway_status)
+        body, http_status = record_verification(reference, response)
+        return Response(body, status=http_status)
 
-        try:
-            with transaction.atomic():
-                payment = (
-                    Payment.objects
-                    .select_for_update()
-                    .get(reference=reference)
-                )
 
-                # 🔁 Idempotency check
-                if payment.status == Payment.STATUS_SUCCESS:
-                    return Response(
-                        {
-                            "message": "Payment already verified",
-                            "reference": reference,
-                            "status": payment.status,
-                        },
-                        status=status.HTTP_200_OK,
-                    )
+QUEUED_OUTBOX_STATES = (ChargeOutbox.STATE_PENDING, ChargeOutbox.STATE_IN_FLIGHT)
 
-                # 🔄 Update payment
-                payment.status = internal_status
-                payment.gateway_response = data.get("gateway_response")
-                payment.save()
 
-                # ✅ Success
-                if internal_status == Payment.STATUS_SUCCESS:
-                    return Response(
-                        {
-                            "message": "Payment verified successfully",
-                            "reference": reference,
-                            "status": payment.status,
-                        },
-                        status=status.HTTP_200_OK,
-                    )
+def queued_payment_response(reference: str):
+    """
+    Response for a payment whose charge is still waiting in the outbox.
+    """
+    return (
+        {
+            "message": "Payment is queued for the gateway",
+            "reference": reference,
+            "status": Payment.STATUS_PENDING,
+        },
+        status.HTTP_202_ACCEPTED,
+    )
 
-                # ⏳ Still processing
-                if internal_status == Payment.STATUS_PENDING:
-                    return Response(
-                        {
-                            "message": "Payment is still in progress",
-                            "reference": reference,
-                            "status": payment.status,
-                        },
-                        status=status.HTTP_202_ACCEPTED,
-                    )
 
-                # ❌ Failed / Abandoned / Reversed
-                return Response(
+# Actions the customer completes through this API (VerifyPaymentOTPAPIView);
+# until then a gateway verify has nothing new to say
+WAITING_ACTIONS = ("send_otp",)
+
+
+def customer_action_response(reference: str, next_action: str):
+    """
+    Response for a sent charge the gateway will not settle until the
+    customer acts — the step the create call could not return (outbox mode).
+    """
+    return (
+        {
+            "message": "Payment is waiting for the customer",
+            "reference": reference,
+            "status": Payment.STATUS_PENDING,
+            "next_action": next_action,
+        },
+        status.HTTP_202_ACCEPTED,
+    )
+
+
+def settled_payment_response(reference: str, payment_status: str):
+    """
+    Response for a payment that is no longer pending.
+    """
+    if payment_status == Payment.STATUS_SUCCESS:
+        return (
+            {
+                "message": "Payment already verified",
+                "reference": reference,
+                "status": payment_status,
+            },
+            status.HTTP_200_OK,
+        )
+    return (
+        {
+            "message": "Payment not successful",
+            "reference": reference,
+            "status": payment_status,
+        },
+        status.HTTP_400_BAD_REQUEST,
+    )
+
+
+def record_verification(reference: str, response: dict):
+    """
+    Apply a gateway verify response to the local Payment.
+    Returns (response body, HTTP status) so sync and async views answer the same way.
+    """
+
+    # ❌ Gateway-level failure
+    if not response or response.get("status") is False:
+        return (
+            {
+                "message": response.get("message", "Verification failed"),
+                "reference": reference,
+            },
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    data = response.get("data", {})
+    gateway_status = data.get("status")
+
+    if not gateway_status:
+        return (
+            {"error": "Invalid verification response"},
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    internal_status = map_gateway_status(gateway_status)
+
+    try:
+        with transaction.atomic():
+            payment = (
+                Payment.objects
+                .select_for_update()
+                .get(reference=reference)
+            )
+
+            # 🔁 Idempotency check
+            if payment.status == Payment.STATUS_SUCCESS:
+                return (
                     {
-                        "message": "Payment not successful",
+                        "message": "Payment already verified",
                         "reference": reference,
                         "status": payment.status,
-                        "gateway_status": gateway_status,
                     },
-                    status=status.HTTP_400_BAD_REQUEST,
+                    status.HTTP_200_OK,
                 )
 
-        except Payment.DoesNotExist:
-            return Response(
-                {"error": "Payment not found"},
-                status=status.HTTP_404_NOT_FOUND,
+            # 🔄 Update payment
+            if payment.status != internal_status:
+                payment_status_changed(internal_status)
+            payment.status = internal_status
+            payment.gateway_response = data.get("gateway_response")
+            payment.save()
+
+            # ✅ Success
+            if internal_status == Payment.STATUS_SUCCESS:
+                return (
+                    {
+                        "message": "Payment verified successfully",
+                        "reference": reference,
+                        "status": payment.status,
+                    },
+                    status.HTTP_200_OK,
+                )
+
+            # ⏳ Still processing
+            if internal_status == Payment.STATUS_PENDING:
+                return (
+                    {
+                        "message": "Payment is still in progress",
+                        "reference": reference,
+                        "status": payment.status,
+                    },
+                    status.HTTP_202_ACCEPTED,
+                )
+
+            # ❌ Failed / Abandoned / Reversed
+            return (
+                {
+                    "message": "Payment not successful",
+                    "reference": reference,
+                    "status": payment.status,
+                    "gateway_status": gateway_status,
+                },
+                status.HTTP_400_BAD_REQUEST,
             )
 
+    except Payment.DoesNotExist:
+        return (
+            {"error": "Payment not found"},
+            status.HTTP_404_NOT_FOUND,
+        )
 
 
-def map_gateway_status(gateway_status: str) -> str:
-    """
-    Normalize gateway statuses into internal statuses.
-    """
 
-    if gateway_status == "success":
-        return Payment.STATUS_SUCCESS
+@extend_schema(
+    summary="Paystack webhook",
+    description=(
+        "Receives Paystack events. The `x-paystack-signature` header must be the HMAC-SHA512 "
+        "of the raw body with the secret key.\n\n"
+        "The event is stored and acknowledged immediately; Payment status changes are applied "
+        "asynchronously and idempotently. Redelivered events are ignored."
+    ),
+    request={"application/json": {"type": "object"}},
+    responses={
+        200: {"description": "Event accepted (or duplicate)"},
+        401: {"description": "Invalid signature"},
+    },
+    tags=["Payments"],
+)
+class PaystackWebhookAPIView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        # HMAC must be computed over the raw bytes, before any parsing
+        body = request.body
+        signature = request.headers.get("x-paystack-signature", "")
 
-    if gateway_status == "failed":
-        return Payment.STATUS_FAILED
+        if not verify_paystack_signature(body, signature):
+            return Response({"error": "Invalid signature"}, status=status.HTTP_401_UNAUTHORIZED)
 
-    if gateway_status == "abandoned":
-        return Payment.STATUS_ABANDONED
+        try:
+            created = store_event(body)
+        except ValueError:
+            return Response({"error": "Invalid JSON"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"received": True, "duplicate": not created}, status=status.HTTP_200_OK)
 
-    if gateway_status == "reversed":
-        return Payment.STATUS_REVERSED
 
-    # ongoing, pending, processing, queued
-    return Payment.STATUS_PENDING
+@extend_schema(
+    summary="Gateway circuit-breaker state",
+    description=(
+        "Current circuit-breaker state, rolling error rate and p95 latency for each payment "
+        "gateway in this worker process, in routing order."
+    ),
+    responses={
+        200: {
+            "type": "object",
+            "properties": {
+                "routing_order": {"type": "array", "items": {"type": "string"}},
+                "gateways": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "gateway": {"type": "string"},
+                            "state": {"type": "string", "enum": ["closed", "open", "half_open"]},
+                            "calls_in_window": {"type": "integer"},
+                            "error_rate": {"type": "number"},
+                            "p95_latency": {"type": "number", "nullable": True},
+                            "retry_in_seconds": {"type": "number", "nullable": True},
+                        },
+                    },
+                },
+            },
+        },
+    },
+    tags=["Payments"],
+)
+class GatewayStatusAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        router = get_router()
+        return Response(
+            {
+                "routing_order": router.candidates("GHS"),
+                "gateways": router.snapshot(),
+            },
+            status=status.HTTP_200_OK,
+        )
 
 
 @extend_schema(
@@ -292,6 +530,7 @@ def map_gateway_status(gateway_status: str) -> str:
         "or transaction verification."
     ),
     request=VerifyPaymentOTPSerializer,
+    parameters=[IDEMPOTENCY_KEY_PARAMETER],
     responses={
         200: {
             "type": "object",
@@ -315,6 +554,7 @@ def map_gateway_status(gateway_status: str) -> str:
 class VerifyPaymentOTPAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent("verify-otp", owner=lambda request: request.user.pk)
     def post(self, request):
         serializer = VerifyPaymentOTPSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -328,7 +568,7 @@ class VerifyPaymentOTPAPIView(APIView):
             )
 
         try:
-            Payment.objects.get(
+            payment = Payment.objects.get(
                 reference=reference,
                 status="pending",
             )
@@ -338,65 +578,269 @@ class VerifyPaymentOTPAPIView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        paystack = PaystackMobileMoney()
-        result = paystack.submit_otp(otp, reference)
-        
-        print(result)
-
-        # ❌ Invalid reference or OTP
-        if result.get("status") is False:
+        if payment.gateway != "paystack":
             return Response(
-                {
-                    "message": result.get("message", "OTP verification failed"),
-                    "otp_verified": False,
-                },
+                {"message": "OTP is not required for this payment", "otp_verified": False},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        otp_status = result.get("data", {}).get("status")
-        
-        match  otp_status:
-            case "pending" | "success":
-                return Response(
+        paystack = get_paystack()
+        result = paystack.submit_otp(otp, reference)
+        record_customer_action(reference, result)
+
+        body, http_status = otp_result_response(result)
+        return Response(body, status=http_status)
+
+
+def otp_result_response(result: dict):
+    """
+    Map a submit_otp gateway response to (response body, HTTP status).
+    """
+
+    # ❌ Invalid reference or OTP
+    if result.get("status") is False:
+        return (
+            {
+                "message": result.get("message", "OTP verification failed"),
+                "otp_verified": False,
+            },
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    otp_status = result.get("data", {}).get("status")
+    
+    match otp_status:
+        case "pending" | "success":
+            return (
                 {
                     "message": result.get("data", {}).get("message"),
                     "otp_verified": True,
                     "raw": result,
                 },
-                status=status.HTTP_200_OK,
+                status.HTTP_200_OK,
             )
-            case "failed":
-                return Response(
+        case "failed":
+            return (
                 {
                     "message": result.get("data", {}).get("message"),
                     "otp_verified": False,
                     "raw": result,
                 },
-                status=status.HTTP_400_BAD_REQUEST,
+                status.HTTP_400_BAD_REQUEST,
             )
-            case "requery":
-                return Response(
+        case "requery":
+            return (
                 {
-                    "message": result.get("data", {}).get( "message"),
+                    "message": result.get("data", {}).get("message"),
                     "otp_verified": True,
                     "raw": result,
                 },
-                status=status.HTTP_200_OK,
+                status.HTTP_200_OK,
             )
-            case _:
-                return Response(
+        case _:
+            return (
                 {
                     "message": "OTP verification failed",
                     "otp_verified": False,
                 },
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+
+
+# =========================================
+# Merchant payment history
+# =========================================
+class PaymentListPagination(KeysetCursorPagination):
+    page_size = 20
+    page_size_query_param = "per_page"
+    max_page_size = 100
+
+
+def merchant_payments(request):
+    """
+    The caller's payments narrowed by the list filters in the query string (400 on bad input).
+    """
+    filters = PaymentListFilterSerializer(data=request.query_params)
+    filters.is_valid(raise_exception=True)
+    params = filters.validated_data
+
+    # Each shape is a range scan on one composite index (see Payment.Meta.indexes)
+    if "channel" in params:
+        channel = get_channel_index().by_slug(params["channel"])
+        if channel is None or channel.user_id != request.user.pk:
+            return Payment.objects.none()
+        payments = Payment.objects.filter(channel_id=channel.id)
+    else:
+        payments = Payment.objects.filter(merchant=request.user)
+
+    for field in ("status", "channel_type", "charge_type"):
+        if field in params:
+            payments = payments.filter(**{field: params[field]})
+    if "created_after" in params:
+        payments = payments.filter(created_at__gte=params["created_after"])
+    if "created_before" in params:
+        payments = payments.filter(created_at__lt=params["created_before"])
+    return payments
+
+
+@extend_schema(
+    summary="List my payments",
+    description=(
+        "Payments on the logged-in merchant's channels, newest first, filterable by channel, "
+        "status, channel type, charge type and creation date. Keyset (cursor) pagination: follow "
+        "`next` / `previous`; pass `count=true` for the total."
+    ),
+    parameters=[PaymentListFilterSerializer],
+    responses={200: PaymentListSerializer(many=True), 400: {"description": "Invalid filter"}},
+    tags=["Payments"],
+)
+class PaymentListAPIView(ListAPIView):
+    serializer_class = PaymentListSerializer
+    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = PaymentListPagination
+
+    def get_queryset(self):
+        return merchant_payments(self.request).select_related("channel").order_by("-created_at", "-id")
+
+
+@extend_schema(
+    summary="Export my payments",
+    description=(
+        "Download the logged-in merchant's payments as CSV or NDJSON, with the same filters as the "
+        "payment list. The file is streamed as rows are read, so it starts at once and any size works; "
+        "`compress=gzip` sends a .gz file."
+    ),
+    parameters=[
+        PaymentListFilterSerializer,
+        OpenApiParameter(
+            name="output", description="csv (default) or ndjson", required=False, type=str, enum=list(EXPORT_FORMATS)
+        ),
+        OpenApiParameter(name="compress", description="gzip to compress the file", required=False, type=str, enum=["gzip"]),
+    ],
+    responses={
+        (200, "text/csv"): OpenApiTypes.BINARY,
+        (200, "application/x-ndjson"): OpenApiTypes.BINARY,
+        (200, "application/gzip"): OpenApiTypes.BINARY,
+        400: {"description": "Invalid filter or output"},
+    },
+    tags=["Payments"],
+)
+class PaymentExportAPIView(APIView):
+    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        output = request.query_params.get("output", "csv")
+        compress = request.query_params.get("compress")
+        if output not in EXPORT_FORMATS or compress not in (None, "", "gzip"):
+            return Response(
+                {"error": "output must be csv or ndjson; compress must be gzip"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-                
+        return export_response(merchant_payments(request), output=output, gzip=compress == "gzip")
+
+
+# =========================================
+# Prometheus metrics
+# =========================================
+def metrics_view(request):
+    """
+    Text exposition of gateway / payment metrics for a Prometheus scrape.
+    Protected by METRICS_TOKEN (Bearer) when set; open only in DEBUG otherwise.
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if token:
+        if request.headers.get("Authorization") != f"Bearer {token}":
+            return HttpResponse("Forbidden", status=status.HTTP_403_FORBIDDEN, content_type="text/plain")
+    elif not settings.DEBUG:
+        return HttpResponse("Forbidden", status=status.HTTP_403_FORBIDDEN, content_type="text/plain")
+
+    return HttpResponse(render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@extend_schema(
+    summary="Payment dashboard",
+    description=(
+        "The logged-in merchant's payments per hour or per day: count and amount of all payments, "
+        "and of the successful ones, optionally split by channel, channel type, charge type and status. "
+        "Served from the hourly / daily rollups, never the payment table. Only buckets with payments "
+        "are listed."
+    ),
+    parameters=[PaymentDashboardFilterSerializer],
+    responses={200: PaymentRollupSerializer(many=True), 400: {"description": "Invalid parameters"}},
+    tags=["Payments"],
+)
+class PaymentDashboardAPIView(APIView):
+    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        filters = PaymentDashboardFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        params = filters.validated_data
+
+        channel_id = None
+        if "channel" in params:
+            channel = get_channel_index().by_slug(params["channel"])
+            if channel is None or channel.user_id != request.user.pk:
+                return Response({"error": "Unknown channel"}, status=status.HTTP_404_NOT_FOUND)
+            channel_id = channel.id
+
+        series = list(rollup_series(
+            request.user,
+            granularity=params["granularity"],
+            since=params["since"],
+            until=params["until"],
+            channel_id=channel_id,
+            group_by=params["group_by"],
+            **{field: params[field] for field in ("status", "channel_type", "charge_type") if field in params},
+        ))
+        totals = {
+            column: sum(row[column] for row in series)
+            for column in ("payments_count", "amount", "success_count", "success_amount")
+        }
+        return Response({
+            "granularity": params["granularity"],
+            "since": params["since"],
+            "until": params["until"],
+            "group_by": params["group_by"],
+            "totals": PaymentDashboardTotalsSerializer(totals).data,
+            "results": PaymentRollupSerializer(series, many=True).data,
+        })
+
+
+@extend_schema(
+    summary="Change payment statuses in bulk (admin)",
+    description=(
+        "Move the given payments to a new status where allowed (pending → success / failed / "
+        "abandoned, abandoned → success / failed, success → reversed). Every other payment is left "
+        "as it was and listed under `skipped` with the reason. Each change is audited."
+    ),
+    request=PaymentTransitionSerializer,
+    responses={200: PaymentTransitionResultSerializer, 400: {"description": "Invalid request"}},
+    tags=["Payments"],
+)
+class PaymentTransitionAPIView(APIView):
+    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = PaymentTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        result = transition_payments(
+            params["references"],
+            params["status"],
+            source=PaymentStatusAudit.SOURCE_API,
+            actor=request.user,
+            note=params["note"],
+        )
         return Response(
-            {
-                "message": "Unable to verify OTP",
-                "otp_verified": False,
-                "raw": result,
-            },
-            status=status.HTTP_400_BAD_REQUEST,
+            PaymentTransitionResultSerializer(
+                {"status": params["status"], "changed": len(result.changed), "skipped": result.skipped}
+            ).data,
+            status=status.HTTP_200_OK,
         )
@@ -0,0 +1,162 @@
+import hashlib
+import hmac
+import json
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .background import submit
+from .models import Payment, PaymentStatusAudit, WebhookEvent
+from .transitions import apply_status_changes
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------------
+# Processing defaults
+# -----------------------------
+# Override any key in settings.PAYMENT_WEBHOOKS.
+DEFAULT_WEBHOOK_SETTINGS = {
+    "MAX_ATTEMPTS": 5,   # failed processing runs before an event is parked
+}
+
+
+def webhook_settings() -> dict:
+    return {**DEFAULT_WEBHOOK_SETTINGS, **getattr(settings, "PAYMENT_WEBHOOKS", {})}
+
+
+# -----------------------------
+# Paystack event → (new status, statuses it may move from)
+# -----------------------------
+# Events can arrive late or out of order, so each one only moves a payment
+# out of the states it can legitimately follow.
+EVENT_TRANSITIONS = {
+    "charge.success": (Payment.STATUS_SUCCESS, (Payment.STATUS_PENDING, Payment.STATUS_ABANDONED)),
+    "charge.failed": (Payment.STATUS_FAILED, (Payment.STATUS_PENDING,)),
+    "refund.processed": (Payment.STATUS_REVERSED, (Payment.STATUS_SUCCESS,)),
+}
+
+
+def verify_paystack_signature(body: bytes, signature: str) -> bool:
+    """
+    Paystack signs the raw request body with HMAC-SHA512 using the secret key.
+    """
+    if not signature or not settings.PAYSTACK_SECRET_KEY:
+        return False
+    expected = hmac.new(
+        settings.PAYSTACK_SECRET_KEY.encode(),
+        body,
+        hashlib.sha512,
+    ).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def _data(payload: dict) -> dict:
+    data = payload.get("data")
+    return data if isinstance(data, dict) else {}
+
+
+def event_reference(payload: dict):
+    data = _data(payload)
+    # refunds carry the original charge under data.transaction_reference
+    return data.get("reference") or data.get("transaction_reference")
+
+
+def event_id(payload: dict, body: bytes) -> str:
+    """
+    Stable id for deduplication: event name + gateway object id,
+    falling back to a hash of the body.
+    """
+    data = _data(payload)
+    if data.get("id") is not None:
+        return f"{payload.get('event')}:{data['id']}"
+    return f"{payload.get('event')}:sha256:{hashlib.sha256(body).hexdigest()}"
+
+
+def store_event(body: bytes) -> bool:
+    """
+    Persist a verified webhook. Returns False for duplicates (already stored).
+    Processing is kicked off on the background executor after commit.
+    Raises ValueError for a body that is not a JSON object.
+    """
+    payload = json.loads(body)
+    if not isinstance(payload, dict):
+        raise ValueError("Webhook body must be a JSON object")
+    try:
+        with transaction.atomic():
+            WebhookEvent.objects.create(
+                event_id=event_id(payload, body),
+                event=payload.get("event", ""),
+                reference=event_reference(payload),
+                payload=payload,
+            )
+    except IntegrityError:
+        return False
+
+    transaction.on_commit(lambda: submit(process_pending_events))
+    return True
+
+
+def _apply_event(event: dict):
+    """
+    Apply one event and mark it processed, in its own transaction.
+    """
+    with transaction.atomic():
+        rule = EVENT_TRANSITIONS.get(event["event"])
+        if rule and event["reference"]:
+            new_status, from_statuses = rule
+            apply_status_changes(
+                {event["reference"]: new_status},
+                from_statuses=from_statuses,
+                source=PaymentStatusAudit.SOURCE_WEBHOOK,
+            )
+        WebhookEvent.objects.filter(id=event["id"], processed_at__isnull=True).update(
+            processed_at=timezone.now(),
+            attempts=F("attempts") + 1,
+        )
+
+
+def _record_failure(event: dict, error: Exception):
+    failures = event["attempts"] + 1
+    parked = failures >= webhook_settings()["MAX_ATTEMPTS"]
+    WebhookEvent.objects.filter(id=event["id"]).update(
+        attempts=F("attempts") + 1,
+        last_error=str(error),
+        parked_at=timezone.now() if parked else None,
+    )
+    logger.error(
+        "Webhook event %s (%s) failed, attempt %s%s: %s",
+        event["id"], event["event"], failures, " — parked" if parked else "", error,
+    )
+
+
+def process_pending_events(limit: int = 500) -> int:
+    """
+    Apply unprocessed webhook events to Payment rows, oldest first.
+
+    Each event commits on its own, so one that fails rolls back only
+    itself: its attempt and error are recorded and, after MAX_ATTEMPTS
+    failures, it is parked and skipped until requeued. Idempotent: status
+    changes are conditional UPDATEs (see EVENT_TRANSITIONS), so running
+    this twice — or concurrently from several workers — never applies an
+    event twice. Returns the number of events processed.
+    """
+    events = list(
+        WebhookEvent.objects
+        .filter(processed_at__isnull=True, parked_at__isnull=True)
+        .order_by("received_at")
+        .values("id", "event", "reference", "attempts")[:limit]
+    )
+
+    processed = 0
+    for event in events:
+        try:
+            _apply_event(event)
+        except Exception as e:
+            _record_failure(event, e)
+        else:
+            processed += 1
+    return processed
@@ -0,0 +1,35 @@
+import json
+
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from .charges import hop_deadline
+from .engine import Hop
+from .flows import PAYMENT_FLOW, astart_payment
+from .sessions import aget_session_store
+from .views import ussd_response
+
+
+# =========================================================
+# Async (ASGI) variant of ussd_handler.
+# Same flow and messages; Paystack calls, ORM queries and session reads /
+# writes are awaited so neither a slow gateway nor the session store blocks
+# the event loop.
+# =========================================================
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncUssdView(View):
+    http_method_names = ["post"]
+
+    async def post(self, request):
+        # Parse JSON request
+        data = json.loads(request.body.decode("utf-8"))
+
+        hop = Hop(data, await aget_session_store(), hop_deadline())
+
+        if hop.new_session:
+            reply = await astart_payment(hop)
+        else:
+            reply = await PAYMENT_FLOW.ahandle(hop)
+
+        return ussd_response(hop.session_id, reply.message, not reply.end, hop.msisdn)
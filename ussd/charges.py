@@ -0,0 +1,130 @@
+import logging
+
+from django.conf import settings
+
+from payment.deadlines import Deadline, DeadlineExceeded
+from payment.gateways import GATEWAY_ERRORS, GatewayUnavailable, get_router
+from payment.clients import get_paystack
+from payment.models import Payment, PaymentStatusAudit
+from payment.transitions import apply_status_changes
+
+from .sessions import get_session_store
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------------
+# Deadline defaults
+# -----------------------------
+# Override any key in settings.USSD_DEADLINE.
+DEFAULT_DEADLINE_SETTINGS = {
+    "HOP_SECONDS": 4.0,           # aggregators drop a hop not answered within a few seconds
+    "REPLY_MARGIN_SECONDS": 0.3,  # kept back for the session write and the response itself
+    "CHARGE_SECONDS": 30.0,       # budget for a background charge / OTP submit, across failover
+}
+
+
+def deadline_settings() -> dict:
+    return {**DEFAULT_DEADLINE_SETTINGS, **getattr(settings, "USSD_DEADLINE", {})}
+
+
+def hop_deadline() -> Deadline:
+    """
+    Budget for answering the current hop, started when the request arrives.
+    """
+    config = deadline_settings()
+    return Deadline(max(0.0, config["HOP_SECONDS"] - config["REPLY_MARGIN_SECONDS"]))
+
+
+# -----------------------------
+# Outcomes
+# -----------------------------
+# A charge that outlives its hop leaves its result next to the session,
+# under its own key, so it never races the hop that is writing the session.
+SEND_OTP = "send_otp"
+INITIATED = "initiated"
+FAILED = "failed"
+UNKNOWN = "unknown"   # the gateway may have the charge — verify / reconciliation settle it
+
+
+def outcome_key(session_id) -> str:
+    return f"{session_id}:charge"
+
+
+def charge_outcome(sessions, session_id):
+    return (sessions.get(outcome_key(session_id)) or {}).get("outcome")
+
+
+async def acharge_outcome(sessions, session_id):
+    return (await sessions.aget(outcome_key(session_id)) or {}).get("outcome")
+
+
+def _record(session_id, outcome):
+    get_session_store().set(outcome_key(session_id), {"outcome": outcome})
+    return outcome
+
+
+# -----------------------------
+# Background work
+# -----------------------------
+def run_charge(session_id, charge_kwargs: dict, payment_fields: dict) -> str:
+    """
+    Store the pending Payment, then charge through the gateway router. Runs
+    on the USSD executor; returns the outcome and records it for the session.
+
+    The Payment exists before the request goes out, so a charge whose
+    outcome is unknown (read timeout, dropped connection) still has a row
+    for verify / reconciliation to settle. Only when no gateway was reached
+    is it failed here.
+    """
+    reference = charge_kwargs.get("reference")
+    Payment.objects.create(status=Payment.STATUS_PENDING, **payment_fields)
+
+    deadline = Deadline(deadline_settings()["CHARGE_SECONDS"])
+    try:
+        gateway_name, response = get_router().charge("GHS", deadline=deadline, **charge_kwargs)
+    except (GatewayUnavailable, ValueError):
+        # Nothing was sent
+        apply_status_changes({reference: Payment.STATUS_FAILED}, source=PaymentStatusAudit.SOURCE_SYSTEM)
+        return _record(session_id, FAILED)
+    except DeadlineExceeded:
+        # Budget spent before a request could go out; reconciliation settles the row
+        logger.warning("USSD charge %s ran out of time", reference)
+        return _record(session_id, UNKNOWN)
+    except GATEWAY_ERRORS as e:
+        logger.exception("USSD charge %s outcome unknown", reference)
+        gateway_name = getattr(e, "gateway", None)
+        if gateway_name:
+            Payment.objects.filter(reference=reference).update(gateway=gateway_name)
+        return _record(session_id, UNKNOWN)
+    # Outcome only — the raw payload carries customer details
+    logger.debug(
+        "USSD charge %s via %s: status=%s data.status=%s",
+        reference, gateway_name, response.get("status"), (response.get("data") or {}).get("status"),
+    )
+
+    Payment.objects.filter(reference=reference).update(gateway=gateway_name)
+
+    if response.get("error"):
+        # 5xx / transport failure reported as a result: the charge may exist
+        return _record(session_id, UNKNOWN)
+    data = response.get("data") or {}
+    if data.get("status") == "send_otp":
+        return _record(session_id, SEND_OTP)
+    if response.get("status") is True:
+        return _record(session_id, INITIATED)
+    return _record(session_id, FAILED)
+
+
+def run_submit_otp(otp, reference) -> dict:
+    deadline = Deadline(deadline_settings()["CHARGE_SECONDS"])
+    try:
+        result = get_paystack().submit_otp(otp=otp, reference=reference, timeout=deadline.timeout("paystack"))
+    except GATEWAY_ERRORS:
+        logger.exception("USSD OTP submit %s failed", reference)
+        return {"status": False}
+    logger.debug(
+        "USSD OTP submit %s: status=%s data.status=%s",
+        reference, result.get("status"), (result.get("data") or {}).get("status"),
+    )
+    return result
@@ -0,0 +1,238 @@
+import time
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+
+
+# =========================================================
+# USSD flow engine
+#
+# A flow is a set of named states. Each state declares its prompt, how input
+# is validated, and where each input leads. Flows are compiled once at import
+# into a dict keyed by state name, so a hop is: load session → one dict
+# lookup → validate → run one handler → save session.
+#
+# A handler is any of:
+#   "state_name"          move to that state and show its prompt
+#   Reply(...)            answer and stay (end=False) or finish (end=True)
+#   fn(hop, value)        returns one of the above
+#   Action subclass       same, with an async form for the ASGI view
+# =========================================================
+
+
+class Reply(NamedTuple):
+    message: str
+    end: bool = True
+
+
+class Goto(NamedTuple):
+    state: str
+
+
+SESSION_EXPIRED = Reply("Session expired. Dial again.")
+
+
+class Invalid(ValueError):
+    """
+    Raised by validators; the state's `invalid` prompt is shown and the
+    session stays where it is.
+    """
+
+
+class Hop:
+    """
+    One USSD request: the aggregator's fields, the stored session and the
+    time budget (a payment.deadlines.Deadline) for answering it.
+    """
+
+    def __init__(self, data: dict, sessions, deadline=None):
+        self.session_id = data.get("sessionID")
+        self.msisdn = data.get("msisdn")
+        self.user_data = (data.get("userData") or "").strip()
+        self.network = (data.get("network") or "mtn").lower()
+        self.user_id = data.get("userID")
+        self.new_session = data.get("newSession") is True or str(data.get("newSession")).lower() == "true"
+        self.sessions = sessions
+        self.deadline = deadline
+        self.session = None
+
+
+class Action:
+    """
+    Input handler with side effects (gateway calls, writes). Override arun()
+    to await I/O natively; by default it runs run() in a worker thread.
+    """
+
+    def run(self, hop, value):
+        raise NotImplementedError
+
+    async def arun(self, hop, value):
+        return await sync_to_async(self.run)(hop, value)
+
+
+class State:
+    """
+    prompt:    text (or fn(hop) → text) shown on entering the state
+    options:   {input: handler} for menus
+    on_input:  handler for free input (OTP, amount …) when there are no options
+    validator: fn(text) → value, raising Invalid for bad input
+    invalid:   text (or fn(hop) → text) re-shown on invalid input
+    timeout:   seconds the state may wait for input before the session expires
+    """
+
+    def __init__(self, name, prompt, options=None, on_input=None, validator=None, invalid=None, timeout=None):
+        if bool(options) == bool(on_input):
+            raise ImproperlyConfigured(f"USSD state {name!r} needs exactly one of options / on_input")
+        self.name = name
+        self.prompt = prompt
+        self.options = options or {}
+        self.on_input = on_input
+        self.validator = validator
+        self.invalid = invalid or prompt
+        self.timeout = timeout
+
+    def render(self, text, hop):
+        return text(hop) if callable(text) else text
+
+
+class Flow:
+    def __init__(self, name, states, start):
+        self.name = name
+        self.start = start
+        self.table = {state.name: state for state in states}
+        self._compile()
+
+    # -----------------------------
+    # Compile: resolve every static target once, fail at import on typos
+    # -----------------------------
+    def _compile(self):
+        if self.start not in self.table:
+            raise ImproperlyConfigured(f"USSD flow {self.name!r}: unknown start state {self.start!r}")
+        for state in self.table.values():
+            handlers = list(state.options.values()) + ([state.on_input] if state.on_input else [])
+            for handler in handlers:
+                if isinstance(handler, str) and handler not in self.table:
+                    raise ImproperlyConfigured(
+                        f"USSD flow {self.name!r}: state {state.name!r} points to unknown state {handler!r}"
+                    )
+            state.options = {key: self._normalize(handler) for key, handler in state.options.items()}
+            if state.on_input:
+                state.on_input = self._normalize(state.on_input)
+
+    @staticmethod
+    def _normalize(handler):
+        return Goto(handler) if isinstance(handler, str) else handler
+
+    # -----------------------------
+    # Session bookkeeping
+    # -----------------------------
+    # The state logic below only touches hop.session; handle() / ahandle()
+    # do the store reads and writes around it.
+    def begin(self, hop, **data) -> Reply:
+        hop.session = {"flow": self.name, **data}
+        reply = self._enter(hop, self.start)
+        hop.sessions.set(hop.session_id, hop.session)
+        return reply
+
+    async def abegin(self, hop, **data) -> Reply:
+        hop.session = {"flow": self.name, **data}
+        reply = self._enter(hop, self.start)
+        await hop.sessions.aset(hop.session_id, hop.session)
+        return reply
+
+    def _enter(self, hop, state_name) -> Reply:
+        state = self.table[state_name]
+        hop.session["state"] = state_name
+        hop.session["entered_at"] = time.time()
+        return Reply(state.render(state.prompt, hop), end=False)
+
+    def _finish(self, hop, result) -> Reply:
+        if isinstance(result, Goto):
+            return self._enter(hop, result.state)
+        return result
+
+    def _select(self, hop):
+        """
+        (state, handler, value) for this hop, or a Reply to answer straight
+        away — SESSION_EXPIRED meaning the stored session is to be dropped.
+        """
+        if not hop.session:
+            return SESSION_EXPIRED
+        state = self.table.get(hop.session.get("state"))
+        if state is None:
+            return SESSION_EXPIRED
+        if state.timeout and time.time() - hop.session.get("entered_at", 0) > state.timeout:
+            return SESSION_EXPIRED
+
+        if state.options:
+            handler = state.options.get(hop.user_data)
+            if handler is None:
+                return Reply(state.render(state.invalid, hop), end=False)
+            return state, handler, hop.user_data
+
+        value = hop.user_data
+        if state.validator:
+            try:
+                value = state.validator(hop.user_data)
+            except Invalid:
+                return Reply(state.render(state.invalid, hop), end=False)
+        return state, state.on_input, value
+
+    # -----------------------------
+    # Dispatch
+    # -----------------------------
+    def handle(self, hop) -> Reply:
+        hop.session = hop.sessions.get(hop.session_id)
+        selected = self._select(hop)
+        if isinstance(selected, Reply):
+            if selected is SESSION_EXPIRED and hop.session:
+                hop.sessions.delete(hop.session_id)
+            return selected
+        _, handler, value = selected
+
+        if isinstance(handler, Action):
+            result = handler.run(hop, value)
+        elif callable(handler):
+            result = handler(hop, value)
+        else:
+            result = handler
+        result = self._normalize(result)
+        reply = self._finish(hop, result)
+        if isinstance(result, Goto):
+            hop.sessions.set(hop.session_id, hop.session)
+        elif reply.end:
+            hop.sessions.delete(hop.session_id)
+        return reply
+
+    async def ahandle(self, hop) -> Reply:
+        hop.session = await hop.sessions.aget(hop.session_id)
+        selected = self._select(hop)
+        if isinstance(selected, Reply):
+            if selected is SESSION_EXPIRED and hop.session:
+                await hop.sessions.adelete(hop.session_id)
+            return selected
+        _, handler, value = selected
+
+        if isinstance(handler, Action):
+            result = await handler.arun(hop, value)
+        elif callable(handler):
+            result = handler(hop, value)
+        else:
+            result = handler
+        result = self._normalize(result)
+        reply = self._finish(hop, result)
+        if isinstance(result, Goto):
+            await hop.sessions.aset(hop.session_id, hop.session)
+        elif reply.end:
+            await hop.sessions.adelete(hop.session_id)
+        return reply
+
+
+# -----------------------------
+# Common validators
+# -----------------------------
+def digits(text: str) -> str:
+    if not text or not text.isdigit():
+        raise Invalid(text)
+    return text
@@ -0,0 +1,210 @@
+from paychannel.index import get_channel_index
+from payment.deadlines import DeadlineExceeded, arun_within, run_within
+from payment.references import new_reference
+
+from .charges import INITIATED, SEND_OTP, UNKNOWN, acharge_outcome, charge_outcome, run_charge, run_submit_otp
+from .engine import Action, Flow, Goto, Reply, State, digits
+
+
+# =========================================================
+# Payment flow: confirm → (otp | charging) → done
+# =========================================================
+CONFIRM_MENU = "1. Confirm\n2. Cancel"
+
+PAYMENT_FAILED = Reply("Payment failed. Try again later.")
+PAYMENT_INITIATED = Reply("Payment initiated.\nApprove on your phone.")
+PAYMENT_PENDING = Reply("Payment processing.\nYou will be notified once it is confirmed.")
+OTP_SUBMITTED = Reply("OTP submitted successfully.\nAwait payment confirmation.")
+OTP_PROMPT = "Enter the OTP sent to your phone:"
+INVALID_OTP = "Invalid OTP. Enter the OTP sent to your phone:"
+CHARGING_PROMPT = "Payment processing.\nApprove on your phone, or enter the OTP if you receive one:"
+STILL_PROCESSING = "Still processing.\nApprove on your phone, or enter the OTP if you receive one:"
+INVALID_FORMAT = Reply("Invalid USSD format")
+INVALID_CHANNEL = Reply("Invalid payment channel")
+
+
+def confirm_prompt(hop):
+    session = hop.session
+    return f"{session['channel_name']}\nAmount: GHS {session['amount']}\n{CONFIRM_MENU}"
+
+
+def charge_reply(outcome):
+    if outcome == SEND_OTP:
+        return Goto("otp")
+    if outcome == INITIATED:
+        return PAYMENT_INITIATED
+    if outcome == UNKNOWN:
+        return PAYMENT_PENDING
+    return PAYMENT_FAILED
+
+
+class ChargeAction(Action):
+    """
+    Start the charge in the background and answer as soon as the gateway
+    does — or, once the hop's budget runs out, move to "charging" and let
+    the next hop pick up the outcome.
+    """
+
+    def _charge(self, hop, channel):
+        reference = new_reference()
+        hop.session["reference"] = reference
+        charge_kwargs = dict(
+            email=f"{hop.msisdn}-{hop.user_id}@{hop.network}.com",
+            amount=int(channel.amount),
+            provider_name="MTN",
+            phone=hop.msisdn,
+            reference=reference,
+            metadata={"source": "ussd", "channel": channel.name},
+        )
+        payment_fields = dict(
+            channel_id=channel.id,
+            merchant_id=channel.user_id,
+            amount=channel.amount,
+            phone_number=hop.msisdn,
+            reference=reference,
+            charge_type="momo",
+            channel_type="ussd",
+        )
+        return hop.session_id, charge_kwargs, payment_fields
+
+    def run(self, hop, value):
+        channel = get_channel_index().by_id(hop.session["channel_id"])
+        if channel is None:
+            return INVALID_CHANNEL
+        try:
+            return charge_reply(run_within(hop.deadline, run_charge, *self._charge(hop, channel), pool="ussd"))
+        except DeadlineExceeded:
+            return Goto("charging")
+
+    async def arun(self, hop, value):
+        channel = await get_channel_index().aby_id(hop.session["channel_id"])
+        if channel is None:
+            return INVALID_CHANNEL
+        try:
+            return charge_reply(await arun_within(hop.deadline, run_charge, *self._charge(hop, channel), pool="ussd"))
+        except DeadlineExceeded:
+            return Goto("charging")
+
+
+class SubmitOtpAction(Action):
+    """
+    Send the OTP for the pending charge to Paystack, waiting at most for the hop's budget.
+    """
+
+    def _outcome(self, result):
+        if result.get("status") is True:
+            return OTP_SUBMITTED
+        return Reply("OTP verification failed.\nTransaction cancelled.")
+
+    def run(self, hop, otp):
+        try:
+            return self._outcome(run_within(hop.deadline, run_submit_otp, otp, hop.session.get("reference"), pool="ussd"))
+        except DeadlineExceeded:
+            # Still in flight — the payment settles through verify / webhook as usual
+            return OTP_SUBMITTED
+
+    async def arun(self, hop, otp):
+        try:
+            return self._outcome(await arun_within(hop.deadline, run_submit_otp, otp, hop.session.get("reference"), pool="ussd"))
+        except DeadlineExceeded:
+            return OTP_SUBMITTED
+
+
+SUBMIT_OTP = SubmitOtpAction()
+
+
+class AwaitChargeAction(Action):
+    """
+    Input while a charge that outlived its hop is still settling: an OTP once
+    the gateway asked for one, otherwise the recorded outcome.
+    """
+
+    def _pending(self, outcome, value):
+        if outcome == SEND_OTP:
+            if not value.isdigit():
+                return Reply(INVALID_OTP, end=False)
+            return None
+        if outcome is None:
+            return Reply(STILL_PROCESSING, end=False)
+        return charge_reply(outcome)
+
+    def run(self, hop, value):
+        outcome = charge_outcome(hop.sessions, hop.session_id)
+        return self._pending(outcome, value) or SUBMIT_OTP.run(hop, value)
+
+    async def arun(self, hop, value):
+        outcome = await acharge_outcome(hop.sessions, hop.session_id)
+        return self._pending(outcome, value) or await SUBMIT_OTP.arun(hop, value)
+
+
+PAYMENT_FLOW = Flow(
+    "payment",
+    start="confirm",
+    states=[
+        State(
+            "confirm",
+            prompt=confirm_prompt,
+            options={
+                "1": ChargeAction(),
+                "2": Reply("Transaction cancelled."),
+            },
+            invalid=f"Invalid option\n{CONFIRM_MENU}",
+        ),
+        State(
+            "otp",
+            prompt=OTP_PROMPT,
+            on_input=SUBMIT_OTP,
+            validator=digits,
+            invalid=INVALID_OTP,
+            timeout=180,
+        ),
+        State(
+            "charging",
+            prompt=CHARGING_PROMPT,
+            on_input=AwaitChargeAction(),
+            timeout=180,
+        ),
+    ],
+)
+
+
+# -----------------------------
+# New session: *short*code# → channel → flow
+# -----------------------------
+def channel_code(hop):
+    """
+    Last segment of the dialled string, or None if it isn't a USSD string.
+    """
+    if not hop.user_data.startswith("*"):
+        return None
+    return hop.user_data.replace("#", "").split("*")[-1]
+
+
+def _payment_session(channel):
+    """
+    Session fields for a new payment flow, or None if the channel can't take USSD payments.
+    """
+    if channel is None or not channel.ussd_enabled:
+        return None
+    return dict(channel_id=str(channel.id), channel_name=channel.name, amount=str(channel.amount))
+
+
+def start_payment(hop) -> Reply:
+    code = channel_code(hop)
+    if code is None:
+        return INVALID_FORMAT
+    # Served from the process-local channel index — no query on a warm hit
+    data = _payment_session(get_channel_index().by_code(code))
+    if data is None:
+        return INVALID_CHANNEL
+    return PAYMENT_FLOW.begin(hop, **data)
+
+
+async def astart_payment(hop) -> Reply:
+    code = channel_code(hop)
+    if code is None:
+        return INVALID_FORMAT
+    data = _payment_session(await get_channel_index().aby_code(code))
+    if data is None:
+        return INVALID_CHANNEL
+    return await PAYMENT_FLOW.abegin(hop, **data)
@@ -0,0 +1,244 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+
+# -----------------------------
+# Session store defaults
+# -----------------------------
+# Override any key in settings.USSD_SESSION_STORE.
+DEFAULT_SESSION_SETTINGS = {
+    "BACKEND": "memory",       # memory | cache | sqlite
+    "TTL_SECONDS": 300,        # idle sessions are dropped after this
+    "MAX_ENTRIES": 10000,      # memory backend only (LRU bound)
+    "CACHE": "default",        # cache backend only (alias in settings.CACHES)
+    "PATH": "ussd_sessions.sqlite3",  # sqlite backend only
+}
+
+
+def session_settings() -> dict:
+    return {**DEFAULT_SESSION_SETTINGS, **getattr(settings, "USSD_SESSION_STORE", {})}
+
+
+class SessionStore:
+    """
+    USSD session state keyed by the aggregator's sessionID.
+    Values are small JSON-serialisable dicts; every write refreshes the TTL.
+
+    aget / aset / adelete are for the ASGI view: by default they run the
+    blocking call in a worker thread so the event loop never waits on
+    Redis or the SQLite file.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+
+    def get(self, session_id):
+        raise NotImplementedError
+
+    def set(self, session_id, data: dict):
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    async def aget(self, session_id):
+        return await sync_to_async(self.get, thread_sensitive=False)(session_id)
+
+    async def aset(self, session_id, data: dict):
+        await sync_to_async(self.set, thread_sensitive=False)(session_id, data)
+
+    async def adelete(self, session_id):
+        await sync_to_async(self.delete, thread_sensitive=False)(session_id)
+
+
+# ======================================================
+# IN-MEMORY (single process)
+# ======================================================
+class InMemorySessionStore(SessionStore):
+    """
+    Bounded LRU with per-entry expiry. Only safe with one worker process —
+    use it for development or a single-process ASGI server.
+    """
+
+    def __init__(self, ttl: int, max_entries: int):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._data = OrderedDict()   # session_id → (expires_at, data)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(session_id)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at <= now:
+                del self._data[session_id]
+                return None
+            self._data.move_to_end(session_id)
+            return dict(data)
+
+    def set(self, session_id, data: dict):
+        now = time.monotonic()
+        with self._lock:
+            self._data[session_id] = (now + self.ttl, dict(data))
+            self._data.move_to_end(session_id)
+            # Oldest entries sit at the front: drop expired ones, then trim to size
+            while self._data:
+                oldest_id, (expires_at, _) = next(iter(self._data.items()))
+                if expires_at > now and len(self._data) <= self.max_entries:
+                    break
+                del self._data[oldest_id]
+
+    def delete(self, session_id):
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    # No I/O — a thread hop would cost more than the call
+    async def aget(self, session_id):
+        return self.get(session_id)
+
+    async def aset(self, session_id, data: dict):
+        self.set(session_id, data)
+
+    async def adelete(self, session_id):
+        self.delete(session_id)
+
+
+# ======================================================
+# DJANGO CACHE (Redis — shared across processes and hosts)
+# ======================================================
+class CacheSessionStore(SessionStore):
+    """
+    Backed by a Django cache alias. Shared across workers when that alias is
+    Redis (REDIS_URL); with LocMem it is per-process like the memory store.
+    """
+
+    KEY_PREFIX = "ussd:session:"
+
+    def __init__(self, ttl: int, alias: str):
+        super().__init__(ttl)
+        self.cache = caches[alias]
+
+    def get(self, session_id):
+        return self.cache.get(self.KEY_PREFIX + str(session_id))
+
+    def set(self, session_id, data: dict):
+        self.cache.set(self.KEY_PREFIX + str(session_id), data, self.ttl)
+
+    def delete(self, session_id):
+        self.cache.delete(self.KEY_PREFIX + str(session_id))
+
+
+# ======================================================
+# SQLITE FILE (shared across processes on one host)
+# ======================================================
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions in a local SQLite file in WAL mode, separate from the main
+    database. Every gunicorn worker on the host sees the same sessions; a
+    primary-key read or upsert is well under a millisecond.
+    """
+
+    PURGE_EVERY = 500   # writes between sweeps of expired rows
+
+    def __init__(self, ttl: int, path):
+        super().__init__(ttl)
+        self.path = str(path)
+        self._local = threading.local()
+        self._writes = 0
+        self._ensure_schema()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            # Never reuse a connection inherited across fork
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _ensure_schema(self):
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS ussd_session ("
+            " session_id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " expires_at REAL NOT NULL"
+            ")"
+        )
+
+    def get(self, session_id):
+        row = self._connection().execute(
+            "SELECT data FROM ussd_session WHERE session_id = ? AND expires_at > ?",
+            (str(session_id), time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, session_id, data: dict):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO ussd_session (session_id, data, expires_at) VALUES (?, ?, ?)",
+            (str(session_id), json.dumps(data), time.time() + self.ttl),
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM ussd_session WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, session_id):
+        self._connection().execute("DELETE FROM ussd_session WHERE session_id = ?", (str(session_id),))
+
+
+# -----------------------------
+# Process-wide store
+# -----------------------------
+_store = None
+_store_lock = threading.Lock()
+
+
+def build_session_store(config: dict = None) -> SessionStore:
+    config = config or session_settings()
+    backend = config["BACKEND"]
+    if backend == "memory":
+        return InMemorySessionStore(config["TTL_SECONDS"], config["MAX_ENTRIES"])
+    if backend == "cache":
+        return CacheSessionStore(config["TTL_SECONDS"], config["CACHE"])
+    if backend == "sqlite":
+        return SQLiteSessionStore(config["TTL_SECONDS"], config["PATH"])
+    raise ValueError(f"Unknown USSD session backend: {backend}")
+
+
+def get_session_store() -> SessionStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = build_session_store()
+    return _store
+
+
+async def aget_session_store() -> SessionStore:
+    # Building the store may touch disk (SQLite schema) — only the first call pays a thread hop
+    if _store is not None:
+        return _store
+    return await sync_to_async(get_session_store, thread_sensitive=False)()
+
+
+def _reset_after_fork():
+    global _store, _store_lock
+    _store = None
+    _store_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
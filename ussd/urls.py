@@ -1,6 +1,8 @@
 from django.urls import path
 from .views import ussd_handler
+from .async_views import AsyncUssdView
 
 urlpatterns = [
     path("ussd/", ussd_handler),
+    path("async/ussd/", AsyncUssdView.as_view()),
 ]